@@ -7,201 +7,605 @@ Uses YOLOv8, MediaPipe, OpenCV, and Pillow for professional-grade media processi
 import cv2
 import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
-import mediapipe as mp
 import sys
 import os
 import json
 import logging
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from media_frame import MediaFrame, DEFAULT_ANALYSIS_MAX_EDGE
+from haar_cascades import get_cascade, load_times
+from contour_stats import contour_stats
+from saliency import salient_region
+from crop_planner import plan_crops, analysis_regions
+from yolo_backend import (
+    load_yolo, backend_available, DEFAULT_YOLO_BACKEND, DEFAULT_YOLO_WEIGHTS, DEFAULT_ONNX_MODEL
+)
+from detection_cache import DetectionCache, default_cache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
+# Only check that the AI libraries are installed; they are imported the first
+# time a detector that needs them is loaded
+YOLO_AVAILABLE = backend_available(DEFAULT_YOLO_BACKEND)
+if not YOLO_AVAILABLE:
     logger.warning("YOLOv8 not available. Falling back to OpenCV and MediaPipe.")
 
-try:
-    import mediapipe as mp
-    MEDIAPIPE_AVAILABLE = True
-except ImportError:
-    MEDIAPIPE_AVAILABLE = False
+MEDIAPIPE_AVAILABLE = importlib.util.find_spec('mediapipe') is not None
+if not MEDIAPIPE_AVAILABLE:
     logger.warning("MediaPipe not available.")
 
+# Detectors that detect_subjects knows how to run
+AVAILABLE_DETECTORS = ('face', 'pose', 'hands', 'yolo', 'saliency')
+
+# Detectors whose results feed _determine_main_subject
+DEFAULT_DETECTORS = ('face', 'pose', 'yolo')
+
+# Named detector sets accepted wherever a detector list is; the fast profile
+# replaces the contour fallback with spectral residual saliency
+DETECTOR_PROFILES = {
+    'default': DEFAULT_DETECTORS,
+    'fast': ('face', 'saliency'),
+    'full': AVAILABLE_DETECTORS
+}
+
+# Cascade order, cheapest detector first; saliency only matters when
+# nothing else was found, so it goes last
+CASCADE_ORDER = ('face', 'pose', 'hands', 'yolo', 'saliency')
+
+# Subject type priorities used when scoring subjects (objects score 1)
+SUBJECT_TYPE_PRIORITY = {'face': 3, 'pose': 2}
+
+# Highest score a detector's subjects can reach in _subject_score: type
+# priority x confidence 1.0 x a subject box (clipped to the image) covering
+# the whole image. Hands never become the main subject and salient regions
+# are only used when there is no other subject, so both are skipped once
+# one is found. A skipped detector cannot change the main subject, but its
+# subjects are missing from the crop planner's regions, so skipping is
+# opt-in (cascade=True).
+DETECTOR_SCORE_CEILING = {
+    'face': float(SUBJECT_TYPE_PRIORITY['face']),
+    'pose': float(SUBJECT_TYPE_PRIORITY['pose']),
+    'hands': 0.0,
+    'yolo': 1.0,
+    'saliency': 0.0
+}
+
+def _clip_box(box, w, h):
+    """(x, y, width, height) box clipped to a w x h image (zero size when outside)"""
+    x, y, width, height = box
+    x0, y0 = min(max(x, 0), w), min(max(y, 0), h)
+    x1, y1 = min(max(x + width, 0), w), min(max(y + height, 0), h)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+def parse_detectors(detectors):
+    """Normalise a detector list (iterable, comma separated string or profile name)"""
+    if detectors is None:
+        return None
+    if isinstance(detectors, str):
+        if detectors in DETECTOR_PROFILES:
+            return DETECTOR_PROFILES[detectors]
+        detectors = [d.strip() for d in detectors.split(',') if d.strip()]
+    detectors = tuple(detectors)
+    unknown = [d for d in detectors if d not in AVAILABLE_DETECTORS]
+    if unknown:
+        raise ValueError(f"Unknown detectors: {', '.join(unknown)}")
+    return detectors
+
 class AdvancedMediaProcessor:
-    def __init__(self):
-        """Initialize the advanced media processor with AI models"""
-        self.mp_face_detection = mp.solutions.face_detection
-        self.mp_pose = mp.solutions.pose
-        self.mp_hands = mp.solutions.hands
-        self.mp_selfie_segmentation = mp.solutions.selfie_segmentation
-        
-        # Initialize MediaPipe models with lower confidence thresholds
-        if MEDIAPIPE_AVAILABLE:
-            self.face_detection = self.mp_face_detection.FaceDetection(
-                model_selection=1, min_detection_confidence=0.3
-            )
-            self.pose = self.mp_pose.Pose(
-                static_image_mode=True, min_detection_confidence=0.3
-            )
-            self.hands = self.mp_hands.Hands(
-                static_image_mode=True, max_num_hands=2, min_detection_confidence=0.3
-            )
-            self.selfie_segmentation = self.mp_selfie_segmentation.SelfieSegmentation(
-                model_selection=1
+    def __init__(self, detectors=None, analysis_max_edge=None, cascade=False, early_exit_score=None,
+                 detector_threads=1, intra_op_threads=None, cache=None, yolo_backend=None,
+                 yolo_model_path=None):
+        """
+        Initialize the advanced media processor
+        AI models are loaded on first use; detectors sets the default policy
+        analysis_max_edge caps the resolution detection runs at (0 = full size)
+        Detectors run cheapest first; cascade skips the ones that can no
+        longer change the main subject, and early_exit_score skips the rest
+        once the best subject scores at least that much
+        detector_threads > 1 runs the selected detectors concurrently instead
+        (no cascade); intra_op_threads caps OpenCV, torch and ONNX Runtime
+        threads so several workers can share a node
+        cache is a DetectionCache (default: DETECTION_CACHE_DIR if set)
+        yolo_backend is 'ultralytics' or 'onnx' (default: YOLO_BACKEND) and
+        yolo_model_path overrides its weights, e.g. an int8 ONNX export
+        """
+        self.detectors = parse_detectors(detectors) or DEFAULT_DETECTORS
+        self.analysis_max_edge = (
+            DEFAULT_ANALYSIS_MAX_EDGE if analysis_max_edge is None else int(analysis_max_edge)
+        )
+        self.cascade = cascade
+        self.early_exit_score = None if early_exit_score is None else float(early_exit_score)
+        self.detector_threads = max(1, int(detector_threads or 1))
+        self.intra_op_threads = None if intra_op_threads is None else int(intra_op_threads)
+        self._executor = None
+        self._models = {}
+        self.cache = cache if cache is not None else default_cache()
+        self.yolo_backend = yolo_backend or DEFAULT_YOLO_BACKEND
+        self.yolo_model_path = yolo_model_path
+
+        if self.intra_op_threads:
+            cv2.setNumThreads(self.intra_op_threads)
+
+    def _load_model(self, name):
+        """Load a model the first time it is needed and keep it for later calls"""
+        if name in self._models:
+            return self._models[name]
+
+        model = None
+        try:
+            if name == 'yolo':
+                if backend_available(self.yolo_backend):
+                    # YOLOv8n (nano) for speed; yolo_model_path can point at a
+                    # larger or quantized model
+                    model = load_yolo(self.yolo_backend, self.yolo_model_path, self.intra_op_threads)
+                    logger.info(f"YOLOv8 model loaded successfully ({self.yolo_backend})")
+            elif MEDIAPIPE_AVAILABLE:
+                import mediapipe as mp
+
+                # MediaPipe models with lower confidence thresholds
+                if name == 'face':
+                    model = mp.solutions.face_detection.FaceDetection(
+                        model_selection=1, min_detection_confidence=0.3
+                    )
+                elif name == 'pose':
+                    model = mp.solutions.pose.Pose(
+                        static_image_mode=True, min_detection_confidence=0.3
+                    )
+                elif name == 'hands':
+                    model = mp.solutions.hands.Hands(
+                        static_image_mode=True, max_num_hands=2, min_detection_confidence=0.3
+                    )
+                elif name == 'segmentation':
+                    model = mp.solutions.selfie_segmentation.SelfieSegmentation(
+                        model_selection=1
+                    )
+        except Exception as e:
+            logger.warning(f"Failed to load {name} model: {e}")
+            model = None
+
+        self._models[name] = model
+        return model
+
+    def load_detectors(self, detectors=None):
+        """Load detectors ahead of time, e.g. before a worker accepts jobs"""
+        for name in parse_detectors(detectors) or self.detectors:
+            self._load_model(name)
+
+    def _get_executor(self):
+        """Thread pool shared by concurrent detector runs"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.detector_threads, thread_name_prefix='detector'
             )
-        else:
-            self.face_detection = None
-            self.pose = None
-            self.hands = None
-            self.selfie_segmentation = None
-        
-        # Initialize YOLOv8 if available
-        self.yolo_model = None
-        if YOLO_AVAILABLE:
-            try:
-                # Use YOLOv8n (nano) for speed, can upgrade to YOLOv8s/m/l/x for accuracy
-                self.yolo_model = YOLO('yolov8n.pt')
-                logger.info("YOLOv8 model loaded successfully")
-            except Exception as e:
-                logger.warning(f"Failed to load YOLOv8: {e}")
-                self.yolo_model = None
+        return self._executor
+
+    @property
+    def face_detection(self):
+        return self._load_model('face')
+
+    @property
+    def pose(self):
+        return self._load_model('pose')
+
+    @property
+    def hands(self):
+        return self._load_model('hands')
+
+    @property
+    def selfie_segmentation(self):
+        return self._load_model('segmentation')
+
+    @property
+    def yolo_model(self):
+        return self._load_model('yolo')
+
+    def detection_cache_key(self, path, detectors=None, analysis_max_edge=None, cascade=None,
+                            early_exit_score=None):
+        """Cache key for detecting subjects in path, or None without a cache"""
+        if self.cache is None or not path:
+            return None
+
+        if cascade is None:
+            cascade = self.cascade
+        detectors = sorted(parse_detectors(detectors) or self.detectors)
+        config = {
+            'processor': 'image',
+            # Configuration only: building the key must not load models, or
+            # a cache hit would pay for them anyway
+            'detectors': {name: self._detector_config(name) for name in detectors},
+            'analysis_max_edge': self.analysis_max_edge if analysis_max_edge is None else int(analysis_max_edge),
+            'cascade': bool(cascade) and self.detector_threads == 1,
+            'early_exit_score': self.early_exit_score if early_exit_score is None else float(early_exit_score)
+        }
+        try:
+            return self.cache.key(path, config)
+        except OSError as e:
+            logger.warning(f"Detection cache disabled for {path}: {e}")
+            return None
 
-    def detect_subjects(self, image_path):
+    def detect_subjects(self, image, detectors=None, analysis_max_edge=None, cascade=None,
+                        early_exit_score=None, cache_key=None):
         """
         Advanced subject detection using multiple AI models
+        image is a file path or an already decoded MediaFrame
+        Only the requested detectors (default: self.detectors) are loaded and run
+        Detectors see a proxy capped at analysis_max_edge; boxes are reported
+        in source pixel coordinates
+        With a detection cache, repeat files are answered without decoding
         Returns comprehensive analysis of image content
         """
-        try:
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Could not load image: {image_path}")
-            
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            h, w = image.shape[:2]
-            
-            detection_results = {
-                'faces': [],
-                'poses': [],
-                'hands': [],
-                'objects': [],
-                'main_subject': None,
-                'confidence': 0.0,
-                'focal_points': [],
-                'bounding_box': None
-            }
-            
-            # 1. Face Detection with MediaPipe
-            face_results = self.face_detection.process(rgb_image)
-            if face_results.detections:
-                for detection in face_results.detections:
-                    bbox = detection.location_data.relative_bounding_box
-                    face_info = {
-                        'x': bbox.xmin * w,
-                        'y': bbox.ymin * h,
-                        'width': bbox.width * w,
-                        'height': bbox.height * h,
-                        'confidence': detection.score[0],
-                        'center_x': (bbox.xmin + bbox.width/2) * w,
-                        'center_y': (bbox.ymin + bbox.height/2) * h
-                    }
-                    detection_results['faces'].append(face_info)
-            
-            # 2. Pose Detection with MediaPipe
-            pose_results = self.pose.process(rgb_image)
-            if pose_results.pose_landmarks:
-                landmarks = pose_results.pose_landmarks.landmark
-                # Get key pose points
-                nose = landmarks[0]
-                left_shoulder = landmarks[11]
-                right_shoulder = landmarks[12]
-                
-                pose_info = {
-                    'nose': {'x': nose.x * w, 'y': nose.y * h},
-                    'left_shoulder': {'x': left_shoulder.x * w, 'y': left_shoulder.y * h},
-                    'right_shoulder': {'x': right_shoulder.x * w, 'y': right_shoulder.y * h},
-                    'confidence': min(nose.visibility, left_shoulder.visibility, right_shoulder.visibility)
-                }
-                detection_results['poses'].append(pose_info)
-            
-            # 3. Hand Detection with MediaPipe
-            hand_results = self.hands.process(rgb_image)
-            if hand_results.multi_hand_landmarks:
-                for hand_landmarks in hand_results.multi_hand_landmarks:
-                    # Get bounding box of hand
-                    x_coords = [lm.x * w for lm in hand_landmarks.landmark]
-                    y_coords = [lm.y * h for lm in hand_landmarks.landmark]
-                    
-                    hand_info = {
-                        'x': min(x_coords),
-                        'y': min(y_coords),
-                        'width': max(x_coords) - min(x_coords),
-                        'height': max(y_coords) - min(y_coords),
-                        'center_x': sum(x_coords) / len(x_coords),
-                        'center_y': sum(y_coords) / len(y_coords)
+        return self.detect_subjects_batch(
+            [image], detectors, analysis_max_edge, cascade, early_exit_score, [cache_key]
+        )[0]
+
+    def detect_subjects_batch(self, images, detectors=None, analysis_max_edge=None, cascade=None,
+                              early_exit_score=None, cache_keys=None):
+        """
+        detect_subjects() for several images (paths or MediaFrames)
+        Images move through the cascade together, so every image that still
+        needs YOLO shares one batched forward pass
+        Returns one result per image, in order
+        """
+        detectors = parse_detectors(detectors) or self.detectors
+        if analysis_max_edge is None:
+            analysis_max_edge = self.analysis_max_edge
+        if cascade is None:
+            cascade = self.cascade
+        if early_exit_score is None:
+            early_exit_score = self.early_exit_score
+
+        results = [None] * len(images)
+        jobs = []
+        for index, image in enumerate(images):
+            cache_key = cache_keys[index] if cache_keys else None
+            if cache_key is None:
+                path = image.path if isinstance(image, MediaFrame) else image
+                cache_key = self.detection_cache_key(path, detectors, analysis_max_edge, cascade, early_exit_score)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    cached['cache'] = 'hit'
+                    results[index] = cached
+                    continue
+
+            try:
+                # Load image once; every detector shares the decoded frame
+                frame = image if isinstance(image, MediaFrame) else MediaFrame.open(image)
+                analysis = frame.analysis_proxy(analysis_max_edge)
+
+                # MediaPipe reports relative coordinates, so scale by the source size
+                w, h = frame.source_size
+
+                jobs.append({
+                    'index': index,
+                    'image': image,
+                    'analysis': analysis,
+                    'w': w,
+                    'h': h,
+                    'cache_key': cache_key,
+                    'ran': [],
+                    'skipped': [],
+                    'unavailable': [],
+                    'best_score': 0.0,
+                    'results': {
+                        'faces': [],
+                        'poses': [],
+                        'hands': [],
+                        'objects': [],
+                        'salient_regions': [],
+                        'main_subject': None,
+                        'confidence': 0.0,
+                        'focal_points': [],
+                        'bounding_box': None,
+                        'analysis': analysis.analysis_info(analysis_max_edge)
                     }
-                    detection_results['hands'].append(hand_info)
-            
-            # 4. Object Detection with YOLOv8 (lowered confidence threshold)
-            if self.yolo_model:
+                })
+            except Exception as e:
+                logger.error(f"Subject detection failed: {e}")
+                results[index] = self._fallback_detection(image, analysis_max_edge)
+
+        stages = {
+            'face': ('faces', self._detect_faces),
+            'pose': ('poses', self._detect_poses),
+            'hands': ('hands', self._detect_hands),
+            'yolo': ('objects', self._detect_objects),
+            'saliency': ('salient_regions', self._detect_saliency)
+        }
+        selected = [name for name in CASCADE_ORDER if name in detectors]
+
+        # Detectors whose model is not installed or failed to load are
+        # reported separately and never run
+        unavailable = [name for name in selected if not self._detector_available(name)]
+        selected = [name for name in selected if name not in unavailable]
+        for job in jobs:
+            job['unavailable'].extend(unavailable)
+
+        parallel = self.detector_threads > 1 and len(selected) > 1
+
+        if parallel:
+            # MediaPipe, OpenCV and torch release the GIL during inference,
+            # so independent detectors can overlap; models are loaded above
+            for job in jobs:
                 try:
-                    yolo_results = self.yolo_model(image_path, verbose=False, conf=0.15)
-                    for result in yolo_results:
-                        boxes = result.boxes
-                        if boxes is not None:
-                            for box in boxes:
-                                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                                conf = box.conf[0].cpu().numpy()
-                                cls = int(box.cls[0].cpu().numpy())
-
-                                # Include more object types and lower confidence threshold
-                                if conf > 0.15:  # Lower threshold for better detection
-                                    object_info = {
-                                        'class': self.yolo_model.names[cls],
-                                        'confidence': float(conf),
-                                        'x': float(x1),
-                                        'y': float(y1),
-                                        'width': float(x2 - x1),
-                                        'height': float(y2 - y1),
-                                        'center_x': float((x1 + x2) / 2),
-                                        'center_y': float((y1 + y2) / 2)
-                                    }
-                                    detection_results['objects'].append(object_info)
+                    # Build the shared views first; the frame is read-only from here on
+                    analysis = job['analysis']
+                    analysis.rgb
+                    analysis.bgr
+
+                    futures = {
+                        name: self._get_executor().submit(stages[name][1], analysis, job['w'], job['h'])
+                        for name in selected
+                    }
+                    for name in selected:
+                        key, _ = stages[name]
+                        job['results'][key].extend(futures[name].result())
+                        job['ran'].append(name)
+                    self._update_best_score(job)
                 except Exception as e:
-                    logger.warning(f"YOLOv8 detection failed: {e}")
-            
-            # 5. Determine main subject and focal points
-            main_subject, focal_points, bbox = self._determine_main_subject(
-                detection_results, w, h, image_path
+                    job['error'] = e
+        else:
+            # Run detectors cheapest first, skipping the ones that can no
+            # longer beat the best subject found so far
+            for name in selected:
+                pending = []
+                for job in jobs:
+                    if 'error' in job:
+                        continue
+                    thresholds = []
+                    if cascade:
+                        thresholds.append(DETECTOR_SCORE_CEILING[name])
+                    if early_exit_score is not None:
+                        thresholds.append(early_exit_score)
+                    if thresholds and job['best_score'] > 0 and job['best_score'] >= min(thresholds):
+                        job['skipped'].append(name)
+                        continue
+                    pending.append(job)
+
+                key, run = stages[name]
+                if name == 'yolo' and len(pending) > 1:
+                    outputs = self._detect_objects_batch([job['analysis'] for job in pending])
+                else:
+                    outputs = []
+                    for job in pending:
+                        try:
+                            outputs.append(run(job['analysis'], job['w'], job['h']))
+                        except Exception as e:
+                            job['error'] = e
+                            outputs.append([])
+
+                for job, output in zip(pending, outputs):
+                    if 'error' in job:
+                        continue
+                    job['results'][key].extend(output)
+                    job['ran'].append(name)
+                    self._update_best_score(job)
+
+        for job in jobs:
+            detection_results, w, h = job['results'], job['w'], job['h']
+            try:
+                if 'error' in job:
+                    raise job['error']
+
+                detection_results['stages'] = {
+                    'cascade': bool(cascade) and not parallel,
+                    'threads': self.detector_threads if parallel else 1,
+                    'early_exit_score': early_exit_score,
+                    'ran': job['ran'],
+                    'skipped': job['skipped'],
+                    'unavailable': job['unavailable'],
+                    'best_score': job['best_score']
+                }
+                if len(images) > 1:
+                    detection_results['stages']['batch'] = len(images)
+
+                # Determine main subject and focal points
+                main_subject, focal_points, bbox = self._determine_main_subject(
+                    detection_results, w, h, job['analysis']
+                )
+
+                detection_results['main_subject'] = main_subject
+                detection_results['focal_points'] = focal_points
+                detection_results['bounding_box'] = bbox
+                detection_results['regions'] = self._importance_regions(detection_results, w, h)
+
+                # Results of a worker whose model failed to load would be
+                # served to workers where it loads, so they are not cached
+                if job['cache_key'] and not any(self._load_failed(name) for name in job['unavailable']):
+                    self.cache.put(job['cache_key'], detection_results)
+                    detection_results['cache'] = 'miss'
+
+                results[job['index']] = detection_results
+
+            except Exception as e:
+                logger.error(f"Subject detection failed: {e}")
+                results[job['index']] = self._fallback_detection(job['image'], analysis_max_edge)
+
+        return results
+
+    def _detector_available(self, name):
+        """Whether a detector can run here (saliency needs no model)"""
+        return name == 'saliency' or self._load_model(name) is not None
+
+    def _detector_config(self, name):
+        """
+        What a detector's results depend on, found without loading its model:
+        whether its library is installed and, for YOLO, the backend and model
+        file
+        """
+        if name == 'saliency':
+            return {'installed': True}
+        if name == 'yolo':
+            model_path = self.yolo_model_path or (
+                DEFAULT_ONNX_MODEL if self.yolo_backend == 'onnx' else DEFAULT_YOLO_WEIGHTS
             )
+            return {
+                'installed': backend_available(self.yolo_backend),
+                'backend': self.yolo_backend,
+                'model': model_path,
+                'model_exists': os.path.exists(model_path)
+            }
+        return {'installed': MEDIAPIPE_AVAILABLE}
+
+    def _load_failed(self, name):
+        """Whether an unavailable detector was expected to load, per _detector_config"""
+        config = self._detector_config(name)
+        return config['installed'] and config.get('model_exists', True)
+
+    def _update_best_score(self, job):
+        """Track the best main-subject score a job's detections reach"""
+        subjects = self._collect_subjects(job['results'], job['w'], job['h'])
+        if subjects:
+            job['best_score'] = max(self._subject_score(s, job['w'], job['h']) for s in subjects)
+
+    def _detect_faces(self, analysis, w, h):
+        """Face Detection with MediaPipe"""
+        faces = []
+        if not self.face_detection:
+            return faces
+
+        face_results = self.face_detection.process(analysis.rgb)
+        if face_results.detections:
+            for detection in face_results.detections:
+                bbox = detection.location_data.relative_bounding_box
+                face_info = {
+                    'x': bbox.xmin * w,
+                    'y': bbox.ymin * h,
+                    'width': bbox.width * w,
+                    'height': bbox.height * h,
+                    'confidence': detection.score[0],
+                    'center_x': (bbox.xmin + bbox.width/2) * w,
+                    'center_y': (bbox.ymin + bbox.height/2) * h
+                }
+                faces.append(face_info)
+        return faces
+
+    def _detect_poses(self, analysis, w, h):
+        """Pose Detection with MediaPipe"""
+        poses = []
+        if not self.pose:
+            return poses
+
+        pose_results = self.pose.process(analysis.rgb)
+        if pose_results.pose_landmarks:
+            landmarks = pose_results.pose_landmarks.landmark
+            # Get key pose points
+            nose = landmarks[0]
+            left_shoulder = landmarks[11]
+            right_shoulder = landmarks[12]
             
-            detection_results['main_subject'] = main_subject
-            detection_results['focal_points'] = focal_points
-            detection_results['bounding_box'] = bbox
-            
-            return detection_results
-            
+            pose_info = {
+                'nose': {'x': nose.x * w, 'y': nose.y * h},
+                'left_shoulder': {'x': left_shoulder.x * w, 'y': left_shoulder.y * h},
+                'right_shoulder': {'x': right_shoulder.x * w, 'y': right_shoulder.y * h},
+                'confidence': min(nose.visibility, left_shoulder.visibility, right_shoulder.visibility)
+            }
+            poses.append(pose_info)
+        return poses
+
+    def _detect_hands(self, analysis, w, h):
+        """Hand Detection with MediaPipe"""
+        hands = []
+        if not self.hands:
+            return hands
+
+        hand_results = self.hands.process(analysis.rgb)
+        if hand_results.multi_hand_landmarks:
+            for hand_landmarks in hand_results.multi_hand_landmarks:
+                # Get bounding box of hand
+                x_coords = [lm.x * w for lm in hand_landmarks.landmark]
+                y_coords = [lm.y * h for lm in hand_landmarks.landmark]
+                
+                hand_info = {
+                    'x': min(x_coords),
+                    'y': min(y_coords),
+                    'width': max(x_coords) - min(x_coords),
+                    'height': max(y_coords) - min(y_coords),
+                    'center_x': sum(x_coords) / len(x_coords),
+                    'center_y': sum(y_coords) / len(y_coords)
+                }
+                hands.append(hand_info)
+        return hands
+
+    def _detect_objects(self, analysis, w, h):
+        """Object Detection with YOLOv8 (lowered confidence threshold)"""
+        return self._detect_objects_batch([analysis])[0]
+
+    def _detect_objects_batch(self, analyses):
+        """YOLOv8 objects for several analysis proxies in batched forward passes"""
+        if not self.yolo_model:
+            return [[] for _ in analyses]
+
+        try:
+            batch_boxes = self.yolo_model.detect_batch([analysis.bgr for analysis in analyses], conf=0.15)
         except Exception as e:
-            logger.error(f"Subject detection failed: {e}")
-            return self._fallback_detection(image_path)
+            logger.warning(f"YOLOv8 detection failed: {e}")
+            return [[] for _ in analyses]
+
+        results = []
+        for analysis, boxes in zip(analyses, batch_boxes):
+            objects = []
+            scale_x, scale_y = analysis.scale
+            for x1, y1, x2, y2, conf, cls in boxes:
+                # Map proxy pixels back to source pixels
+                x1, x2 = x1 * scale_x, x2 * scale_x
+                y1, y2 = y1 * scale_y, y2 * scale_y
+
+                # Include more object types and lower confidence threshold
+                if conf > 0.15:  # Lower threshold for better detection
+                    object_info = {
+                        'class': self.yolo_model.names[int(cls)],
+                        'confidence': float(conf),
+                        'x': float(x1),
+                        'y': float(y1),
+                        'width': float(x2 - x1),
+                        'height': float(y2 - y1),
+                        'center_x': float((x1 + x2) / 2),
+                        'center_y': float((y1 + y2) / 2)
+                    }
+                    objects.append(object_info)
+            results.append(objects)
+        return results
+
+    def _detect_saliency(self, analysis, w, h):
+        """Most salient region by spectral residual saliency (no model needed)"""
+        region = salient_region(analysis.gray)
+        if not region:
+            return []
+
+        # Map proxy pixels back to source pixels
+        scale_x, scale_y = analysis.scale
+        return [{
+            'x': region['x'] * scale_x,
+            'y': region['y'] * scale_y,
+            'width': region['width'] * scale_x,
+            'height': region['height'] * scale_y,
+            'center_x': region['center_x'] * scale_x,
+            'center_y': region['center_y'] * scale_y,
+            'confidence': region['confidence']
+        }]
 
-    def _determine_main_subject(self, detection_results, w, h, image_path):
-        """Determine the main subject and optimal crop area"""
+    def _collect_subjects(self, detection_results, w, h):
+        """
+        Candidate main subjects from faces, poses and significant objects
+        Boxes are clipped to the w x h image and areas never exceed the
+        clipped box, so no subject scores above DETECTOR_SCORE_CEILING
+        """
         subjects = []
         
         # Prioritize faces (highest priority)
         for face in detection_results['faces']:
+            bbox = _clip_box((face['x'], face['y'], face['width'], face['height']), w, h)
             subjects.append({
                 'type': 'face',
                 'confidence': face['confidence'],
-                'area': face['width'] * face['height'],
+                'area': bbox[2] * bbox[3],
                 'center': (face['center_x'], face['center_y']),
-                'bbox': (face['x'], face['y'], face['width'], face['height'])
+                'bbox': bbox
             })
         
         # Add poses (medium priority)
@@ -209,45 +613,100 @@ class AdvancedMediaProcessor:
             # Estimate pose area from shoulder width
             shoulder_width = abs(pose['right_shoulder']['x'] - pose['left_shoulder']['x'])
             estimated_height = shoulder_width * 3  # Rough estimate
-            area = shoulder_width * estimated_height
+            bbox = _clip_box((
+                pose['left_shoulder']['x'] - shoulder_width/2,
+                pose['nose']['y'] - estimated_height/3,
+                shoulder_width * 2,
+                estimated_height
+            ), w, h)
             
             subjects.append({
                 'type': 'pose',
                 'confidence': pose['confidence'],
-                'area': area,
+                'area': min(shoulder_width * estimated_height, bbox[2] * bbox[3]),
                 'center': (pose['nose']['x'], pose['nose']['y']),
-                'bbox': (
-                    pose['left_shoulder']['x'] - shoulder_width/2,
-                    pose['nose']['y'] - estimated_height/3,
-                    shoulder_width * 2,
-                    estimated_height
-                )
+                'bbox': bbox
             })
         
         # Add significant objects (lower priority) - relaxed thresholds
         for obj in detection_results['objects']:
             # Lower confidence threshold and smaller area requirement
             min_area_ratio = 0.01  # 1% of image instead of 5%
-            if obj['confidence'] > 0.2 and obj['width'] * obj['height'] > (w * h * min_area_ratio):
+            bbox = _clip_box((obj['x'], obj['y'], obj['width'], obj['height']), w, h)
+            if obj['confidence'] > 0.2 and bbox[2] * bbox[3] > (w * h * min_area_ratio):
                 subjects.append({
                     'type': f"object_{obj['class']}",
                     'confidence': obj['confidence'],
-                    'area': obj['width'] * obj['height'],
+                    'area': bbox[2] * bbox[3],
                     'center': (obj['center_x'], obj['center_y']),
-                    'bbox': (obj['x'], obj['y'], obj['width'], obj['height'])
+                    'bbox': bbox
                 })
+
+        return subjects
+
+    def _subject_score(self, subject, w, h):
+        """Priority: faces > poses > objects, then by confidence and area"""
+        base_priority = SUBJECT_TYPE_PRIORITY.get(subject['type'], 1)
+        return base_priority * subject['confidence'] * (subject['area'] / (w * h))
+
+    def _importance_regions(self, detection_results, w, h):
+        """
+        Weighted subject regions (percent coordinates) for the crop planner
+        Every subject counts, weighted like _subject_score without the area
+        term; a salient region stands in when there are none
+        """
+        subjects = self._collect_subjects(detection_results, w, h)
+        regions = [
+            (s['type'], s['bbox'], SUBJECT_TYPE_PRIORITY.get(s['type'], 1) * s['confidence'])
+            for s in subjects
+        ]
+        if not regions:
+            regions = [
+                ('salient_region', (r['x'], r['y'], r['width'], r['height']), r['confidence'])
+                for r in detection_results.get('salient_regions', [])[:1]
+            ]
+
+        return [
+            {
+                'type': subject_type,
+                'x': x / w * 100,
+                'y': y / h * 100,
+                'width': width / w * 100,
+                'height': height / h * 100,
+                'weight': float(weight)
+            }
+            for subject_type, (x, y, width, height), weight in regions
+        ]
+
+    def _determine_main_subject(self, detection_results, w, h, frame):
+        """
+        Determine the main subject and optimal crop area
+        w, h are source dimensions; frame is the analysis proxy for fallbacks
+        """
+        subjects = self._collect_subjects(detection_results, w, h)
+
+        if not subjects and detection_results.get('salient_regions'):
+            # Salient region stands in for the contour fallback
+            region = detection_results['salient_regions'][0]
+            subjects = [{
+                'type': 'salient_region',
+                'confidence': region['confidence'],
+                'area': region['width'] * region['height'],
+                'center': (region['center_x'], region['center_y']),
+                'bbox': (region['x'], region['y'], region['width'], region['height'])
+            }]
         
         if not subjects:
-            # Use content-aware fallback detection
-            return self._content_aware_fallback(image_path, w, h)
+            # Use content-aware fallback detection on the proxy, then map
+            # its pixel focal points back to the source
+            main_subject, focal_points, bbox = self._content_aware_fallback(
+                frame, frame.width, frame.height
+            )
+            scale_x, scale_y = frame.scale
+            return main_subject, [(x * scale_x, y * scale_y) for x, y in focal_points], bbox
         
         # Sort by priority: faces > poses > objects, then by confidence and area
-        def subject_score(s):
-            type_priority = {'face': 3, 'pose': 2}
-            base_priority = type_priority.get(s['type'], 1)
-            return base_priority * s['confidence'] * (s['area'] / (w * h))
-        
-        best_subject = max(subjects, key=subject_score)
+        best_subject = max(subjects, key=lambda s: self._subject_score(s, w, h))
         
         # Create focal points from all detected subjects
         focal_points = [s['center'] for s in subjects[:3]]  # Top 3 subjects
@@ -275,11 +734,10 @@ class AdvancedMediaProcessor:
         
         return best_subject['type'], focal_points_pct, bbox_pct
 
-    def _content_aware_fallback(self, image_path, w, h):
+    def _content_aware_fallback(self, frame, w, h):
         """Content-aware fallback using OpenCV features when AI detection fails"""
         try:
-            image = cv2.imread(image_path)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = frame.gray
 
             # 1. Try edge detection to find interesting regions
             edges = cv2.Canny(gray, 50, 150)
@@ -287,24 +745,14 @@ class AdvancedMediaProcessor:
             # 2. Find contours for potential subjects
             contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-            # 3. Analyze contours for significant shapes
-            significant_contours = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > (w * h * 0.005):  # At least 0.5% of image
-                    x, y, cw, ch = cv2.boundingRect(contour)
-                    aspect_ratio = cw / ch
-                    # Prefer more square-like shapes (potential subjects)
-                    if 0.3 < aspect_ratio < 3.0:
-                        significant_contours.append({
-                            'area': area,
-                            'center': (x + cw/2, y + ch/2),
-                            'bbox': (x, y, cw, ch),
-                            'aspect_ratio': aspect_ratio
-                        })
+            # 3. Analyze contours for significant shapes: at least 0.5% of
+            # the image and square-like (potential subjects)
+            areas, rects = contour_stats(contours)
+            aspect_ratio = rects[:, 2] / rects[:, 3]
+            significant = (areas > (w * h * 0.005)) & (aspect_ratio > 0.3) & (aspect_ratio < 3.0)
 
             # 4. Use rule of thirds if no significant contours
-            if not significant_contours:
+            if not significant.any():
                 # Rule of thirds focal points
                 focal_points = [
                     (w * 0.33, h * 0.33),  # Top-left third
@@ -337,10 +785,10 @@ class AdvancedMediaProcessor:
                 }
 
             # 5. Use largest significant contour
-            best_contour = max(significant_contours, key=lambda c: c['area'])
-            x, y, cw, ch = best_contour['bbox']
+            best = int(np.argmax(np.where(significant, areas, -1.0)))
+            x, y, cw, ch = (int(v) for v in rects[best])
 
-            return "Content-aware detection", [best_contour['center']], {
+            return "Content-aware detection", [(x + cw/2, y + ch/2)], {
                 'x': x / w * 100,
                 'y': y / h * 100,
                 'width': cw / w * 100,
@@ -354,18 +802,19 @@ class AdvancedMediaProcessor:
                 'x': 25, 'y': 25, 'width': 50, 'height': 50
             }
 
-    def _fallback_detection(self, image_path):
+    def _fallback_detection(self, image, analysis_max_edge=None):
         """Fallback detection using traditional OpenCV methods"""
+        if analysis_max_edge is None:
+            analysis_max_edge = self.analysis_max_edge
+
         try:
-            image = cv2.imread(image_path)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            h, w = image.shape[:2]
+            frame = image if isinstance(image, MediaFrame) else MediaFrame.open(image)
+            frame = frame.analysis_proxy(analysis_max_edge)
+            gray = frame.gray
+            h, w = frame.shape
             
             # Try face detection with Haar cascades
-            face_cascade = cv2.CascadeClassifier(
-                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            )
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = get_cascade().detectMultiScale(gray, 1.1, 4)
             
             if len(faces) > 0:
                 x, y, fw, fh = max(faces, key=lambda f: f[2] * f[3])
@@ -378,16 +827,20 @@ class AdvancedMediaProcessor:
                         'width': (fw / w) * 100,
                         'height': (fh / h) * 100
                     },
-                    'confidence': 0.7
+                    'confidence': 0.7,
+                    'analysis': frame.analysis_info(analysis_max_edge),
+                    'classifier_load_ms': load_times()
                 }
             
             # Use content-aware fallback
-            main_subject, focal_points, bbox = self._content_aware_fallback(image_path, w, h)
+            main_subject, focal_points, bbox = self._content_aware_fallback(frame, w, h)
             return {
                 'main_subject': main_subject,
                 'focal_points': [{'x': fp[0] / w * 100, 'y': fp[1] / h * 100} for fp in focal_points],
                 'bounding_box': bbox,
-                'confidence': 0.4
+                'confidence': 0.4,
+                'analysis': frame.analysis_info(analysis_max_edge),
+                'classifier_load_ms': load_times()
             }
             
         except Exception as e:
@@ -399,85 +852,250 @@ class AdvancedMediaProcessor:
                 'confidence': 0.1
             }
 
+    def process_image(self, input_path, output_path, target_width, target_height, detectors=None,
+                      analysis_max_edge=None, early_exit_score=None):
+        """
+        Smart crop an image to the target size and save it to output_path
+        Returns the detection results used to choose the crop
+        """
+        job = {'input_path': input_path, 'output_path': output_path, 'width': target_width, 'height': target_height}
+        result = self.process_images([job], detectors, analysis_max_edge, early_exit_score)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def process_images(self, jobs, detectors=None, analysis_max_edge=None, early_exit_score=None):
+        """
+        Smart crop several images, each job a dict with input_path,
+        output_path, width and height
+        Detection runs as one batch (see detect_subjects_batch)
+        Returns per job the detection results or the exception it failed with
+        """
+        if analysis_max_edge is None:
+            analysis_max_edge = self.analysis_max_edge
+
+        results = [None] * len(jobs)
+        frames = [None] * len(jobs)
+        pending, cache_keys = [], []
+        for index, job in enumerate(jobs):
+            try:
+                target = (int(job['width']), int(job['height']))
+
+                # Cached detections mean only rendering needs pixels
+                cache_key = self.detection_cache_key(
+                    job['input_path'], detectors, analysis_max_edge, early_exit_score=early_exit_score
+                )
+                cached = self.cache.get(cache_key) if cache_key else None
+
+                if cached is not None:
+                    cached['cache'] = 'hit'
+                    results[index] = cached
+                    frames[index] = MediaFrame.open(job['input_path'], [target], analysis=False)
+                else:
+                    # Decode once, reduced when the target and analysis sizes
+                    # allow it; detection and rendering share the same frame
+                    frames[index] = MediaFrame.open(job['input_path'], [target], analysis_max_edge)
+                    pending.append(index)
+                    cache_keys.append(cache_key)
+            except Exception as e:
+                results[index] = e
+
+        # Detect subjects
+        if pending:
+            detected = self.detect_subjects_batch(
+                [frames[index] for index in pending], detectors, analysis_max_edge,
+                early_exit_score=early_exit_score, cache_keys=cache_keys
+            )
+            for index, detection_results in zip(pending, detected):
+                results[index] = detection_results
+
+        for index, job in enumerate(jobs):
+            if isinstance(results[index], Exception):
+                continue
+            try:
+                self._render_crop(
+                    frames[index], job['output_path'], int(job['width']), int(job['height']), results[index]
+                )
+            except Exception as e:
+                results[index] = e
+            # Release the decoded pixels as soon as the job is saved
+            frames[index] = None
+
+        return results
+
+    def _render_crop(self, frame, output_path, target_width, target_height, detection_results):
+        """Crop, resize, sharpen and save one target from a decoded frame"""
+        img = frame.pil
+        original_width, original_height = img.size
+
+        # Largest crop with the target aspect ratio that keeps the most of
+        # the detected subjects
+        crop_x, crop_y, crop_width, crop_height = plan_crops(
+            original_width, original_height, [(target_width, target_height)],
+            analysis_regions(detection_results)
+        )[0]
+
+        # Perform the smart crop
+        img = img.crop((crop_x, crop_y, crop_x + crop_width, crop_y + crop_height))
+
+        # Resize to target dimensions (no stretching since aspect ratio matches)
+        img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+        # Enhance image quality
+        enhancer = ImageEnhance.Sharpness(img)
+        img = enhancer.enhance(1.1)
+
+        # Save with appropriate format
+        if output_path.lower().endswith('.png'):
+            img.save(output_path, 'PNG', optimize=True)
+        else:
+            if img.mode == 'RGBA':
+                # Convert RGBA to RGB for JPEG
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                img = background
+            img.save(output_path, 'JPEG', quality=90, optimize=True, progressive=True)
+
+    def serve(self, input_stream=None, output_stream=None):
+        """
+        Long-lived worker loop: models stay loaded between jobs.
+        Reads one JSON job per line and writes one JSON result per line:
+            {"id": ..., "input_path": ..., "output_path": ..., "width": ..., "height": ...,
+             "detectors": [...], "analysis_max_edge": ..., "early_exit_score": ...}
+            (the last three keys are optional)
+            {"id": ..., "success": true, "result": {...}}
+        A line {"id": ..., "jobs": [{input_path, output_path, width, height}, ...]}
+        (plus the optional keys) runs the images as one detection batch and
+        answers {"id": ..., "success": true, "results": [{"success": ..., "result"|"error": ...}]}
+        Jobs run in arrival order; the id is echoed back so callers can keep
+        several jobs queued on the same worker.
+        """
+        input_stream = input_stream or sys.stdin
+        output_stream = output_stream or sys.stdout
+
+        # Keep stray prints from the AI libraries out of the result stream
+        sys.stdout = sys.stderr
+
+        def respond(message):
+            output_stream.write(json.dumps(message) + '\n')
+            output_stream.flush()
+
+        # Load the default detectors before reporting ready
+        self.load_detectors()
+        respond({'event': 'ready'})
+
+        for line in input_stream:
+            line = line.strip()
+            if not line:
+                continue
+
+            job_id = None
+            try:
+                job = json.loads(line)
+                job_id = job.get('id')
+
+                if 'jobs' in job:
+                    results = self.process_images(
+                        job['jobs'],
+                        job.get('detectors'),
+                        job.get('analysis_max_edge'),
+                        job.get('early_exit_score')
+                    )
+                    respond({'id': job_id, 'success': True, 'results': [
+                        {'success': False, 'error': str(result)} if isinstance(result, Exception)
+                        else {'success': True, 'result': result}
+                        for result in results
+                    ]})
+                    continue
+
+                result = self.process_image(
+                    job['input_path'],
+                    job['output_path'],
+                    int(job['width']),
+                    int(job['height']),
+                    job.get('detectors'),
+                    job.get('analysis_max_edge'),
+                    job.get('early_exit_score')
+                )
+                respond({'id': job_id, 'success': True, 'result': result})
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                respond({'id': job_id, 'success': False, 'error': str(e)})
+
+def _pop_option(args, name):
+    """Remove '--name value' from args and return the value (None if absent)"""
+    if name not in args:
+        return None
+    index = args.index(name)
+    if index + 1 >= len(args):
+        print(f"{name} requires a value")
+        sys.exit(1)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
 def main():
     """Main function for command line usage"""
-    if len(sys.argv) != 5:
-        print("Usage: python advanced_media_processor.py <input_path> <output_path> <width> <height>")
+    args = sys.argv[1:]
+
+    # Optional detector policy, e.g. --detectors face,yolo or --detectors fast
+    detectors = _pop_option(args, '--detectors')
+
+    # Optional analysis resolution cap, e.g. --analysis-max-edge 640
+    analysis_max_edge = _pop_option(args, '--analysis-max-edge')
+
+    # Detector cascade: --cascade skips detectors that can no longer change
+    # the main subject, --early-exit-score stops once the best subject
+    # scores at least that much
+    cascade = '--cascade' in args
+    if cascade:
+        args.remove('--cascade')
+    early_exit_score = _pop_option(args, '--early-exit-score')
+
+    # Thread counts: detectors run concurrently with --detector-threads > 1;
+    # --intra-op-threads caps OpenCV/torch/ONNX Runtime threads per worker process
+    detector_threads = _pop_option(args, '--detector-threads') or 1
+    intra_op_threads = _pop_option(args, '--intra-op-threads')
+
+    # Detection cache directory (defaults to DETECTION_CACHE_DIR)
+    cache_dir = _pop_option(args, '--cache-dir')
+
+    # YOLO backend, e.g. --yolo-backend onnx --yolo-model yolov8n.int8.onnx
+    yolo_backend = _pop_option(args, '--yolo-backend')
+    yolo_model_path = _pop_option(args, '--yolo-model')
+
+    def create_processor():
+        return AdvancedMediaProcessor(
+            detectors, analysis_max_edge, cascade, early_exit_score,
+            detector_threads, intra_op_threads,
+            DetectionCache(cache_dir) if cache_dir else None,
+            yolo_backend, yolo_model_path
+        )
+
+    if args == ['--serve']:
+        processor = create_processor()
+        processor.serve()
+        return
+
+    if len(args) != 4:
+        print("Usage: python advanced_media_processor.py <input_path> <output_path> <width> <height> [options]")
+        print("       python advanced_media_processor.py --serve [options]")
+        print("Options: --detectors face,pose,yolo (or a profile: default, fast, full)")
+        print("         --analysis-max-edge 1024")
+        print("         --cascade  --early-exit-score 0.2")
+        print("         --detector-threads 4  --intra-op-threads 2  --cache-dir DIR")
+        print("         --yolo-backend ultralytics|onnx  --yolo-model PATH")
         sys.exit(1)
     
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    target_width = int(sys.argv[3])
-    target_height = int(sys.argv[4])
+    input_path = args[0]
+    output_path = args[1]
+    target_width = int(args[2])
+    target_height = int(args[3])
     
-    processor = AdvancedMediaProcessor()
+    processor = create_processor()
     
     try:
-        # Detect subjects
-        detection_results = processor.detect_subjects(input_path)
-        
-        # Load and process image
-        with Image.open(input_path) as img:
-            # Convert palette images to RGB
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            elif img.mode == 'L':
-                img = img.convert('RGB')
-            
-            original_width, original_height = img.size
-            
-            # Calculate optimal crop area that maintains target aspect ratio
-            target_ratio = target_width / target_height
-            original_ratio = original_width / original_height
-
-            if detection_results['bounding_box']:
-                bbox = detection_results['bounding_box']
-                # Get subject center point
-                subject_center_x = (bbox['x'] + bbox['width'] / 2) / 100 * original_width
-                subject_center_y = (bbox['y'] + bbox['height'] / 2) / 100 * original_height
-            else:
-                # Default to image center
-                subject_center_x = original_width / 2
-                subject_center_y = original_height / 2
-
-            # Calculate crop dimensions that maintain target aspect ratio
-            if target_ratio > original_ratio:
-                # Target is wider - use full width, crop height
-                crop_width = original_width
-                crop_height = int(crop_width / target_ratio)
-                crop_x = 0
-                # Center crop around subject vertically
-                crop_y = int(subject_center_y - crop_height / 2)
-                crop_y = max(0, min(crop_y, original_height - crop_height))
-            else:
-                # Target is taller - use full height, crop width
-                crop_height = original_height
-                crop_width = int(crop_height * target_ratio)
-                crop_y = 0
-                # Center crop around subject horizontally
-                crop_x = int(subject_center_x - crop_width / 2)
-                crop_x = max(0, min(crop_x, original_width - crop_width))
-
-            # Perform the smart crop
-            img = img.crop((crop_x, crop_y, crop_x + crop_width, crop_y + crop_height))
-
-            # Resize to target dimensions (no stretching since aspect ratio matches)
-            img = img.resize((target_width, target_height), Image.Resampling.LANCZOS)
-            
-            # Enhance image quality
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(1.1)
-            
-            # Save with appropriate format
-            if output_path.lower().endswith('.png'):
-                img.save(output_path, 'PNG', optimize=True)
-            else:
-                if img.mode == 'RGBA':
-                    # Convert RGBA to RGB for JPEG
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                img.save(output_path, 'JPEG', quality=90, optimize=True, progressive=True)
+        detection_results = processor.process_image(input_path, output_path, target_width, target_height)
         
         # Output detection results for debugging
         print(json.dumps(detection_results, indent=2))
@@ -487,4 +1105,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -11,35 +11,104 @@ import sys
 import os
 import json
 import logging
+import shutil
+import bisect
 import tempfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from detection_cache import default_cache
+from haar_cascades import get_cascade, load_times
+from crop_planner import plan_crops
+from yolo_backend import load_yolo, backend_available, DEFAULT_YOLO_BACKEND, DEFAULT_BATCH_SIZE
+from media_frame import MediaFrame, DEFAULT_ANALYSIS_MAX_EDGE
+from ffmpeg_frames import FfmpegFrameReader, analysis_size
+from ffmpeg_progress import ProgressTracker, run_ffmpeg, print_progress
+from scene_sampler import plan_samples
+from subject_tracker import SubjectTracker, TRACK_MAX_EDGE
+from video_probe import probe_video, probe_packets, probe_gop, tool_available, audio_args, video_passthrough
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 try:
-    from ultralytics import YOLO
     import mediapipe as mp
-    YOLO_AVAILABLE = True
     MEDIAPIPE_AVAILABLE = True
 except ImportError as e:
-    YOLO_AVAILABLE = False
     MEDIAPIPE_AVAILABLE = False
     logger.warning(f"AI libraries not available: {e}")
 
+# How analysis frames are read: 'seek' jumps to each sample, 'grab' walks the
+# stream once and only converts the samples, 'pipe' has ffmpeg walk the
+# stream and emit the samples as small RGB frames, 'keyframes' has ffmpeg
+# decode keyframes only; 'auto' picks the cheapest from the GOP structure.
+# 'scenes' scans a tiny stream for shot boundaries and spreads the samples
+# over the shots by duration (sample_frames is then an upper bound).
+# 'track' runs the detectors on sample_frames anchor frames only and follows
+# the subjects through every frame in between (see track_subjects)
+SAMPLING_STRATEGIES = ('auto', 'seek', 'grab', 'pipe', 'keyframes', 'scenes', 'track')
+DEFAULT_SAMPLING = os.environ.get('VIDEO_SAMPLING', 'auto')
+
+# Subject tracking: frames per second tracked, seconds between scheduled
+# detector runs, and the tracking confidence (share of surviving flow
+# points) below which the detectors run again, at most once per
+# TRACK_REDETECT_SECONDS (lost boxes are left out until then)
+TRACK_FPS = float(os.environ.get('VIDEO_TRACK_FPS', '10'))
+TRACK_ANCHOR_SECONDS = float(os.environ.get('VIDEO_TRACK_ANCHOR_SECONDS', '2'))
+TRACK_MIN_CONFIDENCE = 0.5
+TRACK_REDETECT_SECONDS = 0.5
+
+# Keyframe-aligned segments encoded in parallel (1 encodes in one process)
+DEFAULT_ENCODE_CHUNKS = int(os.environ.get('VIDEO_ENCODE_CHUNKS', '1'))
+
+# Preview proxies: short edge, length and x264 settings
+PREVIEW_SHORT_EDGE = 360
+PREVIEW_SECONDS = float(os.environ.get('VIDEO_PREVIEW_SECONDS', '10'))
+PREVIEW_PRESET = 'ultrafast'
+PREVIEW_CRF = '30'
+
+
+def preview_size(width, height, short_edge=PREVIEW_SHORT_EDGE):
+    """Even (width, height) of a width x height target with its short edge capped at short_edge"""
+    scale = min(1.0, short_edge / min(width, height))
+    return max(2, round(width * scale / 2) * 2), max(2, round(height * scale / 2) * 2)
+
+
+def thin_track(positions, limit):
+    """
+    Every anchor of a track_subjects() result plus at most limit evenly
+    spaced tracked positions, in time order
+    """
+    tracked = [i for i, position in enumerate(positions) if not position['anchor']]
+    if len(tracked) > limit:
+        tracked = [tracked[i] for i in np.linspace(0, len(tracked) - 1, limit, dtype=int)] if limit > 0 else []
+    keep = set(tracked)
+    return [position for i, position in enumerate(positions) if position['anchor'] or i in keep]
+
+
 class AdvancedVideoProcessor:
-    def __init__(self):
-        """Initialize the advanced video processor with AI models"""
+    def __init__(self, cache=None, yolo_backend=None, yolo_model_path=None, analysis_max_edge=None):
+        """
+        Initialize the advanced video processor with AI models
+        cache is a DetectionCache (default: DETECTION_CACHE_DIR if set)
+        yolo_backend is 'ultralytics' or 'onnx' (default: YOLO_BACKEND)
+        analysis_max_edge caps the longest edge frames are analyzed at
+        (default: ANALYSIS_MAX_EDGE)
+        """
         self.yolo_model = None
         self.face_detection = None
         self.pose = None
+        self.cache = cache if cache is not None else default_cache()
+        self.yolo_backend = yolo_backend or DEFAULT_YOLO_BACKEND
+        self.yolo_model_path = yolo_model_path
+        self.analysis_max_edge = analysis_max_edge or DEFAULT_ANALYSIS_MAX_EDGE
         
         # Initialize YOLOv8 if available
-        if YOLO_AVAILABLE:
+        if backend_available(self.yolo_backend):
             try:
-                self.yolo_model = YOLO('yolov8n.pt')
-                logger.info("YOLOv8 model loaded successfully")
+                self.yolo_model = load_yolo(self.yolo_backend, yolo_model_path)
+                logger.info(f"YOLOv8 model loaded successfully ({self.yolo_backend})")
             except Exception as e:
                 logger.warning(f"Failed to load YOLOv8: {e}")
         
@@ -59,77 +128,400 @@ class AdvancedVideoProcessor:
                 logger.warning(f"Failed to load MediaPipe: {e}")
 
     def check_ffmpeg(self):
-        """Check if FFmpeg is available"""
-        try:
-            subprocess.run(['ffmpeg', '-version'], 
-                         capture_output=True, check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        """Check if FFmpeg is available (looked up once per process)"""
+        return tool_available('ffmpeg')
 
-    def analyze_video_content(self, video_path, sample_frames=10, target_width=None, target_height=None):
+    def analyze_video_content(self, video_path, sample_frames=10, target_width=None, target_height=None,
+                              sampling=None):
         """
         Analyze video content to determine optimal crop area
         Samples frames throughout the video for consistent detection
+        sampling is one of SAMPLING_STRATEGIES (default: VIDEO_SAMPLING or auto)
+        """
+        analysis = self.analyze_video_targets(video_path, [(target_width, target_height)], sample_frames, sampling)
+        if analysis:
+            analysis['optimal_crop'] = analysis.pop('optimal_crops')[0]
+        return analysis
+
+    def analyze_video_targets(self, video_path, targets, sample_frames=10, sampling=None):
+        """
+        analyze_video_content for several (target_width, target_height) at once
+        Frames are sampled and analyzed once; 'optimal_crops' holds one crop
+        per target, in order
         """
+        sampling = sampling or DEFAULT_SAMPLING
+        if sampling not in SAMPLING_STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy: {sampling}")
+
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError(f"Could not open video: {video_path}")
-            
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            # Sample frames evenly throughout the video
-            frame_indices = np.linspace(0, total_frames - 1, sample_frames, dtype=int)
-            
-            all_detections = []
-            
-            for frame_idx in frame_indices:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    continue
-                
-                # Analyze this frame
-                detections = self._analyze_frame(frame)
-                if detections:
-                    all_detections.extend(detections)
-            
-            cap.release()
+            # Frame detections do not depend on the target size, so a cached
+            # analysis of the same file serves every platform
+            cache_key = None
+            if self.cache is not None:
+                try:
+                    config = {
+                        'processor': 'video',
+                        'sample_frames': sample_frames,
+                        'sampling': sampling,
+                        'analysis_max_edge': self.analysis_max_edge,
+                        # Float and int8 exports of one backend find different boxes
+                        'yolo': [self.yolo_backend, self.yolo_model_path] if self.yolo_model is not None else None,
+                        'face': self.face_detection is not None
+                    }
+                    if sampling == 'track':
+                        config['track'] = [
+                            TRACK_FPS, TRACK_ANCHOR_SECONDS, TRACK_MIN_CONFIDENCE, TRACK_REDETECT_SECONDS,
+                            TRACK_MAX_EDGE
+                        ]
+                    cache_key = self.cache.key(video_path, config)
+                except OSError as e:
+                    logger.warning(f"Detection cache disabled for {video_path}: {e}")
+
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                video_info = cached['video_info']
+                all_detections = cached['detections']
+            else:
+                video_info, all_detections = self._sample_detections(video_path, sample_frames, sampling)
+                if cache_key:
+                    self.cache.put(cache_key, {'video_info': video_info, 'detections': all_detections})
             
             # Determine optimal crop area from all detections
-            optimal_crop = self._calculate_optimal_crop(all_detections, width, height, target_width, target_height)
+            optimal_crops = [
+                self._calculate_optimal_crop(
+                    all_detections, video_info['width'], video_info['height'], target_width, target_height
+                )
+                for target_width, target_height in targets
+            ]
             
-            return {
-                'video_info': {
-                    'width': width,
-                    'height': height,
-                    'fps': fps,
-                    'total_frames': total_frames,
-                    'duration': total_frames / fps if fps > 0 else 0
-                },
+            result = {
+                'video_info': video_info,
                 'detections': len(all_detections),
-                'optimal_crop': optimal_crop
+                'optimal_crops': optimal_crops
             }
+            if cache_key:
+                result['cache'] = 'hit' if cached is not None else 'miss'
+            if load_times():
+                result['classifier_load_ms'] = load_times()
+            return result
             
         except Exception as e:
             logger.error(f"Video analysis failed: {e}")
             return None
 
-    def _analyze_frame(self, frame):
-        """Analyze a single frame for subjects"""
+    def track_subjects(self, video_path, anchor_seconds=None, track_fps=None):
+        """
+        Dense subject positions: the detectors run on anchor frames only
+        (every anchor_seconds, default VIDEO_TRACK_ANCHOR_SECONDS) and the
+        detected boxes are followed through the track_fps (default
+        VIDEO_TRACK_FPS) frames in between by optical flow on frames
+        downscaled to TRACK_MAX_EDGE; the detectors run again as soon as
+        tracking confidence drops below TRACK_MIN_CONFIDENCE (cuts,
+        occlusion, fast motion), at most once per TRACK_REDETECT_SECONDS
+        'positions' holds one {'time', 'anchor', 'detections'} per tracked
+        frame; tracked detections carry 'tracked': True and a confidence
+        scaled by the tracking confidence
+        """
+        metadata = probe_video(video_path)
+        width, height = metadata['width'], metadata['height']
+        track_fps = track_fps or TRACK_FPS
+        if metadata['fps'] > 0:
+            track_fps = min(track_fps, metadata['fps'])
+        anchor_seconds = anchor_seconds or TRACK_ANCHOR_SECONDS
+
+        # One ffmpeg stream at analysis size feeds the detectors; the
+        # tracker works on a smaller grayscale copy of each frame
+        analysis_width, analysis_height = analysis_size(width, height, self.analysis_max_edge)
+        scale = (width / analysis_width, height / analysis_height)
+        track_width, track_height = analysis_size(width, height, TRACK_MAX_EDGE)
+        track_scale = (track_width / width, track_height / height)
+        reader = FfmpegFrameReader(video_path, analysis_width, analysis_height, fps=track_fps)
+
+        tracker = SubjectTracker()
+        anchors = []
+        positions = []
+        last_anchor = None
+        detector_runs = 0
+        redetections = 0
+        for index, rgb in enumerate(reader):
+            time_s = index / track_fps
+            gray = cv2.resize(
+                cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY), (track_width, track_height), interpolation=cv2.INTER_AREA
+            )
+
+            anchor = last_anchor is None or time_s - last_anchor >= anchor_seconds - 1e-6
+            if not anchor:
+                boxes, confidences = tracker.update(gray)
+                lost = confidences and min(confidences) < TRACK_MIN_CONFIDENCE
+                if lost and time_s - last_anchor >= TRACK_REDETECT_SECONDS - 1e-6:
+                    anchor = True
+                    redetections += 1
+                else:
+                    detections = [
+                        self._tracked_detection(detection, box, confidence, track_scale)
+                        for detection, box, confidence in zip(anchors, boxes, confidences)
+                        if confidence >= TRACK_MIN_CONFIDENCE
+                    ]
+
+            if anchor:
+                anchors = self._analyze_frames([MediaFrame.from_rgb(rgb, path=video_path, scale=scale)])
+                tracker.reset(gray, [
+                    (d['x'] * track_scale[0], d['y'] * track_scale[1],
+                     d['width'] * track_scale[0], d['height'] * track_scale[1])
+                    for d in anchors
+                ])
+                detections = anchors
+                last_anchor = time_s
+                detector_runs += 1
+
+            positions.append({'time': round(time_s, 3), 'anchor': anchor, 'detections': detections})
+
+        logger.info(
+            f"Tracked {len(positions)} frames of {video_path} with {detector_runs} detector runs "
+            f"({redetections} after tracking loss)"
+        )
+        return {
+            'track_fps': track_fps,
+            'anchor_seconds': anchor_seconds,
+            'detector_runs': detector_runs,
+            'redetections': redetections,
+            'tracked_frames': len(positions) - detector_runs,
+            'positions': positions
+        }
+
+    def _tracked_detection(self, detection, box, confidence, track_scale):
+        """Copy of an anchor detection moved to a tracked box (tracker pixels)"""
+        x, y = box[0] / track_scale[0], box[1] / track_scale[1]
+        w, h = box[2] / track_scale[0], box[3] / track_scale[1]
+        return dict(
+            detection,
+            confidence=float(detection['confidence'] * confidence),
+            x=float(x), y=float(y), width=float(w), height=float(h),
+            center_x=float(x + w / 2), center_y=float(y + h / 2),
+            tracked=True
+        )
+
+    def _sample_detections(self, video_path, sample_frames, sampling='auto'):
+        """Run frame detection on sampled frames; returns (video_info, detections)"""
+        metadata = probe_video(video_path)
+        total_frames = metadata['total_frames']
+        fps = metadata['fps']
+        width = metadata['width']
+        height = metadata['height']
+
+        duration = metadata['duration'] or (total_frames / fps if fps > 0 else 0)
+
+        gop = probe_gop(video_path) if sampling in ('auto', 'keyframes', 'scenes') else None
+        strategy = self._choose_sampling(sampling, sample_frames, total_frames, gop)
+        read_strategy = strategy
+        frame_indices = np.linspace(0, total_frames - 1, sample_frames, dtype=int)
+
+        details = {}
+        if strategy == 'scenes':
+            timestamps, shots = plan_samples(video_path, width, height, duration, sample_frames)
+            frame_indices = sorted({min(total_frames - 1, int(t * fps)) for t in timestamps})
+            details = {'shots': shots, 'timestamps': timestamps}
+
+            # Seek to the chosen frames unless that decodes more than one pass
+            read_strategy = 'seek'
+            if gop and len(frame_indices) * gop['mean_gop'] / 2 > total_frames:
+                read_strategy = 'grab'
+        
+        # Sample frames evenly throughout the video; ffmpeg strategies
+        # deliver RGB frames already at analysis size, OpenCV frames are
+        # downscaled here. When ffmpeg fails, OpenCV reads the same samples.
+        all_detections = None
+        if strategy == 'track':
+            try:
+                # Scheduled anchors are spaced like sample_frames even samples
+                tracked = self.track_subjects(video_path, duration / sample_frames if duration > 0 else None)
+                # Tracking runs at track_fps; only anchors and sample_frames
+                # tracked positions feed the crop (and the cached result), so
+                # neither grows with duration x track_fps
+                positions = thin_track(tracked['positions'], sample_frames)
+                all_detections = [d for position in positions for d in position['detections']]
+                details = {key: value for key, value in tracked.items() if key != 'positions'}
+                details['kept_tracked_frames'] = sum(1 for position in positions if not position['anchor'])
+            except RuntimeError as e:
+                logger.warning(f"Tracking failed, seeking to samples instead: {e}")
+                read_strategy = 'seek'
+                details = {'fallback': read_strategy}
+        elif read_strategy in ('pipe', 'keyframes'):
+            if read_strategy == 'keyframes':
+                sampled = self._keyframe_frames(video_path, gop['keyframes'], sample_frames, width, height)
+            else:
+                sampled = self._pipe_frames(video_path, sample_frames, total_frames, fps, width, height)
+            try:
+                all_detections = self._detect_sampled(sampled)
+            except RuntimeError as e:
+                # grab decodes what the pipe would; keyframes were chosen as
+                # cheaper than a full pass, so seeking is the closer match
+                read_strategy = 'grab' if read_strategy == 'pipe' else 'seek'
+                logger.warning(f"ffmpeg frame pipe failed, falling back to {read_strategy}: {e}")
+                details['fallback'] = read_strategy
+
+        if all_detections is None:
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                raise ValueError(f"Could not open video: {video_path}")
+            try:
+                if read_strategy == 'grab':
+                    sampled = self._grab_frames(cap, frame_indices)
+                else:
+                    sampled = self._seek_frames(cap, frame_indices)
+                all_detections = self._detect_sampled(
+                    MediaFrame.from_bgr(frame).analysis_proxy(self.analysis_max_edge) for frame in sampled
+                )
+            finally:
+                cap.release()
+
+        video_info = {
+            'width': width,
+            'height': height,
+            'fps': fps,
+            'total_frames': total_frames,
+            'duration': duration,
+            'rotation': metadata['rotation'],
+            'video_codec': metadata['video_codec'],
+            'audio_codec': metadata['audio_codec'],
+            'sampling': dict(gop or {}, strategy=strategy, **details)
+        }
+        return video_info, all_detections
+
+    def _detect_sampled(self, sampled):
+        """
+        Detections of an iterable of MediaFrames, analyzed in YOLO-sized
+        batches; pipe frames are reused buffers, which stay valid for one batch
+        """
+        detections = []
+        frames = []
+        for frame in sampled:
+            frames.append(frame)
+            if len(frames) == DEFAULT_BATCH_SIZE:
+                detections.extend(self._analyze_frames(frames))
+                frames = []
+        detections.extend(self._analyze_frames(frames))
+        return detections
+
+    def _choose_sampling(self, sampling, sample_frames, total_frames, gop):
+        """
+        Resolve 'auto' to the strategy with the fewest estimated decoded frames:
+        seek decodes about half a GOP per sample, pipe (or grab without
+        ffmpeg) decodes the whole stream, keyframes decodes every keyframe
+        (needs enough of them)
+        """
+        has_ffmpeg = tool_available('ffmpeg')
+        if sampling == 'scenes':
+            return 'scenes' if has_ffmpeg and total_frames > 0 else 'seek'
+        if sampling == 'track':
+            return 'track' if has_ffmpeg and total_frames > 0 else 'seek'
+        if sampling == 'keyframes':
+            return 'keyframes' if gop and has_ffmpeg else 'grab'
+        if sampling == 'pipe':
+            return 'pipe' if has_ffmpeg else 'grab'
+        if sampling != 'auto':
+            return sampling
+        if not gop:
+            # Without GOP information a seek costs at most one GOP per sample
+            return 'seek'
+
+        # The pipe decodes as much as grab but in ffmpeg's threads, with
+        # scaling and colour conversion done there too
+        costs = {
+            'seek': sample_frames * gop['mean_gop'] / 2,
+            'pipe' if has_ffmpeg else 'grab': total_frames or gop['packets']
+        }
+        if gop['keyframes'] >= sample_frames:
+            costs['keyframes'] = gop['keyframes']
+        return min(costs, key=costs.get)
+
+    def _seek_frames(self, cap, frame_indices):
+        """Frames at frame_indices, seeking to each one"""
+        for frame_idx in frame_indices:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            ret, frame = cap.read()
+            if ret:
+                yield frame
+
+    def _grab_frames(self, cap, frame_indices):
+        """
+        Frames at frame_indices from one sequential pass; grab() only
+        demuxes and decodes, retrieve() converts just the wanted frames
+        """
+        wanted = set(int(i) for i in frame_indices)
+        last = max(wanted)
+        frame_idx = 0
+        while frame_idx <= last and cap.grab():
+            if frame_idx in wanted:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield frame
+            frame_idx += 1
+
+    def _pipe_frames(self, video_path, sample_frames, total_frames, fps, width, height):
+        """
+        About sample_frames evenly spaced frames from ffmpeg's fps filter,
+        scaled to analysis size and converted to RGB by ffmpeg
+        """
+        duration = total_frames / fps if fps > 0 else 0
+        sample_fps = sample_frames / duration if duration > 0 else None
+        yield from self._read_pipe(video_path, width, height, fps=sample_fps, max_frames=sample_frames)
+
+    def _keyframe_frames(self, video_path, keyframes, sample_frames, width, height):
+        """
+        Evenly spaced keyframes decoded by ffmpeg with -skip_frame nokey,
+        so no predicted frame is ever decoded
+        """
+        picks = sorted(set(int(i) for i in np.linspace(0, keyframes - 1, sample_frames)))
+        select = '+'.join(f'eq(n,{n})' for n in picks)
+        yield from self._read_pipe(video_path, width, height, select=select, keyframes_only=True)
+
+    def _read_pipe(self, video_path, width, height, **options):
+        """MediaFrames over an FfmpegFrameReader at analysis size, mapped back to width x height"""
+        analysis_width, analysis_height = analysis_size(width, height, self.analysis_max_edge)
+        scale = (width / analysis_width, height / analysis_height)
+        reader = FfmpegFrameReader(
+            video_path, analysis_width, analysis_height, buffers=DEFAULT_BATCH_SIZE, **options
+        )
+        for rgb in reader:
+            yield MediaFrame.from_rgb(rgb, path=video_path, scale=scale)
+
+    def _analyze_frames(self, frames):
+        """Detections of several MediaFrames, with one batched YOLO pass"""
+        if not frames:
+            return []
+
+        yolo_boxes = [None] * len(frames)
+        if self.yolo_model:
+            try:
+                yolo_boxes = self.yolo_model.detect_batch([frame.bgr for frame in frames])
+            except Exception as e:
+                logger.warning(f"Object detection failed: {e}")
+                yolo_boxes = [[]] * len(frames)
+
+        detections = []
+        for frame, boxes in zip(frames, yolo_boxes):
+            detections.extend(self._analyze_frame(frame, boxes))
+        return detections
+
+    def _analyze_frame(self, frame, yolo_boxes=None):
+        """
+        Analyze a single frame for subjects
+        frame is a MediaFrame (or a BGR array); detections are in source
+        video pixels even when the frame was downscaled for analysis
+        yolo_boxes are this frame's boxes when YOLO already ran on a batch
+        """
+        if not isinstance(frame, MediaFrame):
+            frame = MediaFrame.from_bgr(frame)
+
         detections = []
-        h, w = frame.shape[:2]
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        w, h = frame.source_size
+        scale_x, scale_y = frame.scale
         
         # Face detection with MediaPipe
         if self.face_detection:
             try:
-                results = self.face_detection.process(rgb_frame)
+                results = self.face_detection.process(frame.rgb)
                 if results.detections:
                     for detection in results.detections:
                         bbox = detection.location_data.relative_bounding_box
@@ -149,41 +541,35 @@ class AdvancedVideoProcessor:
         # Object detection with YOLOv8
         if self.yolo_model:
             try:
-                results = self.yolo_model(frame, verbose=False)
-                for result in results:
-                    boxes = result.boxes
-                    if boxes is not None:
-                        for box in boxes:
-                            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                            conf = box.conf[0].cpu().numpy()
-                            cls = int(box.cls[0].cpu().numpy())
-                            
-                            # Focus on people and important objects
-                            class_name = self.yolo_model.names[cls]
-                            if class_name in ['person', 'car', 'dog', 'cat', 'bird'] and conf > 0.5:
-                                detections.append({
-                                    'type': f'object_{class_name}',
-                                    'confidence': float(conf),
-                                    'x': float(x1),
-                                    'y': float(y1),
-                                    'width': float(x2 - x1),
-                                    'height': float(y2 - y1),
-                                    'center_x': float((x1 + x2) / 2),
-                                    'center_y': float((y1 + y2) / 2)
-                                })
+                if yolo_boxes is None:
+                    yolo_boxes = self.yolo_model.detect(frame.bgr)
+                for x1, y1, x2, y2, conf, cls in yolo_boxes:
+                    # Focus on people and important objects
+                    class_name = self.yolo_model.names[int(cls)]
+                    if class_name in ['person', 'car', 'dog', 'cat', 'bird'] and conf > 0.5:
+                        x1, x2 = x1 * scale_x, x2 * scale_x
+                        y1, y2 = y1 * scale_y, y2 * scale_y
+                        detections.append({
+                            'type': f'object_{class_name}',
+                            'confidence': float(conf),
+                            'x': float(x1),
+                            'y': float(y1),
+                            'width': float(x2 - x1),
+                            'height': float(y2 - y1),
+                            'center_x': float((x1 + x2) / 2),
+                            'center_y': float((y1 + y2) / 2)
+                        })
             except Exception as e:
                 logger.warning(f"Object detection failed: {e}")
         
         # Fallback: OpenCV face detection
         if not detections:
             try:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                face_cascade = cv2.CascadeClassifier(
-                    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                )
-                faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+                faces = get_cascade().detectMultiScale(frame.gray, 1.1, 4)
                 
                 for (x, y, fw, fh) in faces:
+                    x, fw = x * scale_x, fw * scale_x
+                    y, fh = y * scale_y, fh * scale_y
                     detections.append({
                         'type': 'face_opencv',
                         'confidence': 0.7,
@@ -237,31 +623,37 @@ class AdvancedVideoProcessor:
                 'method': 'center_fallback'
             }
         
-        # Weight detections by confidence and type
-        weighted_centers = []
-        for det in detections:
-            weight = det['confidence']
-            if det['type'].startswith('face'):
-                weight *= 2.0  # Prioritize faces
-            elif det['type'].startswith('object_person'):
-                weight *= 1.5  # Prioritize people
-            
-            weighted_centers.append({
-                'x': det['center_x'],
-                'y': det['center_y'],
-                'weight': weight
-            })
-        
-        # Calculate weighted center
-        total_weight = sum(c['weight'] for c in weighted_centers)
-        if total_weight == 0:
-            center_x = video_width / 2
-            center_y = video_height / 2
-        else:
-            center_x = sum(c['x'] * c['weight'] for c in weighted_centers) / total_weight
-            center_y = sum(c['y'] * c['weight'] for c in weighted_centers) / total_weight
+        if target_ratio:
+            # Weight detections by confidence and type, then keep as much of
+            # them as the target aspect ratio allows
+            regions = []
+            for det in detections:
+                weight = det['confidence']
+                if det['type'].startswith('face'):
+                    weight *= 2.0  # Prioritize faces
+                elif det['type'].startswith('object_person'):
+                    weight *= 1.5  # Prioritize people
+
+                regions.append((
+                    det['x'] / video_width,
+                    det['y'] / video_height,
+                    det['width'] / video_width,
+                    det['height'] / video_height,
+                    weight
+                ))
+
+            crop_x, crop_y, crop_width, crop_height = plan_crops(
+                video_width, video_height, [(target_width, target_height)], regions
+            )[0]
+            return {
+                'x': crop_x,
+                'y': crop_y,
+                'width': crop_width,
+                'height': crop_height,
+                'method': 'ai_detected'
+            }
         
-        # Calculate bounding box that includes all important detections
+        # No target ratio: use the area covering all important detections
         min_x = min(det['x'] for det in detections)
         max_x = max(det['x'] + det['width'] for det in detections)
         min_y = min(det['y'] for det in detections)
@@ -273,77 +665,16 @@ class AdvancedVideoProcessor:
         padding_x = max(detection_width * 0.5, video_width * 0.1)
         padding_y = max(detection_height * 0.5, video_height * 0.1)
 
-        # Calculate crop area with target aspect ratio
-        if target_ratio:
-            # We need to crop to exactly match the target aspect ratio
-            # Start by determining the maximum possible crop area that fits the target ratio
-
-            # Option 1: Use full width, calculate height
-            option1_width = video_width
-            option1_height = option1_width / target_ratio
-
-            # Option 2: Use full height, calculate width
-            option2_height = video_height
-            option2_width = option2_height * target_ratio
-
-            # Choose the option that fits within the video bounds
-            if option1_height <= video_height:
-                # Use full width
-                crop_width = option1_width
-                crop_height = option1_height
-                crop_x = 0
-                # Center around weighted center vertically
-                crop_y = center_y - crop_height / 2
-                crop_y = max(0, min(crop_y, video_height - crop_height))
-            else:
-                # Use full height
-                crop_width = option2_width
-                crop_height = option2_height
-                crop_y = 0
-                # Center around weighted center horizontally
-                crop_x = center_x - crop_width / 2
-                crop_x = max(0, min(crop_x, video_width - crop_width))
-
-        else:
-            # No target ratio, use detection area plus padding
-            crop_x = min_x - padding_x
-            crop_y = min_y - padding_y
-            crop_width = detection_width + 2 * padding_x
-            crop_height = detection_height + 2 * padding_y
+        crop_x = min_x - padding_x
+        crop_y = min_y - padding_y
+        crop_width = detection_width + 2 * padding_x
+        crop_height = detection_height + 2 * padding_y
 
         # Ensure crop area is within video bounds
         crop_x = max(0, min(crop_x, video_width - crop_width))
         crop_y = max(0, min(crop_y, video_height - crop_height))
         crop_width = min(crop_width, video_width - crop_x)
         crop_height = min(crop_height, video_height - crop_y)
-
-        # Ensure crop area is within video bounds (final validation)
-        crop_x = max(0, min(crop_x, video_width - crop_width))
-        crop_y = max(0, min(crop_y, video_height - crop_height))
-        crop_width = min(crop_width, video_width - crop_x)
-        crop_height = min(crop_height, video_height - crop_y)
-
-        # Final aspect ratio validation - ensure it exactly matches target
-        if target_ratio:
-            actual_ratio = crop_width / crop_height
-            if abs(actual_ratio - target_ratio) > 0.01:  # Allow small tolerance
-                # Recalculate to ensure exact ratio match
-                if target_ratio > actual_ratio:
-                    # Need to be wider - reduce height
-                    new_height = crop_width / target_ratio
-                    height_diff = crop_height - new_height
-                    crop_height = new_height
-                    crop_y += height_diff / 2  # Center the adjustment
-                else:
-                    # Need to be taller - reduce width
-                    new_width = crop_height * target_ratio
-                    width_diff = crop_width - new_width
-                    crop_width = new_width
-                    crop_x += width_diff / 2  # Center the adjustment
-
-                # Ensure still within bounds
-                crop_x = max(0, min(crop_x, video_width - crop_width))
-                crop_y = max(0, min(crop_y, video_height - crop_height))
         
         return {
             'x': int(crop_x),
@@ -354,97 +685,499 @@ class AdvancedVideoProcessor:
         }
 
     def process_video(self, input_path, output_path, target_width, target_height, 
-                     quality='medium', compress=False):
+                     quality='medium', compress=False, chunks=None, on_progress=None):
         """
         Process video with smart cropping and optimization
         """
+        result = self.process_video_targets(input_path, [{
+            'width': target_width,
+            'height': target_height,
+            'output_path': output_path
+        }], quality, compress, chunks, on_progress)
+
+        analysis = result['analysis']
+        analysis['optimal_crop'] = analysis.pop('optimal_crops')[0]
+        return {
+            'success': True,
+            'analysis': analysis,
+            'crop_method': analysis['optimal_crop']['method'],
+            'detections_found': analysis['detections'],
+            'chunks': result['chunks']
+        }
+
+    def process_video_targets(self, input_path, targets, quality='medium', compress=False, chunks=None,
+                              on_progress=None):
+        """
+        Produce every target ({'width', 'height', 'output_path'[, 'format']})
+        from one analysis and one ffmpeg run: the source is decoded once and
+        split into a crop+scale chain per output
+        Targets with the same crop and size are encoded once and copied;
+        targets the source already matches are remuxed without re-encoding
+        and compatible audio is stream-copied
+        chunks > 1 encodes that many keyframe-aligned segments in parallel
+        (default: VIDEO_ENCODE_CHUNKS)
+        on_progress(event) receives encode progress with percent and ETA
+        (see ffmpeg_progress.ProgressTracker)
+        """
+        chunks = chunks or DEFAULT_ENCODE_CHUNKS
         if not self.check_ffmpeg():
             raise RuntimeError("FFmpeg is not installed. Please install FFmpeg to process videos.")
         
         try:
+            sizes = [(int(target['width']), int(target['height'])) for target in targets]
+
             # Analyze video content
-            analysis = self.analyze_video_content(input_path, target_width=target_width, target_height=target_height)
+            analysis = self.analyze_video_targets(input_path, sizes)
             if not analysis:
                 raise ValueError("Failed to analyze video content")
-            
-            video_info = analysis['video_info']
-            optimal_crop = analysis['optimal_crop']
-            
-            # Build FFmpeg command
-            cmd = ['ffmpeg', '-i', input_path]
-            
-            # Video filters
-            filters = []
+            optimal_crops = analysis['optimal_crops']
 
-            # Smart crop filter - crop to area that matches target aspect ratio
-            crop_filter = f"crop={optimal_crop['width']}:{optimal_crop['height']}:{optimal_crop['x']}:{optimal_crop['y']}"
-            filters.append(crop_filter)
-            logger.info(f"Smart crop applied: {crop_filter} (method: {optimal_crop['method']})")
+            # One filter chain per distinct crop and size
+            chains = {}
+            for index, (crop, size) in enumerate(zip(optimal_crops, sizes)):
+                key = (crop['x'], crop['y'], crop['width'], crop['height']) + size
+                chains.setdefault(key, []).append(index)
 
-            # Scale to exact target dimensions (no aspect ratio preservation needed since crop matches ratio)
-            scale_filter = f"scale={target_width}:{target_height}"
-            filters.append(scale_filter)
-            
-            # Apply filters
-            if filters:
-                cmd.extend(['-vf', ','.join(filters)])
-            
-            # Video codec and quality settings
-            if compress:
-                cmd.extend(['-c:v', 'libx264', '-crf', '28', '-preset', 'medium'])
-            else:
-                quality_map = {
-                    'high': '18',
-                    'medium': '23',
-                    'low': '28'
-                }
-                crf = quality_map.get(quality, '23')
-                cmd.extend(['-c:v', 'libx264', '-crf', crf, '-preset', 'medium'])
-            
-            # Audio codec
-            cmd.extend(['-c:a', 'aac', '-b:a', '128k'])
+            outputs = [(optimal_crops[indexes[0]], sizes[indexes[0]], targets[indexes[0]]['output_path'])
+                       for indexes in chains.values()]
+            for crop, _, _ in outputs:
+                logger.info(f"Smart crop applied: crop={crop['width']}:{crop['height']}:{crop['x']}:{crop['y']} "
+                            f"(method: {crop['method']})")
+
+            metadata = probe_video(input_path)
+            copied = {output[2] for output in outputs if self._passthrough(metadata, output, compress)}
+            if copied:
+                logger.info(f"Source already matches {len(copied)} output(s), remuxing without re-encoding")
+
+            tracker = None
+            if on_progress:
+                tracker = ProgressTracker(analysis['video_info']['duration'], on_progress)
+
+            encoded_chunks = 1
+            encodes = [output for output in outputs if output[2] not in copied]
+            if chunks > 1 and encodes:
+                try:
+                    encoded_chunks = self._encode_chunked(
+                        input_path, encodes, quality, compress, chunks, tracker, metadata
+                    )
+                except RuntimeError as e:
+                    logger.warning(f"Chunked encoding failed, encoding in one process: {e}")
+                    # The single-process encode starts over from the first frame
+                    if tracker:
+                        tracker.reset()
+
+            # Everything not already written by the chunked encoder
+            remaining = outputs if encoded_chunks == 1 else [output for output in outputs if output[2] in copied]
+            if remaining:
+                cmd = self._ffmpeg_command(input_path, remaining, quality, compress, metadata=metadata)
+
+                # Execute FFmpeg command
+                logger.info(f"Executing: {' '.join(cmd)}")
+                # After a chunked encode this only remuxes, which the segments' progress already covers
+                result = run_ffmpeg(cmd, tracker.callback() if tracker and encoded_chunks == 1 else None)
+                
+                if result.returncode != 0:
+                    raise RuntimeError(f"FFmpeg failed: {result.stderr}")
+
+            for indexes in chains.values():
+                for index in indexes[1:]:
+                    shutil.copyfile(targets[indexes[0]]['output_path'], targets[index]['output_path'])
             
-            # Output settings
-            cmd.extend(['-movflags', '+faststart', '-y', output_path])
+            return {
+                'success': True,
+                'analysis': analysis,
+                'detections_found': analysis['detections'],
+                'encodes': len(outputs) - len(copied),
+                'remuxes': len(copied),
+                'chunks': encoded_chunks,
+                'results': [
+                    {
+                        'format': target.get('format'),
+                        'width': width,
+                        'height': height,
+                        'output_path': target['output_path'],
+                        'success': True,
+                        'crop': crop,
+                        'crop_method': crop['method'],
+                        'video_copied': outputs[chain_index][2] in copied
+                    }
+                    for target, (width, height), crop, chain_index in zip(
+                        targets, sizes, optimal_crops, self._chain_indexes(chains, len(targets))
+                    )
+                ]
+            }
             
-            # Execute FFmpeg command
+        except Exception as e:
+            logger.error(f"Video processing failed: {e}")
+            raise
+
+    def preview_video(self, input_path, output_path, target_width, target_height, duration=None):
+        """
+        Short low-resolution preview of process_video's output, using the
+        same crop decision; returns the preview path and the crop so the
+        full encode can follow later (or be skipped)
+        """
+        result = self.preview_video_targets(input_path, [{
+            'width': target_width,
+            'height': target_height,
+            'output_path': output_path
+        }], duration)
+
+        preview = result['results'][0]
+        return {
+            'success': True,
+            'preview_path': preview['preview_path'],
+            'preview': preview['preview'],
+            'crop': preview['crop'],
+            'analysis': result['analysis']
+        }
+
+    def preview_video_targets(self, input_path, targets, duration=None):
+        """
+        Previews of process_video_targets' outputs from one ffmpeg run: the
+        first `duration` seconds (default: VIDEO_PREVIEW_SECONDS), cropped as
+        the full encode would be, scaled down to PREVIEW_SHORT_EDGE and
+        encoded with x264 ultrafast, without audio
+        """
+        duration = duration or PREVIEW_SECONDS
+        if not self.check_ffmpeg():
+            raise RuntimeError("FFmpeg is not installed. Please install FFmpeg to process videos.")
+
+        try:
+            sizes = [(int(target['width']), int(target['height'])) for target in targets]
+            analysis = self.analyze_video_targets(input_path, sizes)
+            if not analysis:
+                raise ValueError("Failed to analyze video content")
+            optimal_crops = analysis['optimal_crops']
+
+            outputs = [
+                (crop, preview_size(*size), target['output_path'])
+                for crop, size, target in zip(optimal_crops, sizes, targets)
+            ]
+            cmd = self._ffmpeg_command(
+                input_path, outputs, preset=PREVIEW_PRESET, crf=PREVIEW_CRF,
+                output_args=['-t', f"{duration:g}", '-pix_fmt', 'yuv420p'], audio=False
+            )
+
             logger.info(f"Executing: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
+            result = run_ffmpeg(cmd)
             if result.returncode != 0:
                 raise RuntimeError(f"FFmpeg failed: {result.stderr}")
-            
+
+            video_duration = analysis['video_info']['duration']
             return {
                 'success': True,
                 'analysis': analysis,
-                'crop_method': optimal_crop['method'],
-                'detections_found': analysis['detections']
+                'results': [
+                    {
+                        'format': target.get('format'),
+                        'width': width,
+                        'height': height,
+                        'preview_path': target['output_path'],
+                        'preview': {
+                            'width': preview_width,
+                            'height': preview_height,
+                            'seconds': min(duration, video_duration) if video_duration else duration
+                        },
+                        'crop': crop,
+                        'crop_method': crop['method']
+                    }
+                    for target, (width, height), (crop, (preview_width, preview_height), _) in zip(
+                        targets, sizes, outputs
+                    )
+                ]
             }
-            
+
         except Exception as e:
-            logger.error(f"Video processing failed: {e}")
+            logger.error(f"Video preview failed: {e}")
             raise
 
+    def _passthrough(self, metadata, output, compress=False):
+        """Whether an (crop, (width, height), output_path) output can copy the source video"""
+        crop, (width, height), _ = output
+        return not compress and video_passthrough(
+            metadata, (crop['x'], crop['y'], crop['width'], crop['height']), width, height
+        )
+
+    def _chain_indexes(self, chains, count):
+        """Index of the output (filter chain) producing each target"""
+        indexes = [0] * count
+        for chain_index, targets in enumerate(chains.values()):
+            for target in targets:
+                indexes[target] = chain_index
+        return indexes
+
+    def _ffmpeg_command(self, input_path, outputs, quality='medium', compress=False,
+                        input_args=(), output_args=(), audio=True, metadata=None, preset='medium', crf=None):
+        """
+        ffmpeg command encoding [(crop, (width, height), output_path)] from a
+        single decode; the decoded video is split once per output
+        input_args go before the input, output_args after each output's
+        codec settings; audio=False writes video-only outputs
+        preset and crf override the x264 settings quality/compress pick
+        With probe metadata, outputs the source already matches copy its
+        video stream and audio is copied or dropped when it can be
+        """
+        copied = [metadata is not None and self._passthrough(metadata, output, compress) for output in outputs]
+        encoded = [i for i, copy in enumerate(copied) if not copy]
+        count = len(encoded)
+
+        # Smart crop filter - crop to area that matches target aspect ratio,
+        # then scale to exact target dimensions (the crop already matches the ratio)
+        graph = []
+        if count > 1:
+            graph.append(f"[0:v]split={count}" + ''.join(f"[s{i}]" for i in encoded))
+        for i in encoded:
+            crop, (width, height), _ = outputs[i]
+            source = f"[s{i}]" if count > 1 else "[0:v]"
+            graph.append(
+                f"{source}crop={crop['width']}:{crop['height']}:{crop['x']}:{crop['y']},"
+                f"scale={width}:{height}[v{i}]"
+            )
+
+        cmd = ['ffmpeg', '-y', *input_args, '-i', input_path]
+        if graph:
+            cmd.extend(['-filter_complex', ';'.join(graph)])
+
+        # Video codec and quality settings
+        if crf is None:
+            if compress:
+                crf = '28'
+            else:
+                quality_map = {
+                    'high': '18',
+                    'medium': '23',
+                    'low': '28'
+                }
+                crf = quality_map.get(quality, '23')
+
+        for i, (_, _, output_path) in enumerate(outputs):
+            if copied[i]:
+                cmd.extend(['-map', '0:v:0', '-c:v', 'copy'])
+            else:
+                cmd.extend(['-map', f"[v{i}]"])
+                cmd.extend(['-c:v', 'libx264', '-crf', crf, '-preset', preset, *output_args])
+            if not audio or (metadata is not None and not metadata['has_audio']):
+                cmd.append('-an')
+            elif metadata is not None:
+                cmd.extend(['-map', '0:a:0', *audio_args(metadata)])
+            else:
+                cmd.extend(['-map', '0:a:0?', '-c:a', 'aac', '-b:a', '128k'])
+            cmd.extend(['-movflags', '+faststart', output_path])
+        return cmd
+
+    def _plan_chunks(self, packets, chunks):
+        """
+        Split a video into up to `chunks` segments starting at keyframes
+        near equal-duration boundaries, from video_probe.probe_packets output
+        Returns [(start_time, frame_count)], or None without enough keyframes
+        """
+        if any(pts is None for pts, _ in packets):
+            return None
+        times = sorted(pts for pts, _ in packets)
+        keyframes = sorted(pts for pts, flags in packets if flags.startswith('K'))
+        if len(keyframes) < 2:
+            return None
+
+        first, last = times[0], times[-1]
+        boundaries = sorted({
+            min(keyframes, key=lambda k: abs(k - (first + (last - first) * i / chunks)))
+            for i in range(1, chunks)
+        })
+        boundaries = [k for k in boundaries if k > first]
+        if not boundaries:
+            return None
+
+        # Frames in presentation order between consecutive boundaries
+        starts = [first] + boundaries
+        indexes = [bisect.bisect_left(times, start) for start in starts] + [len(times)]
+        return [(start, indexes[i + 1] - indexes[i]) for i, start in enumerate(starts)]
+
+    def _encode_chunked(self, input_path, outputs, quality, compress, chunks, tracker=None, metadata=None):
+        """
+        Encode outputs as keyframe-aligned segments in parallel, then join
+        each output's segments with the concat demuxer and encode (or copy)
+        the audio once for the whole file
+        tracker (a ProgressTracker) sums the progress of every segment
+        Returns the number of segments encoded; 1 when the video cannot be
+        split, in which case nothing was written
+        """
+        packets = probe_packets(input_path)
+        plan = self._plan_chunks(packets, chunks) if packets else None
+        if not plan:
+            logger.warning("Chunked encoding needs ffprobe and several keyframes, encoding in one process")
+            return 1
+
+        # Share the cores between the segment encoders
+        threads = max(1, (os.cpu_count() or 1) // len(plan))
+
+        # Packet timestamps are absolute but ffmpeg adds the container's
+        # start_time to -ss, so boundaries are seeked relative to it
+        start_time = (metadata or probe_video(input_path)).get('start_time') or 0.0
+
+        with tempfile.TemporaryDirectory(prefix='chunks-') as work_dir:
+            def segment_path(chunk, output):
+                return os.path.join(work_dir, f"segment-{chunk:04d}-{output}.mp4")
+
+            def encode_segment(chunk):
+                start, frame_count = plan[chunk]
+                # Seeking just before the keyframe keeps it: an accurate seek
+                # drops frames before the requested time and ffprobe rounds
+                # timestamps to microseconds
+                input_args = ['-ss', f"{max(0.0, start - start_time - 0.0005):.6f}"] if chunk else []
+                cmd = self._ffmpeg_command(
+                    input_path,
+                    [(crop, size, segment_path(chunk, i)) for i, (crop, size, _) in enumerate(outputs)],
+                    quality, compress, input_args=input_args,
+                    output_args=['-frames:v', str(frame_count), '-threads', str(threads)], audio=False
+                )
+                result = run_ffmpeg(cmd, tracker.callback(chunk) if tracker else None)
+                if result.returncode != 0:
+                    raise RuntimeError(f"FFmpeg failed on segment {chunk}: {result.stderr}")
+
+            logger.info(f"Encoding {len(plan)} segments of {input_path} in parallel")
+            with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+                list(pool.map(encode_segment, range(len(plan))))
+
+            expected = sum(frame_count for _, frame_count in plan)
+            for i, (_, _, output_path) in enumerate(outputs):
+                list_path = os.path.join(work_dir, f"segments-{i}.txt")
+                with open(list_path, 'w') as f:
+                    for chunk in range(len(plan)):
+                        f.write(f"file '{segment_path(chunk, i)}'\n")
+
+                cmd = [
+                    'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path, '-i', input_path,
+                    '-map', '0:v', '-c:v', 'copy'
+                ]
+                if metadata is None:
+                    cmd.extend(['-map', '1:a:0?', '-c:a', 'aac', '-b:a', '128k'])
+                elif metadata['has_audio']:
+                    cmd.extend(['-map', '1:a:0', *audio_args(metadata)])
+                cmd.extend(['-movflags', '+faststart', output_path])
+                result = run_ffmpeg(cmd)
+                if result.returncode != 0:
+                    raise RuntimeError(f"FFmpeg concat failed: {result.stderr}")
+
+                # Segments must add up to exactly the source frames
+                encoded = len(probe_packets(output_path) or [])
+                if encoded != expected:
+                    raise RuntimeError(f"Chunked encode of {output_path} has {encoded} frames, expected {expected}")
+
+        return len(plan)
+
+def _pop_option(args, name):
+    """Remove '--name value' from args and return the value (None if absent)"""
+    if name not in args:
+        return None
+    index = args.index(name)
+    if index + 1 >= len(args):
+        print(f"{name} requires a value")
+        sys.exit(1)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+def _print_result(result, progress):
+    """Final JSON result; a single line when progress events are also on stdout"""
+    print(json.dumps(result) if progress else json.dumps(result, indent=2))
+
+def main_targets(args, chunks=None, progress=False, preview=None):
+    """Command line entry point for multi-target processing"""
+    if len(args) < 3:
+        print("Usage: python advanced_video_processor.py <input> --targets <targets_json> [quality] [compress]")
+        sys.exit(1)
+
+    input_path = args[0]
+    targets = json.loads(args[2])
+    quality = args[3] if len(args) > 3 else 'medium'
+    compress = args[4].lower() == 'true' if len(args) > 4 else False
+
+    for target in targets:
+        output_dir = os.path.dirname(target['output_path'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    processor = AdvancedVideoProcessor()
+
+    try:
+        if preview is not None:
+            result = processor.preview_video_targets(input_path, targets, preview)
+        else:
+            result = processor.process_video_targets(
+                input_path, targets, quality, compress, chunks, print_progress if progress else None
+            )
+        _print_result(result, progress)
+    except Exception as e:
+        logger.error(f"Processing failed: {e}")
+        print(json.dumps({'success': False, 'error': str(e)}))
+        sys.exit(1)
+
 def main():
     """Main function for command line usage"""
-    if len(sys.argv) < 5:
+    args = sys.argv[1:]
+
+    # Parallel keyframe-aligned segments, e.g. --chunks 8 (defaults to VIDEO_ENCODE_CHUNKS)
+    chunks = _pop_option(args, '--chunks')
+    chunks = int(chunks) if chunks else None
+
+    # JSON-lines progress events on stdout before the result line
+    progress = '--progress' in args
+    if progress:
+        args.remove('--progress')
+
+    # Short low-resolution preview instead of the full encode (0 = VIDEO_PREVIEW_SECONDS)
+    preview_seconds = _pop_option(args, '--preview-seconds')
+    preview = None
+    if '--preview' in args:
+        args.remove('--preview')
+        preview = float(preview_seconds) if preview_seconds else 0
+
+    # Dense subject positions instead of processing, e.g. <input> --track
+    if '--track' in args:
+        args.remove('--track')
+        if not args:
+            print("Usage: python advanced_video_processor.py <input> --track")
+            sys.exit(1)
+        try:
+            print(json.dumps(AdvancedVideoProcessor().track_subjects(args[0])))
+        except Exception as e:
+            logger.error(f"Tracking failed: {e}")
+            print(json.dumps({'success': False, 'error': str(e)}))
+            sys.exit(1)
+        return
+
+    if len(args) > 1 and args[1] == '--targets':
+        main_targets(args, chunks, progress, preview)
+        return
+
+    if len(args) < 4:
         print("Usage: python advanced_video_processor.py <input> <output> <width> <height> [quality] [compress]")
+        print("       python advanced_video_processor.py <input> --targets <targets_json> [quality] [compress]")
+        print("Options: --chunks 8  (encode keyframe-aligned segments in parallel)")
+        print("         --progress  (JSON-lines progress events on stdout)")
+        print("         --preview [--preview-seconds 10]  (fast low-resolution preview and crop)")
+        print("       python advanced_video_processor.py <input> --track  (dense subject positions as JSON)")
         sys.exit(1)
     
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    target_width = int(sys.argv[3])
-    target_height = int(sys.argv[4])
-    quality = sys.argv[5] if len(sys.argv) > 5 else 'medium'
-    compress = sys.argv[6].lower() == 'true' if len(sys.argv) > 6 else False
+    input_path = args[0]
+    output_path = args[1]
+    target_width = int(args[2])
+    target_height = int(args[3])
+    quality = args[4] if len(args) > 4 else 'medium'
+    compress = args[5].lower() == 'true' if len(args) > 5 else False
     
     processor = AdvancedVideoProcessor()
     
     try:
-        result = processor.process_video(
-            input_path, output_path, target_width, target_height, quality, compress
-        )
-        print(json.dumps(result, indent=2))
+        if preview is not None:
+            result = processor.preview_video(input_path, output_path, target_width, target_height, preview)
+        else:
+            result = processor.process_video(
+                input_path, output_path, target_width, target_height, quality, compress, chunks,
+                print_progress if progress else None
+            )
+        _print_result(result, progress)
     except Exception as e:
         logger.error(f"Processing failed: {e}")
         print(json.dumps({'success': False, 'error': str(e)}))
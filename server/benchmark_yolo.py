@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark YOLO detector backends on CPU
+Reports load time, per-image latency and how closely each backend's boxes
+agree with the first backend (ultralytics when installed); run it on
+held-out images before switching YOLO_ONNX_MODEL to an int8 export
+"""
+
+import sys
+import json
+import time
+import logging
+import cv2
+import numpy as np
+
+from yolo_backend import load_yolo, backend_available, DEFAULT_ONNX_MODEL
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Boxes of the same class overlapping at least this much count as agreeing
+MATCH_IOU = 0.5
+
+
+def box_iou(a, b):
+    """IoU matrix between (N, 4) and (M, 4) corner boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+
+def agreement(reference, boxes):
+    """Greedy same-class matching of boxes against reference boxes"""
+    matched = []
+    if len(reference) and len(boxes):
+        iou = box_iou(reference, boxes)
+        iou[reference[:, None, 5] != boxes[None, :, 5]] = 0
+        while iou.size and iou.max() >= MATCH_IOU:
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            matched.append(float(iou[i, j]))
+            iou[i, :] = 0
+            iou[:, j] = 0
+
+    return {
+        'reference_boxes': len(reference),
+        'boxes': len(boxes),
+        'matched': len(matched),
+        'mean_iou': round(float(np.mean(matched)), 4) if matched else None
+    }
+
+
+def benchmark(backend, model_path, images, runs, threads, conf):
+    """Load one backend and time it on every image; returns (summary, boxes per image)"""
+    start = time.perf_counter()
+    model = load_yolo(backend, model_path, threads)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    detections = []
+    for image in images:
+        # Warm-up run also provides the boxes
+        detections.append(model.detect(image, conf=conf))
+        for _ in range(runs):
+            start = time.perf_counter()
+            model.detect(image, conf=conf)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    summary = {
+        'backend': backend,
+        'model': model_path,
+        'load_ms': round(load_ms, 1),
+        'latency_ms': {
+            'median': round(float(np.median(latencies)), 2),
+            'p90': round(float(np.percentile(latencies, 90)), 2),
+            'mean': round(float(np.mean(latencies)), 2)
+        }
+    }
+    return summary, detections
+
+
+def _pop_option(args, name, default=None):
+    """Remove '--name value' from args and return the value"""
+    if name not in args:
+        return default
+    index = args.index(name)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
+def main():
+    """Main function for command line usage"""
+    args = sys.argv[1:]
+    onnx_model = _pop_option(args, '--onnx', DEFAULT_ONNX_MODEL)
+    int8_model = _pop_option(args, '--int8', onnx_model.replace('.onnx', '.int8.onnx'))
+    runs = int(_pop_option(args, '--runs', 10))
+    threads = _pop_option(args, '--threads')
+    threads = int(threads) if threads else None
+    conf = float(_pop_option(args, '--conf', 0.25))
+
+    if not args:
+        print("Usage: python benchmark_yolo.py <image> [<image> ...] [options]")
+        print("Options: --onnx yolov8n.onnx  --int8 yolov8n.int8.onnx  --runs 10")
+        print("         --threads 2  --conf 0.25")
+        sys.exit(1)
+
+    images = []
+    for path in args:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Could not read image: {path}", file=sys.stderr)
+            sys.exit(1)
+        images.append(image)
+
+    candidates = [('ultralytics', 'yolov8n.pt'), ('onnx', onnx_model), ('onnx', int8_model)]
+    results = []
+    reference = None
+    for backend, model_path in candidates:
+        if not backend_available(backend):
+            logger.warning(f"Skipping {backend}: not installed")
+            continue
+        try:
+            summary, detections = benchmark(backend, model_path, images, runs, threads, conf)
+        except Exception as e:
+            logger.warning(f"Skipping {backend} ({model_path}): {e}")
+            continue
+
+        if reference is None:
+            reference = detections
+        else:
+            summary['agreement'] = [agreement(r, d) for r, d in zip(reference, detections)]
+            reference_boxes = sum(a['reference_boxes'] for a in summary['agreement'])
+            matched = sum(a['matched'] for a in summary['agreement'])
+            summary['recall'] = round(matched / reference_boxes, 4) if reference_boxes else None
+        results.append(summary)
+
+    print(json.dumps({'images': args, 'runs': runs, 'threads': threads, 'results': results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
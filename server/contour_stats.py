@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Bulk contour measurements
+Computes the same areas and bounding rectangles as cv2.contourArea and
+cv2.boundingRect for a whole cv2.findContours result at once, so contour
+scoring can be done with NumPy masks instead of a Python loop
+"""
+
+import numpy as np
+
+
+def contour_stats(contours):
+    """
+    Areas (N,) and bounding rects (N, 4) as x, y, width, height for a list
+    of contours
+    """
+    count = len(contours)
+    if count == 0:
+        return np.zeros(0), np.zeros((0, 4), dtype=np.int64)
+
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.intp, count=count)
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+    xs, ys = points[:, 0], points[:, 1]
+
+    starts = np.zeros(count, dtype=np.intp)
+    np.cumsum(lengths[:-1], out=starts[1:])
+
+    # Shoelace formula; each contour closes back onto its first point
+    following = np.arange(1, len(points) + 1)
+    following[starts + lengths - 1] = starts
+    cross = xs * ys[following] - xs[following] * ys
+    areas = np.abs(np.add.reduceat(cross, starts)) / 2.0
+
+    left = np.minimum.reduceat(xs, starts)
+    top = np.minimum.reduceat(ys, starts)
+    right = np.maximum.reduceat(xs, starts)
+    bottom = np.maximum.reduceat(ys, starts)
+    rects = np.stack([left, top, right - left + 1, bottom - top + 1], axis=1)
+
+    return areas, rects
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Crop planning over an importance map
+Detections are rasterised into a low-resolution importance map once; a
+summed-area table then scores every window position of every requested
+aspect ratio, so all target crops come from one analysis.
+"""
+
+import numpy as np
+
+# Longest edge (in cells) of the importance map
+PLANNER_GRID = 128
+
+
+def crop_size(width, height, target_width, target_height):
+    """Largest (crop_width, crop_height) of a width x height image with the target aspect ratio"""
+    target_ratio = target_width / target_height
+    if target_ratio > width / height:
+        # Target is wider, keep the full width
+        return width, int(width / target_ratio)
+    # Target is taller, keep the full height
+    return int(height * target_ratio), height
+
+
+def analysis_regions(subject_analysis):
+    """
+    Importance regions from a subject analysis as (x, y, width, height, weight)
+    fractions of the image: its weighted 'regions' list when present,
+    otherwise its bounding box
+    """
+    if not subject_analysis:
+        return []
+
+    regions = subject_analysis.get('regions') or []
+    if not regions and subject_analysis.get('bounding_box'):
+        regions = [subject_analysis['bounding_box']]
+
+    return [
+        (r['x'] / 100, r['y'] / 100, r['width'] / 100, r['height'] / 100, r.get('weight', 1.0))
+        for r in regions
+    ]
+
+
+def importance_map(regions, aspect_ratio, grid=PLANNER_GRID):
+    """
+    Rasterise regions [(x, y, width, height, weight)] given as fractions of
+    an image with the given aspect ratio (width / height)
+    Each region spreads its weight evenly over the cells it covers, so a
+    window's sum is the weighted share of every region it keeps
+    """
+    if aspect_ratio >= 1:
+        grid_width, grid_height = grid, max(1, round(grid / aspect_ratio))
+    else:
+        grid_width, grid_height = max(1, round(grid * aspect_ratio)), grid
+
+    regions = np.asarray(regions, dtype=np.float64).reshape(-1, 5)
+    x0 = np.clip(np.floor(regions[:, 0] * grid_width), 0, grid_width - 1).astype(np.intp)
+    y0 = np.clip(np.floor(regions[:, 1] * grid_height), 0, grid_height - 1).astype(np.intp)
+    x1 = np.clip(np.ceil((regions[:, 0] + regions[:, 2]) * grid_width), x0 + 1, grid_width).astype(np.intp)
+    y1 = np.clip(np.ceil((regions[:, 1] + regions[:, 3]) * grid_height), y0 + 1, grid_height).astype(np.intp)
+    density = np.maximum(regions[:, 4], 0) / ((x1 - x0) * (y1 - y0))
+
+    # Paint every rectangle at once through a 2D difference array
+    diff = np.zeros((grid_height + 1, grid_width + 1))
+    np.add.at(diff, (y0, x0), density)
+    np.add.at(diff, (y0, x1), -density)
+    np.add.at(diff, (y1, x0), -density)
+    np.add.at(diff, (y1, x1), density)
+    return diff.cumsum(axis=0).cumsum(axis=1)[:grid_height, :grid_width]
+
+
+def plan_crops(width, height, targets, regions, grid=PLANNER_GRID):
+    """
+    Largest crop of a width x height image for every (target_width,
+    target_height) that keeps the most importance
+    Ties (e.g. every subject fits) go to the window centred closest to the
+    importance centroid; without regions crops are centred
+    Returns [(crop_x, crop_y, crop_width, crop_height)] in target order
+    """
+    sizes = [crop_size(width, height, tw, th) for tw, th in targets]
+
+    weights = importance_map(regions, width / height, grid) if len(regions) else None
+    total = weights.sum() if weights is not None else 0.0
+    if total <= 0:
+        return [((width - cw) // 2, (height - ch) // 2, cw, ch) for cw, ch in sizes]
+
+    grid_height, grid_width = weights.shape
+    table = np.zeros((grid_height + 1, grid_width + 1))
+    table[1:, 1:] = weights.cumsum(axis=0).cumsum(axis=1)
+
+    # Importance centroid in cells
+    centroid_x = (weights.sum(axis=0) * (np.arange(grid_width) + 0.5)).sum() / total
+    centroid_y = (weights.sum(axis=1) * (np.arange(grid_height) + 0.5)).sum() / total
+
+    plans = {}
+    crops = []
+    for cw, ch in sizes:
+        if (cw, ch) not in plans:
+            cells_x = min(grid_width, max(1, round(cw / width * grid_width)))
+            cells_y = min(grid_height, max(1, round(ch / height * grid_height)))
+            free_x = grid_width - cells_x + 1
+            free_y = grid_height - cells_y + 1
+
+            # Importance kept by the window at every position
+            kept = (
+                table[cells_y:, cells_x:]
+                - table[:free_y, cells_x:]
+                - table[cells_y:, :free_x]
+                + table[:free_y, :free_x]
+            )
+            best = kept >= kept.max() - total * 1e-9
+
+            offsets_y, offsets_x = np.mgrid[0:free_y, 0:free_x]
+            distance = (
+                (offsets_x + cells_x / 2 - centroid_x) ** 2
+                + (offsets_y + cells_y / 2 - centroid_y) ** 2
+            )
+            index = np.argmin(np.where(best, distance, np.inf))
+            offset_y, offset_x = np.unravel_index(index, kept.shape)
+
+            # Centre the pixel window where the grid window was centred
+            center_x = (offset_x + cells_x / 2) / grid_width * width
+            center_y = (offset_y + cells_y / 2) / grid_height * height
+            crop_x = int(max(0, min(width - cw, round(center_x - cw / 2))))
+            crop_y = int(max(0, min(height - ch, round(center_y - ch / 2))))
+            plans[(cw, ch)] = (crop_x, crop_y, cw, ch)
+        crops.append(plans[(cw, ch)])
+
+    return crops
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for detection results
+Entries are keyed by a hash of the file contents plus the detector
+configuration and stored as JSON files on local disk. Writes are atomic and
+eviction is least-recently-used by file mtime, so several worker processes
+can share one cache directory; each process keeps a running size estimate
+so the directory is only scanned now and then.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape or meaning of cached results changes
+CACHE_VERSION = 3
+
+DEFAULT_MAX_BYTES = int(os.environ.get('DETECTION_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+# Writes between full directory scans; a scan also runs as soon as this
+# process's running size estimate exceeds max_bytes
+EVICT_SCAN_WRITES = 256
+
+# Eviction frees space down to this share of max_bytes, so a full cache is
+# not rescanned on every write
+EVICT_LOW_WATER = 0.9
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DetectionCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """Cache stored under directory, evicted down to max_bytes"""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        # Size of the directory as of the last scan plus this process's
+        # writes since (None until the first scan); other processes' writes
+        # are picked up by the periodic scan
+        self._estimated_bytes = None
+        self._writes_since_scan = 0
+
+    def key(self, path, config):
+        """Cache key for a media file and the configuration that analysed it"""
+        config_json = json.dumps({'version': CACHE_VERSION, 'config': config}, sort_keys=True)
+        digest = hashlib.sha256(file_digest(path).encode())
+        digest.update(config_json.encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Cached result for key, or None"""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r') as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {entry_path}: {e}")
+            return None
+
+        # Mark as recently used for LRU eviction
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        """Store a JSON-serialisable result atomically"""
+        entry_path = self._entry_path(key)
+        entry_dir = os.path.dirname(entry_path)
+        try:
+            os.makedirs(entry_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(value, f, default=float)
+                size = os.path.getsize(tmp_path)
+                os.replace(tmp_path, entry_path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write cache entry {entry_path}: {e}")
+            return
+
+        # Scanning the directory is O(entries), so only do it when the
+        # estimate says the cache may be full or the estimate is stale
+        self._writes_since_scan += 1
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += size
+        if (self._estimated_bytes is None or self._estimated_bytes > self.max_bytes
+                or self._writes_since_scan >= EVICT_SCAN_WRITES):
+            self.evict()
+
+    def evict(self):
+        """
+        Scan the cache and, when it exceeds max_bytes, delete least
+        recently used entries until it fits EVICT_LOW_WATER x max_bytes
+        """
+        lock_path = os.path.join(self.directory, '.evict.lock')
+        with open(lock_path, 'a') as lock:
+            # Only one process needs to evict at a time
+            if fcntl:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return
+
+            entries = []
+            total = 0
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith('.json'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, entry_path in entries:
+                    try:
+                        os.remove(entry_path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    if total <= self.max_bytes * EVICT_LOW_WATER:
+                        break
+
+            self._estimated_bytes = total
+            self._writes_since_scan = 0
+
+
+def default_cache():
+    """Cache configured by DETECTION_CACHE_DIR, or None when caching is off"""
+    directory = os.environ.get('DETECTION_CACHE_DIR')
+    return DetectionCache(directory) if directory else None
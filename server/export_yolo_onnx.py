@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Export YOLOv8 weights to ONNX for the onnx detector backend
+Optionally writes an int8 copy next to it, statically quantized (QDQ) with
+activation ranges calibrated on sample images, and checks its boxes against
+the float model before it is used
+"""
+
+import os
+import sys
+import logging
+import cv2
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Exported YOLOv8 heads concatenate box coordinates (0-640) with class scores
+# (0-1) in one tensor, which a single int8 scale cannot represent, so the
+# detection head stays in float
+HEAD_NODE_PREFIX = '/model.22/'
+
+# Share of the float model's boxes the int8 model must also find
+MIN_INT8_RECALL = 0.9
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+
+def export_onnx(weights='yolov8n.pt', imgsz=640):
+    """
+    Export weights with ultralytics; returns the .onnx path
+    The batch axis is dynamic so several images can share one forward pass
+    """
+    from ultralytics import YOLO
+    return YOLO(weights).export(format='onnx', imgsz=imgsz, opset=12, dynamic=True)
+
+
+def calibration_images(paths):
+    """BGR images from files and directories of images"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+
+    images = [image for image in (cv2.imread(f) for f in files) if image is not None]
+    if not images:
+        raise ValueError(f"No readable calibration images in {', '.join(paths)}")
+    return images
+
+
+def quantize_int8(onnx_path, images, output_path=None):
+    """
+    Write an int8 copy of an ONNX model, keeping the class names the exporter
+    stored in its metadata; returns the new path
+    Weights are quantized per channel and activation ranges come from running
+    the float model on images letterboxed exactly as OnnxYolo feeds them
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        quantize_static, CalibrationDataReader, QuantFormat, QuantType
+    )
+    from yolo_backend import OnnxYolo
+
+    float_model = OnnxYolo(onnx_path)
+
+    class LetterboxReader(CalibrationDataReader):
+        def __init__(self):
+            self.blobs = iter(float_model._letterbox(image)[0] for image in images)
+
+        def get_next(self):
+            blob = next(self.blobs, None)
+            return None if blob is None else {float_model.input_name: blob}
+
+    source = onnx.load(onnx_path)
+    head_nodes = [node.name for node in source.graph.node if node.name.startswith(HEAD_NODE_PREFIX)]
+
+    output_path = output_path or onnx_path.replace('.onnx', '.int8.onnx')
+    quantize_static(
+        onnx_path, output_path, LetterboxReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        nodes_to_exclude=head_nodes
+    )
+
+    quantized = onnx.load(output_path)
+    existing = {prop.key for prop in quantized.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            quantized.metadata_props.append(prop)
+    onnx.save(quantized, output_path)
+    return output_path
+
+
+def int8_recall(onnx_path, int8_path, images, conf=0.25):
+    """Share of the float model's boxes the int8 model matches, and per-image agreement"""
+    from yolo_backend import OnnxYolo
+    from benchmark_yolo import agreement
+
+    reference = OnnxYolo(onnx_path).detect_batch(images, conf)
+    quantized = OnnxYolo(int8_path).detect_batch(images, conf)
+    results = [agreement(r, q) for r, q in zip(reference, quantized)]
+
+    reference_boxes = sum(r['reference_boxes'] for r in results)
+    matched = sum(r['matched'] for r in results)
+    return (matched / reference_boxes if reference_boxes else 1.0), results
+
+
+def _pop_option(args, name, default=None):
+    """Remove '--name value' from args and return the value"""
+    if name not in args:
+        return default
+    index = args.index(name)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
+def main():
+    """Main function for command line usage"""
+    args = sys.argv[1:]
+    onnx_path = _pop_option(args, '--onnx')
+    calibrate = _pop_option(args, '--calibrate')
+    int8 = '--int8' in args
+    if int8:
+        args.remove('--int8')
+
+    if len(args) > 1 or (int8 and not calibrate):
+        print("Usage: python export_yolo_onnx.py [weights.pt] [--onnx model.onnx]")
+        print("       [--int8 --calibrate <image directory>]")
+        sys.exit(1)
+
+    if not onnx_path:
+        onnx_path = export_onnx(args[0] if args else 'yolov8n.pt')
+        logger.info(f"Exported {onnx_path}")
+
+    if int8:
+        images = calibration_images([calibrate])
+        int8_path = quantize_int8(onnx_path, images)
+        logger.info(f"Quantized {int8_path} on {len(images)} calibration images")
+
+        # Calibration images double as a smoke test; benchmark_yolo.py on
+        # held-out images is the real comparison
+        recall, _ = int8_recall(onnx_path, int8_path, images)
+        logger.info(f"int8 model matches {recall:.1%} of the float model's boxes")
+        if recall < MIN_INT8_RECALL:
+            logger.error(
+                f"int8 recall {recall:.1%} is below {MIN_INT8_RECALL:.0%}; "
+                f"keep using {onnx_path}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
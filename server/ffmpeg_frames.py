@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Raw frame reader over an ffmpeg pipe
+ffmpeg decodes, picks the sampled frames, scales them to analysis size and
+converts them to RGB in its own threads; Python only copies bytes from the
+pipe into preallocated buffers and hands out NumPy views of them.
+"""
+
+import logging
+import threading
+import subprocess
+from collections import deque
+import numpy as np
+
+from media_frame import DEFAULT_ANALYSIS_MAX_EDGE
+from ffmpeg_progress import STDERR_TAIL_LINES
+from video_probe import ffmpeg_version
+
+logger = logging.getLogger(__name__)
+
+# -fps_mode replaced -vsync in ffmpeg 5.1
+FPS_MODE_VERSION = (5, 1)
+
+
+def passthrough_args():
+    """Arguments that keep every selected frame without duplicating or dropping any"""
+    version = ffmpeg_version()
+    if version is not None and version < FPS_MODE_VERSION:
+        return ['-vsync', 'passthrough']
+    return ['-fps_mode', 'passthrough']
+
+
+def analysis_size(width, height, max_edge=None):
+    """(width, height) of a width x height frame with its longest edge capped at max_edge"""
+    if max_edge is None:
+        max_edge = DEFAULT_ANALYSIS_MAX_EDGE
+    ratio = min(1.0, max_edge / max(width, height))
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+class FfmpegFrameReader:
+    def __init__(self, path, width, height, fps=None, select=None, keyframes_only=False,
+                 max_frames=None, buffers=1, gray=False):
+        """
+        Frames of path as width x height RGB arrays (single-channel 8-bit
+        arrays with gray=True)
+        fps resamples the stream (e.g. sample_frames / duration), select is an
+        ffmpeg select expression and keyframes_only skips decoding every
+        predicted frame
+        Iterating yields views into `buffers` reused arrays, so a frame stays
+        valid until `buffers` more frames have been read; copy it to keep it
+        Iteration raises RuntimeError when ffmpeg fails, so callers can fall
+        back to another reader
+        """
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.select = select
+        self.keyframes_only = keyframes_only
+        self.max_frames = max_frames
+        self.buffers = max(1, buffers)
+        self.gray = gray
+
+    def command(self):
+        """ffmpeg command writing rgb24 (or gray) frames to stdout"""
+        filters = []
+        if self.select:
+            filters.append(f"select='{self.select}'")
+        if self.fps:
+            filters.append(f"fps={self.fps}")
+        filters.append(f"scale={self.width}:{self.height}")
+
+        cmd = ['ffmpeg', '-v', 'error', '-nostdin']
+        if self.keyframes_only:
+            cmd.extend(['-skip_frame', 'nokey'])
+        cmd.extend(['-i', self.path, '-an', '-sn', '-vf', ','.join(filters), *passthrough_args()])
+        if self.max_frames:
+            cmd.extend(['-frames:v', str(self.max_frames)])
+        cmd.extend(['-f', 'rawvideo', '-pix_fmt', 'gray' if self.gray else 'rgb24', '-'])
+        return cmd
+
+    def __iter__(self):
+        shape = (self.height, self.width) if self.gray else (self.height, self.width, 3)
+        storage = [bytearray(int(np.prod(shape))) for _ in range(self.buffers)]
+        views = [np.frombuffer(buffer, dtype=np.uint8).reshape(shape) for buffer in storage]
+
+        process = subprocess.Popen(
+            self.command(), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0
+        )
+
+        # Drain stderr alongside stdout so a chatty ffmpeg never blocks on a
+        # full pipe
+        tail = deque(maxlen=STDERR_TAIL_LINES)
+        reader = threading.Thread(target=lambda: tail.extend(process.stderr), daemon=True)
+        reader.start()
+
+        index = 0
+        finished = False
+        try:
+            while _read_into(process.stdout, memoryview(storage[index % self.buffers])):
+                yield views[index % self.buffers]
+                index += 1
+            finished = True
+        finally:
+            # Stopping early kills ffmpeg, which is not a failure
+            if not finished:
+                process.kill()
+            process.stdout.close()
+            returncode = process.wait()
+            reader.join()
+            process.stderr.close()
+
+        stderr = b''.join(tail).decode(errors='replace').strip()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed reading {self.path} (exit {returncode}): {stderr}")
+        if not index and stderr:
+            raise RuntimeError(f"ffmpeg produced no frames for {self.path}: {stderr}")
+
+
+def _read_into(stream, buffer):
+    """Fill buffer from an unbuffered pipe; False when the stream ends first"""
+    filled = 0
+    while filled < len(buffer):
+        count = stream.readinto(buffer[filled:])
+        if not count:
+            return False
+        filled += count
+    return True
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Run ffmpeg with structured progress
+ffmpeg writes key=value blocks to stdout with -progress pipe:1; each block
+becomes a progress event with percent and ETA. stderr is kept as a bounded
+tail for error messages instead of being buffered whole.
+"""
+
+import sys
+import json
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Lines of ffmpeg stderr kept for error messages
+STDERR_TAIL_LINES = 200
+
+
+def _number(value):
+    """Float from an ffmpeg progress value ('1.5x', 'N/A', ...), or None"""
+    try:
+        return float(value.rstrip('x'))
+    except (AttributeError, ValueError):
+        return None
+
+
+class ProgressTracker:
+    def __init__(self, duration, on_progress, stage='encode'):
+        """
+        Combine progress of one or more ffmpeg runs covering duration
+        seconds of media (e.g. parallel segments) into events passed to
+        on_progress(event)
+        """
+        self.duration = duration or 0
+        self.on_progress = on_progress
+        self.stage = stage
+        self.started = time.monotonic()
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Forget every run so far, e.g. before redoing an encode that failed"""
+        with self.lock:
+            self.started = time.monotonic()
+            self.runs = {}
+
+    def callback(self, key=0):
+        """Progress callback for run_ffmpeg reporting as run key"""
+        def update(fields):
+            self.update(key, fields)
+        return update
+
+    def update(self, key, fields):
+        """Record one progress block of run key and emit the combined event"""
+        out_time = _number(fields.get('out_time_us') or fields.get('out_time_ms'))
+        with self.lock:
+            run = self.runs.setdefault(key, {'out_time_s': 0.0, 'frame': 0, 'fps': None, 'speed': None})
+            if out_time is not None and out_time >= 0:
+                run['out_time_s'] = out_time / 1e6
+            run['frame'] = int(_number(fields.get('frame')) or run['frame'])
+            run['fps'] = _number(fields.get('fps'))
+            run['speed'] = _number(fields.get('speed'))
+            run['done'] = fields.get('progress') == 'end'
+            event = self._event()
+
+        try:
+            self.on_progress(event)
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
+
+    def _event(self):
+        """Progress event over every run so far"""
+        runs = self.runs.values()
+        done = sum(run['out_time_s'] for run in runs)
+        elapsed = time.monotonic() - self.started
+        speeds = [run['speed'] for run in runs if run['speed'] and not run.get('done')]
+        rates = [run['fps'] for run in runs if run['fps'] and not run.get('done')]
+
+        event = {
+            'event': 'progress',
+            'stage': self.stage,
+            'frame': sum(run['frame'] for run in runs),
+            'fps': round(sum(rates), 2) if rates else None,
+            'speed': round(sum(speeds), 3) if speeds else None,
+            'out_time_s': round(done, 3),
+            'duration_s': round(self.duration, 3),
+            'elapsed_s': round(elapsed, 3),
+            'percent': None,
+            'eta_s': None
+        }
+        if self.duration > 0:
+            # The last block reports the last frame's start time
+            done = self.duration if all(run.get('done') for run in runs) else min(done, self.duration)
+            event['percent'] = round(done / self.duration * 100, 1)
+            remaining = self.duration - done
+            if speeds:
+                event['eta_s'] = round(remaining / sum(speeds), 1)
+            elif done > 0:
+                event['eta_s'] = round(elapsed * remaining / done, 1)
+        return event
+
+
+def print_progress(event):
+    """on_progress that writes each event as a JSON line to stdout"""
+    sys.stdout.write(json.dumps(event) + '\n')
+    sys.stdout.flush()
+
+
+def run_ffmpeg(cmd, on_update=None, stderr_lines=STDERR_TAIL_LINES):
+    """
+    Run an ffmpeg command (['ffmpeg', ...]) reporting progress
+    on_update(fields) gets each -progress block as a dict (out_time_us,
+    frame, fps, speed, progress, ...); see ProgressTracker.callback
+    Returns a CompletedProcess whose stderr holds the last stderr_lines lines
+    """
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+        text=True, errors='replace'
+    )
+
+    tail = deque(maxlen=stderr_lines)
+    reader = threading.Thread(target=lambda: tail.extend(process.stderr), daemon=True)
+    reader.start()
+
+    fields = {}
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+        if not key:
+            continue
+        fields[key] = value
+        if key == 'progress':
+            if on_update:
+                on_update(fields)
+            fields = {}
+
+    returncode = process.wait()
+    reader.join()
+    return subprocess.CompletedProcess(cmd, returncode, None, ''.join(tail))
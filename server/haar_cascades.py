@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Process-wide registry of OpenCV Haar cascade classifiers
+Each cascade XML is parsed once, on first use, and shared by every caller
+"""
+
+import time
+import threading
+import cv2
+
+FRONTAL_FACE = 'haarcascade_frontalface_default.xml'
+
+_classifiers = {}
+_load_ms = {}
+_lock = threading.Lock()
+
+
+def get_cascade(name=FRONTAL_FACE):
+    """Loaded classifier for a cascade file in cv2.data.haarcascades"""
+    classifier = _classifiers.get(name)
+    if classifier is not None:
+        return classifier
+
+    with _lock:
+        classifier = _classifiers.get(name)
+        if classifier is None:
+            start = time.perf_counter()
+            classifier = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+            if classifier.empty():
+                raise ValueError(f"Could not load Haar cascade: {name}")
+            _load_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+            _classifiers[name] = classifier
+    return classifier
+
+
+def load_times():
+    """Milliseconds spent loading each cascade in this process"""
+    return dict(_load_ms)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Reduced-size JPEG decoding
+libjpeg can decode at 1/2, 1/4 or 1/8 scale almost for free; these helpers
+pick the largest reduction that still leaves enough pixels for the output
+"""
+
+import math
+
+# EXIF orientations that swap width and height
+EXIF_ORIENTATION_TAG = 0x0112
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def oriented_size(img):
+    """Image size after EXIF orientation is applied, without decoding pixels"""
+    width, height = img.size
+    try:
+        if img.getexif().get(EXIF_ORIENTATION_TAG) in ROTATED_ORIENTATIONS:
+            return height, width
+    except Exception:
+        pass
+    return width, height
+
+
+def crop_decode_scale(width, height, targets):
+    """
+    Smallest decode scale (<= 1) at which the largest aspect-ratio crop of a
+    width x height image still covers every (target_width, target_height)
+    Returns 0 for an empty target list
+    """
+    scale = 0.0
+    original_ratio = width / height
+    for target_width, target_height in targets:
+        if target_width / target_height > original_ratio:
+            # Crop keeps the full width
+            scale = max(scale, target_width / width)
+        else:
+            # Crop keeps the full height
+            scale = max(scale, target_height / height)
+    return min(1.0, scale)
+
+
+def draft_to_size(img, min_size):
+    """
+    Ask the JPEG decoder to reduce by 1/2, 1/4 or 1/8 while keeping at least
+    min_size = (width, height) in display orientation
+    Must be called before the pixels are loaded; a no-op for other formats
+    Returns the reduction factor applied (1 when nothing changed)
+    """
+    if img.format != 'JPEG' or not min_size:
+        return 1
+
+    width, height = min_size
+    if oriented_size(img) != img.size:
+        width, height = height, width
+
+    original_width = img.size[0]
+    img.draft(None, (max(1, math.ceil(width)), max(1, math.ceil(height))))
+    return max(1, round(original_width / img.size[0]))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Decoded media frame shared by detection, fallbacks and rendering
+Decodes an image once and hands out cached RGB, BGR, grayscale and PIL views
+"""
+
+import os
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from jpeg_draft import oriented_size, crop_decode_scale, draft_to_size
+
+# Longest edge (in pixels) of the proxy that subject detection runs on.
+# Detection only produces relative boxes, so a bounded proxy gives nearly the
+# same crop decision for a fraction of the cost. 0 disables the proxy.
+DEFAULT_ANALYSIS_MAX_EDGE = int(os.environ.get('ANALYSIS_MAX_EDGE', '1024'))
+
+
+class MediaFrame:
+    def __init__(self, image=None, bgr=None, path=None, rgb=None):
+        """
+        Wrap an already decoded image
+        Pass a PIL image (render mode, e.g. RGB or RGBA), a BGR or an RGB array
+        """
+        if image is None and bgr is None and rgb is None:
+            raise ValueError("MediaFrame needs a PIL image, a BGR or an RGB array")
+
+        self.path = path
+        self._pil = image
+        self._bgr = bgr
+        self._rgb = rgb
+        self._gray = None
+
+        # Source pixels per frame pixel (x, y); not 1 for analysis proxies
+        # and reduced-size decodes
+        self.scale = (1.0, 1.0)
+
+        if image is not None:
+            self.width, self.height = image.size
+        else:
+            self.height, self.width = (bgr if bgr is not None else rgb).shape[:2]
+
+    @classmethod
+    def open(cls, path, targets=None, analysis_max_edge=None, analysis=True):
+        """
+        Decode an image file once, applying its EXIF orientation
+        When targets [(width, height), ...] are given, JPEGs are decoded at the
+        largest 1/2, 1/4 or 1/8 reduction that still covers every target crop
+        and, unless analysis is False, the analysis proxy (an empty list means
+        analysis only)
+        """
+        with Image.open(path) as img:
+            source_width, source_height = oriented_size(img)
+
+            if targets is not None:
+                if analysis_max_edge is None:
+                    analysis_max_edge = DEFAULT_ANALYSIS_MAX_EDGE
+                analysis_scale = 1.0 if analysis else 0.0
+                if analysis and analysis_max_edge:
+                    analysis_scale = min(1.0, analysis_max_edge / max(source_width, source_height))
+
+                scale = max(crop_decode_scale(source_width, source_height, targets), analysis_scale)
+                draft_to_size(img, (source_width * scale, source_height * scale))
+
+            img = ImageOps.exif_transpose(img)
+
+            # Convert palette images to RGB to avoid filtering issues
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            elif img.mode == 'L':
+                img = img.convert('RGB')
+
+            img.load()
+
+        frame = cls(image=img, path=path)
+        frame.scale = (source_width / frame.width, source_height / frame.height)
+        return frame
+
+    @classmethod
+    def from_bgr(cls, bgr, path=None):
+        """Wrap a BGR array, e.g. a decoded video frame"""
+        return cls(bgr=bgr, path=path)
+
+    @classmethod
+    def from_rgb(cls, rgb, path=None, scale=(1.0, 1.0)):
+        """
+        Wrap an RGB array, e.g. a frame ffmpeg already scaled down
+        scale maps its pixels back to the source (see analysis_proxy)
+        """
+        frame = cls(rgb=rgb, path=path)
+        frame.scale = scale
+        return frame
+
+    def analysis_proxy(self, max_edge=None):
+        """
+        Downscaled copy for subject detection, longest edge capped at max_edge
+        Returns self when the frame already fits (or max_edge is 0)
+        Multiply proxy pixel coordinates by proxy.scale to map them back
+        """
+        if max_edge is None:
+            max_edge = DEFAULT_ANALYSIS_MAX_EDGE
+
+        longest = max(self.width, self.height)
+        if not max_edge or longest <= max_edge:
+            return self
+
+        ratio = max_edge / longest
+        size = (max(1, round(self.width * ratio)), max(1, round(self.height * ratio)))
+
+        if self._pil is not None:
+            proxy = MediaFrame(
+                image=self._pil.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0),
+                path=self.path
+            )
+        elif self._bgr is not None:
+            proxy = MediaFrame(bgr=cv2.resize(self._bgr, size, interpolation=cv2.INTER_AREA), path=self.path)
+        else:
+            proxy = MediaFrame(rgb=cv2.resize(self._rgb, size, interpolation=cv2.INTER_AREA), path=self.path)
+
+        proxy.scale = (
+            self.width / size[0] * self.scale[0],
+            self.height / size[1] * self.scale[1]
+        )
+        return proxy
+
+    def analysis_info(self, max_edge):
+        """Summary of the analysis resolution for result JSON"""
+        return {
+            'max_edge': max_edge,
+            'width': self.width,
+            'height': self.height,
+            'scale': max(self.scale)
+        }
+
+    @property
+    def shape(self):
+        return (self.height, self.width)
+
+    @property
+    def source_size(self):
+        """(width, height) of the original media this frame was derived from"""
+        return (round(self.width * self.scale[0]), round(self.height * self.scale[1]))
+
+    @property
+    def pil(self):
+        """PIL view used for rendering (keeps alpha when the source has it)"""
+        if self._pil is None:
+            self._pil = Image.fromarray(self.rgb)
+        return self._pil
+
+    @property
+    def rgb(self):
+        """Read-only RGB array used by MediaPipe"""
+        if self._rgb is None:
+            if self._pil is not None:
+                pil = self._pil if self._pil.mode == 'RGB' else self._pil.convert('RGB')
+                self._rgb = np.asarray(pil)
+            else:
+                self._rgb = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    @property
+    def bgr(self):
+        """BGR array used by OpenCV and YOLO"""
+        if self._bgr is None:
+            self._bgr = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR)
+        return self._bgr
+
+    @property
+    def gray(self):
+        """Grayscale array used by Haar cascades and edge detection"""
+        if self._gray is None:
+            if self._bgr is not None:
+                self._gray = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+            else:
+                self._gray = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+        return self._gray
@@ -13,22 +13,49 @@ import os
 import subprocess
 from pathlib import Path
 
-def detect_subject_opencv(image_path):
+from media_frame import MediaFrame, DEFAULT_ANALYSIS_MAX_EDGE
+from haar_cascades import get_cascade, load_times
+from contour_stats import contour_stats
+from saliency import salient_region
+from crop_planner import plan_crops, analysis_regions
+from ffmpeg_progress import ProgressTracker, run_ffmpeg, print_progress
+from video_probe import probe_video, audio_args, video_passthrough
+
+# Detector used when no face is found: 'contours' (Canny edge contours) or
+# 'saliency' (spectral residual, a few milliseconds on any image size)
+FALLBACK_DETECTORS = ('contours', 'saliency')
+DEFAULT_FALLBACK_DETECTOR = os.environ.get('FALLBACK_DETECTOR', 'contours')
+if DEFAULT_FALLBACK_DETECTOR not in FALLBACK_DETECTORS:
+    # Checked once here so a bad setting fails at startup, not on every image
+    raise ValueError(f"Unknown FALLBACK_DETECTOR: {DEFAULT_FALLBACK_DETECTOR}")
+
+def detect_subject_opencv(image_path, frame=None, analysis_max_edge=DEFAULT_ANALYSIS_MAX_EDGE,
+                          fallback_detector=None):
     """
     Use OpenCV for subject detection using Haar cascades and contour detection
+    An already decoded MediaFrame can be passed to skip reading image_path
+    Detection runs on a proxy capped at analysis_max_edge (0 = full size)
+    fallback_detector picks what runs when no face is found (see FALLBACK_DETECTORS)
     """
+    if fallback_detector is None:
+        fallback_detector = DEFAULT_FALLBACK_DETECTOR
+    if fallback_detector not in FALLBACK_DETECTORS:
+        raise ValueError(f"Unknown fallback detector: {fallback_detector}")
+
     try:
         # Read image
-        img = cv2.imread(image_path)
-        if img is None:
-            return None
+        if frame is None:
+            frame = MediaFrame.open(image_path, [], analysis_max_edge)
+
+        # Results are percentages, so the proxy needs no mapping back
+        frame = frame.analysis_proxy(analysis_max_edge)
+        analysis_info = frame.analysis_info(analysis_max_edge)
             
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        h, w = img.shape[:2]
+        gray = frame.gray
+        h, w = frame.shape
         
         # Try face detection first
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        faces = get_cascade().detectMultiScale(gray, 1.1, 4)
         
         if len(faces) > 0:
             # Return the largest face as the main subject
@@ -51,46 +78,68 @@ def detect_subject_opencv(image_path):
                     'height': (ph / h) * 100
                 },
                 'focal_points': [{'x': (x + fw/2) / w * 100, 'y': (y + fh/2) / h * 100}],
-                'confidence': 0.9
+                'confidence': 0.9,
+                'analysis': analysis_info,
+                'classifier_load_ms': load_times()
             }
         
-        # If no faces, try enhanced detection for text and objects
-        edges = cv2.Canny(gray, 50, 150)
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if fallback_detector == 'saliency':
+            region = salient_region(gray)
+            if region:
+                # Same padding as the contour pass below
+                padding = 0.15
+                px = max(0, region['x'] - region['width'] * padding)
+                py = max(0, region['y'] - region['height'] * padding)
+                pw = min(w - px, region['width'] * (1 + 2 * padding))
+                ph = min(h - py, region['height'] * (1 + 2 * padding))
+
+                return {
+                    'main_subject': 'Salient region detected',
+                    'bounding_box': {
+                        'x': (px / w) * 100,
+                        'y': (py / h) * 100,
+                        'width': (pw / w) * 100,
+                        'height': (ph / h) * 100
+                    },
+                    'focal_points': [{'x': region['center_x'] / w * 100, 'y': region['center_y'] / h * 100}],
+                    'confidence': min(0.8, 0.4 + region['confidence'] * 0.4),
+                    'analysis': analysis_info,
+                    'classifier_load_ms': load_times()
+                }
+            contours = ()
+        else:
+            # If no faces, try enhanced detection for text and objects
+            edges = cv2.Canny(gray, 50, 150)
+            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
         if contours:
             # Filter and analyze contours for text-like regions and objects
-            valid_contours = []
+            areas, rects = contour_stats(contours)
             min_area = (w * h) * 0.005  # At least 0.5% of image area
             max_area = (w * h) * 0.8    # At most 80% of image area
+            valid = (areas > min_area) & (areas < max_area)
 
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if min_area < area < max_area:
-                    x, y, cw, ch = cv2.boundingRect(contour)
-                    aspect_ratio = cw / ch if ch > 0 else 0
+            if valid.any():
+                areas, rects = areas[valid], rects[valid]
+                rx, ry, rw, rh = rects.T
+                aspect_ratio = rw / rh
 
-                    # Score contours based on size, position, and aspect ratio
-                    score = area
+                # Score contours based on size, position, and aspect ratio,
+                # boosting text-like aspect ratios
+                scores = areas * np.where((aspect_ratio > 0.2) & (aspect_ratio < 8), 1.5, 1.0)
 
-                    # Boost score for text-like aspect ratios
-                    if 0.2 < aspect_ratio < 8:
-                        score *= 1.5
+                # Boost score for central regions
+                center_x = rx + rw/2
+                center_y = ry + rh/2
+                distance_from_center = ((center_x - w/2)**2 + (center_y - h/2)**2)**0.5
+                max_distance = ((w/2)**2 + (h/2)**2)**0.5
+                centrality = 1 - (distance_from_center / max_distance)
+                scores *= (1 + centrality * 0.5)
 
-                    # Boost score for central regions
-                    center_x = x + cw/2
-                    center_y = y + ch/2
-                    distance_from_center = ((center_x - w/2)**2 + (center_y - h/2)**2)**0.5
-                    max_distance = ((w/2)**2 + (h/2)**2)**0.5
-                    centrality = 1 - (distance_from_center / max_distance)
-                    score *= (1 + centrality * 0.5)
-
-                    valid_contours.append((x, y, cw, ch, area, score))
-
-            if valid_contours:
                 # Find the highest scoring contour
-                best_contour = max(valid_contours, key=lambda x: x[5])
-                x, y, cw, ch, area, score = best_contour
+                best = int(np.argmax(scores))
+                x, y, cw, ch = (int(v) for v in rects[best])
+                area = float(areas[best])
 
                 # Add padding around detected region
                 padding = 0.15
@@ -115,7 +164,9 @@ def detect_subject_opencv(image_path):
                         'height': (ph / h) * 100
                     },
                     'focal_points': [{'x': (x + cw/2) / w * 100, 'y': (y + ch/2) / h * 100}],
-                    'confidence': min(0.8, 0.4 + (area / (w * h)) * 2)
+                    'confidence': min(0.8, 0.4 + (area / (w * h)) * 2),
+                    'analysis': analysis_info,
+                    'classifier_load_ms': load_times()
                 }
         
         # Default to center crop
@@ -128,172 +179,281 @@ def detect_subject_opencv(image_path):
                 'height': 50
             },
             'focal_points': [{'x': 50, 'y': 50}],
-            'confidence': 0.5
+            'confidence': 0.5,
+            'analysis': analysis_info,
+            'classifier_load_ms': load_times()
         }
         
     except Exception as e:
         print(f"Error in subject detection: {e}", file=sys.stderr)
         return None
 
+def _calculate_crop_box(original_width, original_height, target_width, target_height, subject_analysis=None):
+    """
+    Largest crop with the target aspect ratio keeping the most of the subject(s),
+    centred when there is no subject
+    Returns (crop_x, crop_y, crop_width, crop_height)
+    """
+    return plan_crops(
+        original_width, original_height, [(target_width, target_height)], analysis_regions(subject_analysis)
+    )[0]
+
+def _render_crop(img, output_path, target_width, target_height, subject_analysis=None, crop_box=None):
+    """
+    Crop, resize, sharpen and save one target from an already decoded image
+    crop_box (x, y, width, height) skips planning when it was done up front
+    """
+    if crop_box is None:
+        original_width, original_height = img.size
+        crop_box = _calculate_crop_box(
+            original_width, original_height, target_width, target_height, subject_analysis
+        )
+    crop_x, crop_y, crop_width, crop_height = crop_box
+
+    # Crop the image
+    cropped = img.crop((crop_x, crop_y, crop_x + crop_width, crop_y + crop_height))
+
+    # Resize to target dimensions
+    resized = cropped.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+    # Enhance image quality
+    enhancer = ImageEnhance.Sharpness(resized)
+    enhanced = enhancer.enhance(1.1)
+
+    # Handle different image formats properly
+    output_format = 'JPEG'
+    save_kwargs = {'quality': 85, 'optimize': True, 'progressive': True}
+
+    # Convert RGBA to RGB for JPEG, or keep original format for PNG
+    if enhanced.mode == 'RGBA':
+        if output_path.lower().endswith('.png'):
+            output_format = 'PNG'
+            save_kwargs = {'optimize': True}
+        else:
+            # Convert RGBA to RGB for JPEG
+            background = Image.new('RGB', enhanced.size, (255, 255, 255))
+            background.paste(enhanced, mask=enhanced.split()[-1])
+            enhanced = background
+
+    # Save with optimization
+    enhanced.save(output_path, output_format, **save_kwargs)
+
 def smart_crop_image(input_path, output_path, target_width, target_height, subject_analysis=None):
     """
     Smart crop using Pillow with subject analysis
     """
     try:
-        with Image.open(input_path) as img:
-            # Convert palette images to RGB to avoid filtering issues
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            elif img.mode == 'L':
-                img = img.convert('RGB')
-
-            original_width, original_height = img.size
-            target_ratio = target_width / target_height
-            original_ratio = original_width / original_height
-            
-            if subject_analysis and subject_analysis.get('bounding_box'):
-                bbox = subject_analysis['bounding_box']
-                
-                # Calculate subject center
-                subject_x = (bbox['x'] + bbox['width'] / 2) / 100 * original_width
-                subject_y = (bbox['y'] + bbox['height'] / 2) / 100 * original_height
-                
-                # Calculate crop dimensions
-                if target_ratio > original_ratio:
-                    # Target is wider, crop height
-                    crop_width = original_width
-                    crop_height = int(crop_width / target_ratio)
-                    
-                    # Center crop vertically around subject
-                    crop_y = max(0, min(original_height - crop_height, 
-                                      int(subject_y - crop_height / 2)))
-                    crop_x = 0
-                else:
-                    # Target is taller, crop width
-                    crop_height = original_height
-                    crop_width = int(crop_height * target_ratio)
-                    
-                    # Center crop horizontally around subject
-                    crop_x = max(0, min(original_width - crop_width, 
-                                      int(subject_x - crop_width / 2)))
-                    crop_y = 0
-                
-                # Crop the image
-                cropped = img.crop((crop_x, crop_y, crop_x + crop_width, crop_y + crop_height))
-            else:
-                # Fallback to center crop
-                if target_ratio > original_ratio:
-                    crop_width = original_width
-                    crop_height = int(crop_width / target_ratio)
-                    crop_x = 0
-                    crop_y = (original_height - crop_height) // 2
-                else:
-                    crop_height = original_height
-                    crop_width = int(crop_height * target_ratio)
-                    crop_x = (original_width - crop_width) // 2
-                    crop_y = 0
-                
-                cropped = img.crop((crop_x, crop_y, crop_x + crop_width, crop_y + crop_height))
-            
-            # Resize to target dimensions
-            resized = cropped.resize((target_width, target_height), Image.Resampling.LANCZOS)
-            
-            # Enhance image quality
-            enhancer = ImageEnhance.Sharpness(resized)
-            enhanced = enhancer.enhance(1.1)
-
-            # Handle different image formats properly
-            output_format = 'JPEG'
-            save_kwargs = {'quality': 85, 'optimize': True, 'progressive': True}
-
-            # Convert RGBA to RGB for JPEG, or keep original format for PNG
-            if enhanced.mode == 'RGBA':
-                if output_path.lower().endswith('.png'):
-                    output_format = 'PNG'
-                    save_kwargs = {'optimize': True}
-                else:
-                    # Convert RGBA to RGB for JPEG
-                    background = Image.new('RGB', enhanced.size, (255, 255, 255))
-                    background.paste(enhanced, mask=enhanced.split()[-1])
-                    enhanced = background
+        # The crop comes from subject_analysis, so no analysis proxy is needed
+        frame = MediaFrame.open(input_path, [(target_width, target_height)], analysis=False)
+        _render_crop(frame.pil, output_path, target_width, target_height, subject_analysis)
+        return True
 
-            # Save with optimization
-            enhanced.save(output_path, output_format, **save_kwargs)
-            
-            return True
-            
     except Exception as e:
         print(f"Error in image processing: {e}", file=sys.stderr)
         return False
 
-def process_video_ffmpeg(input_path, output_path, target_width, target_height, subject_analysis=None):
+def _target_event(index, total, result):
+    """Progress event reporting that one of total targets is finished"""
+    return {
+        'event': 'target',
+        'index': index,
+        'total': total,
+        'format': result.get('format'),
+        'success': result['success'],
+        'percent': round((index + 1) / total * 100, 1)
+    }
+
+def smart_crop_image_targets(input_path, targets, subject_analysis=None, on_progress=None):
     """
-    Process video using FFmpeg with smart cropping
+    Render several target sizes from a single decode of the source image
+    Subject detection also runs once and is shared by every target
+    on_progress(event) gets a 'target' event as each target is saved
+    Returns (subject_analysis, per-target results)
     """
     try:
-        # Get video info
-        probe_cmd = [
-            'ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', input_path
+        frame = MediaFrame.open(
+            input_path, [(int(t['width']), int(t['height'])) for t in targets], analysis=not subject_analysis
+        )
+
+        # Detect on the decoded frame instead of reading the file again
+        if not subject_analysis:
+            subject_analysis = detect_subject_opencv(input_path, frame=frame)
+
+        # Plan every crop from one importance map
+        crop_boxes = plan_crops(
+            frame.width, frame.height,
+            [(int(t['width']), int(t['height'])) for t in targets],
+            analysis_regions(subject_analysis)
+        )
+
+        results = []
+        for target, crop_box in zip(targets, crop_boxes):
+            result = {
+                'format': target.get('format'),
+                'width': int(target['width']),
+                'height': int(target['height']),
+                'output_path': target['output_path']
+            }
+            try:
+                _render_crop(
+                    frame.pil, target['output_path'], result['width'], result['height'], crop_box=crop_box
+                )
+                result['success'] = True
+            except Exception as e:
+                print(f"Error rendering {target.get('format')}: {e}", file=sys.stderr)
+                result['success'] = False
+                result['error'] = str(e)
+            results.append(result)
+            if on_progress:
+                on_progress(_target_event(len(results) - 1, len(targets), result))
+
+        return subject_analysis, results
+
+    except Exception as e:
+        print(f"Error in image processing: {e}", file=sys.stderr)
+        return subject_analysis, [
+            {
+                'format': target.get('format'),
+                'width': int(target['width']),
+                'height': int(target['height']),
+                'output_path': target['output_path'],
+                'success': False,
+                'error': str(e)
+            }
+            for target in targets
         ]
-        result = subprocess.run(probe_cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            return False
-            
-        video_info = json.loads(result.stdout)
-        video_stream = next((s for s in video_info['streams'] if s['codec_type'] == 'video'), None)
-        
-        if not video_stream:
-            return False
-            
-        original_width = int(video_stream['width'])
-        original_height = int(video_stream['height'])
+
+def process_video_ffmpeg(input_path, output_path, target_width, target_height, subject_analysis=None,
+                         on_progress=None):
+    """
+    Process video using FFmpeg with smart cropping
+    on_progress(event) receives encode progress with percent and ETA
+    """
+    try:
+        # Get video info (probed once per file)
+        video_info = probe_video(input_path)
+        original_width = video_info['width']
+        original_height = video_info['height']
         
         # Calculate smart crop parameters
-        target_ratio = target_width / target_height
-        original_ratio = original_width / original_height
-        
-        if subject_analysis and subject_analysis.get('bounding_box'):
-            bbox = subject_analysis['bounding_box']
-            subject_x = int((bbox['x'] + bbox['width'] / 2) / 100 * original_width)
-            subject_y = int((bbox['y'] + bbox['height'] / 2) / 100 * original_height)
-        else:
-            subject_x = original_width // 2
-            subject_y = original_height // 2
+        crop_x, crop_y, crop_width, crop_height = _calculate_crop_box(
+            original_width, original_height, target_width, target_height, subject_analysis
+        )
         
-        # Build FFmpeg command with smart cropping
-        if target_ratio > original_ratio:
-            # Crop height, keep width
-            crop_width = original_width
-            crop_height = int(crop_width / target_ratio)
-            crop_x = 0
-            crop_y = max(0, min(original_height - crop_height, subject_y - crop_height // 2))
+        # Build FFmpeg command with smart cropping; a source that already
+        # matches the target is remuxed, compatible audio is copied
+        ffmpeg_cmd = ['ffmpeg', '-i', input_path, '-map', '0:v:0']
+        crop_box = (crop_x, crop_y, crop_width, crop_height)
+        if video_passthrough(video_info, crop_box, target_width, target_height):
+            ffmpeg_cmd.extend(['-c:v', 'copy'])
         else:
-            # Crop width, keep height
-            crop_height = original_height
-            crop_width = int(crop_height * target_ratio)
-            crop_y = 0
-            crop_x = max(0, min(original_width - crop_width, subject_x - crop_width // 2))
+            ffmpeg_cmd.extend([
+                '-vf', f'crop={crop_width}:{crop_height}:{crop_x}:{crop_y},scale={target_width}:{target_height}',
+                '-c:v', 'libx264', '-preset', 'fast', '-crf', '23'
+            ])
+        if video_info['has_audio']:
+            ffmpeg_cmd.extend(['-map', '0:a:0'])
+        ffmpeg_cmd.extend(audio_args(video_info))
+        ffmpeg_cmd.extend(['-movflags', '+faststart', '-y', output_path])
         
-        ffmpeg_cmd = [
-            'ffmpeg', '-i', input_path,
-            '-vf', f'crop={crop_width}:{crop_height}:{crop_x}:{crop_y},scale={target_width}:{target_height}',
-            '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-            '-c:a', 'aac', '-b:a', '128k',
-            '-movflags', '+faststart',
-            '-y', output_path
-        ]
-        
-        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
+        tracker = ProgressTracker(video_info['duration'], on_progress) if on_progress else None
+
+        result = run_ffmpeg(ffmpeg_cmd, tracker.callback() if tracker else None)
+        if result.returncode != 0:
+            print(f"FFmpeg failed: {result.stderr}", file=sys.stderr)
         return result.returncode == 0
         
     except Exception as e:
         print(f"Error in video processing: {e}", file=sys.stderr)
         return False
 
+def process_targets(input_path, targets, media_type, subject_analysis=None, on_progress=None):
+    """
+    Produce every target from one invocation
+    Images are decoded and analysed once; videos are encoded per target
+    on_progress(event) gets a 'target' event per finished target and, for
+    videos, encode progress events tagged with the target index
+    """
+    for target in targets:
+        output_dir = os.path.dirname(target['output_path'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    if media_type == 'image':
+        return smart_crop_image_targets(input_path, targets, subject_analysis, on_progress)
+
+    results = []
+    for index, target in enumerate(targets):
+        encode_progress = None
+        if on_progress:
+            def encode_progress(event, index=index):
+                on_progress(dict(event, target=index, total=len(targets)))
+        success = process_video_ffmpeg(
+            input_path, target['output_path'], int(target['width']), int(target['height']), subject_analysis,
+            encode_progress
+        )
+        result = {
+            'format': target.get('format'),
+            'width': int(target['width']),
+            'height': int(target['height']),
+            'output_path': target['output_path'],
+            'success': success
+        }
+        if not success:
+            result['error'] = 'Processing failed'
+        results.append(result)
+        if on_progress:
+            on_progress(_target_event(index, len(targets), result))
+    return subject_analysis, results
+
+def main_targets(on_progress=None):
+    """Command line entry point for multi-target processing"""
+    if len(sys.argv) < 5:
+        print("Usage: python media_processor.py <input_path> --targets <targets_json> <media_type> [subject_analysis_json]")
+        sys.exit(1)
+
+    input_path = sys.argv[1]
+    targets = json.loads(sys.argv[3])
+    media_type = sys.argv[4]
+
+    subject_analysis = None
+    if len(sys.argv) > 5:
+        try:
+            subject_analysis = json.loads(sys.argv[5])
+        except:
+            pass
+
+    if media_type not in ('image', 'video'):
+        print(f"Unsupported media type: {media_type}", file=sys.stderr)
+        sys.exit(1)
+
+    subject_analysis, results = process_targets(input_path, targets, media_type, subject_analysis, on_progress)
+    success = any(r['success'] for r in results)
+
+    print(json.dumps({
+        'success': success,
+        'subject_analysis': subject_analysis,
+        'results': results
+    }))
+
+    if not success:
+        sys.exit(1)
+
 def main():
+    # --progress writes JSON-lines progress (per target, and video encode
+    # progress) before the result line
+    on_progress = None
+    if '--progress' in sys.argv:
+        sys.argv.remove('--progress')
+        on_progress = print_progress
+
+    if len(sys.argv) > 2 and sys.argv[2] == '--targets':
+        main_targets(on_progress)
+        return
+
     if len(sys.argv) < 6:
         print("Usage: python media_processor.py <input_path> <output_path> <width> <height> <media_type> [subject_analysis_json]")
+        print("       python media_processor.py <input_path> --targets <targets_json> <media_type> [subject_analysis_json]")
         sys.exit(1)
     
     input_path = sys.argv[1]
@@ -313,13 +473,14 @@ def main():
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     if media_type == 'image':
-        # First try to detect subject if not provided
-        if not subject_analysis:
-            subject_analysis = detect_subject_opencv(input_path)
-            
-        success = smart_crop_image(input_path, output_path, width, height, subject_analysis)
+        subject_analysis, results = smart_crop_image_targets(input_path, [{
+            'width': width,
+            'height': height,
+            'output_path': output_path
+        }], subject_analysis)
+        success = results[0]['success']
     elif media_type == 'video':
-        success = process_video_ffmpeg(input_path, output_path, width, height, subject_analysis)
+        success = process_video_ffmpeg(input_path, output_path, width, height, subject_analysis, on_progress)
     else:
         print(f"Unsupported media type: {media_type}", file=sys.stderr)
         sys.exit(1)
@@ -12,6 +12,8 @@ from PIL import Image, ImageOps, ImageFilter
 import pillow_heif
 from pathlib import Path
 
+from jpeg_draft import oriented_size, draft_to_size
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -243,6 +245,20 @@ class ProfessionalImageOptimizer:
                 original_width, original_height = img.size
                 
                 logger.info(f"Processing image: {original_width}x{original_height}, {img.mode}, {original_size} bytes")
+
+                # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when the output is
+                # small enough, instead of decoding everything and downscaling
+                if max_width or max_height:
+                    oriented_width, oriented_height = oriented_size(img)
+                    ratio = min(
+                        (max_width / oriented_width) if max_width else 1,
+                        (max_height / oriented_height) if max_height else 1,
+                        1
+                    )
+                    if ratio < 1:
+                        reduction = draft_to_size(img, (oriented_width * ratio, oriented_height * ratio))
+                        if reduction > 1:
+                            logger.info(f"Decoding at 1/{reduction} scale")
                 
                 # Apply smart preprocessing
                 img = self.apply_smart_preprocessing(img)
@@ -0,0 +1,150 @@
+import { spawn, type ChildProcessWithoutNullStreams } from "child_process";
+import os from "os";
+import path from "path";
+import readline from "readline";
+
+// Milliseconds a job may run before its worker is killed and respawned
+const JOB_TIMEOUT_MS = Number(process.env.PYTHON_WORKER_TIMEOUT_MS) || 120000;
+
+// Worker processes serving AI jobs. Every worker loads its own copy of the
+// models, so memory grows with the pool; the default stays small and
+// PYTHON_WORKERS raises it on hosts with memory to spare.
+const DEFAULT_POOL_SIZE = 2;
+const POOL_SIZE = Number(process.env.PYTHON_WORKERS) || Math.min(DEFAULT_POOL_SIZE, os.cpus().length);
+
+type PendingJob = {
+  resolve: (result: any) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+};
+
+// Long-lived Python worker that keeps the AI models loaded between requests.
+// Jobs and results are exchanged as JSON lines tagged with a request id.
+export class PythonWorker {
+  private process: ChildProcessWithoutNullStreams | null = null;
+  private pending = new Map<string, PendingJob>();
+  private nextId = 0;
+
+  constructor(private script: string, private args: string[] = ['--serve']) {}
+
+  // Jobs sent to this worker that have not been answered yet
+  get load(): number {
+    return this.pending.size;
+  }
+
+  private start() {
+    const python = spawn('python3', [this.script, ...this.args]);
+    this.process = python;
+
+    const lines = readline.createInterface({ input: python.stdout });
+    lines.on('line', (line) => {
+      let message: any;
+      try {
+        message = JSON.parse(line);
+      } catch (e) {
+        console.log('Python worker output:', line);
+        return;
+      }
+
+      if (message.id === undefined || message.id === null) {
+        return;
+      }
+
+      const job = this.pending.get(String(message.id));
+      if (!job) {
+        return;
+      }
+      this.pending.delete(String(message.id));
+      clearTimeout(job.timer);
+
+      if (message.success) {
+        job.resolve(message.result);
+      } else {
+        job.reject(new Error(message.error || 'Python worker job failed'));
+      }
+    });
+
+    python.stderr.on('data', (data: Buffer) => {
+      console.error(`Python worker: ${data.toString().trimEnd()}`);
+    });
+
+    // Pending jobs are rejected by the exit handler
+    python.stdin.on('error', () => {});
+
+    python.on('exit', (code, signal) =>
+      this.fail(python, new Error(`Python worker exited with ${signal || `code ${code}`}`))
+    );
+    python.on('error', (error) => this.fail(python, error));
+  }
+
+  // Reject every job still waiting on python; the next run() starts a new process
+  private fail(python: ChildProcessWithoutNullStreams, error: Error) {
+    if (this.process !== python) {
+      return;
+    }
+    this.process = null;
+    for (const job of Array.from(this.pending.values())) {
+      clearTimeout(job.timer);
+      job.reject(error);
+    }
+    this.pending.clear();
+  }
+
+  run(job: Record<string, unknown>, timeoutMs: number = JOB_TIMEOUT_MS): Promise<any> {
+    if (!this.process) {
+      this.start();
+    }
+    const python = this.process!;
+
+    const id = String(++this.nextId);
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        const pending = this.pending.get(id);
+        if (!pending) {
+          return;
+        }
+        this.pending.delete(id);
+        pending.reject(new Error(`Python worker job timed out after ${timeoutMs} ms`));
+
+        // The worker is stuck on this job; kill it so later jobs get a fresh one
+        this.fail(python, new Error('Python worker restarted after a job timed out'));
+        python.kill('SIGKILL');
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer });
+      python.stdin.write(JSON.stringify({ ...job, id }) + '\n');
+    });
+  }
+}
+
+// Several workers for concurrent requests; each job goes to the least busy one.
+// Workers start on their first job, so an idle pool holds no models.
+export class PythonWorkerPool {
+  private workers: PythonWorker[];
+
+  constructor(script: string, size: number = POOL_SIZE, args: string[] = ['--serve']) {
+    const count = Math.max(1, Math.floor(size));
+    // Share the CPUs between workers instead of each using all of them
+    const threads = Math.max(1, Math.floor(os.cpus().length / count));
+    this.workers = Array.from(
+      { length: count },
+      () => new PythonWorker(script, [...args, '--intra-op-threads', String(threads)])
+    );
+  }
+
+  run(job: Record<string, unknown>, timeoutMs?: number): Promise<any> {
+    const worker = this.workers.reduce((best, next) => (next.load < best.load ? next : best));
+    return worker.run(job, timeoutMs);
+  }
+}
+
+let mediaWorkers: PythonWorkerPool | null = null;
+
+export function getMediaWorker(): PythonWorkerPool {
+  if (!mediaWorkers) {
+    mediaWorkers = new PythonWorkerPool(
+      path.join(process.cwd(), 'server', 'advanced_media_processor.py')
+    );
+  }
+  return mediaWorkers;
+}
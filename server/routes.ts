@@ -5,6 +5,7 @@ import multer from "multer";
 import sharp from "sharp";
 import path from "path";
 import fs from "fs";
+import readline from "readline";
 import { insertUploadJobSchema, PLATFORM_CONFIGS, type ProcessedResult } from "@shared/schema";
 import OpenAI from "openai";
 
@@ -265,14 +266,8 @@ async function processMediaAsync(jobId: string, filePath: string, mimeType: stri
 
     const results: ProcessedResult[] = [];
 
-    // Calculate total formats to process
-    const totalFormats = Object.entries(selectedFormats).reduce((acc, [platformId, formatNames]) => {
-      return acc + formatNames.length;
-    }, 0);
-
-    let processedFormats = 0;
-
-    // Process for each platform and selected formats
+    // Collect every selected format so the source is decoded and analysed once
+    const targets: MediaTarget[] = [];
     for (const [platformId, formatNames] of Object.entries(selectedFormats)) {
       const platform = PLATFORM_CONFIGS.find(p => p.id === platformId);
       if (!platform) continue;
@@ -281,36 +276,48 @@ async function processMediaAsync(jobId: string, filePath: string, mimeType: stri
         const format = platform.formats.find(f => f.name === formatName);
         if (!format) continue;
 
-        try {
-          const outputPath = await processMedia(
-            filePath,
-            mimeType,
-            format.dimensions,
-            platformId,
-            format.name,
-            subjectAnalysis
-          );
-
-          const stats = fs.statSync(outputPath);
-          results.push({
-            platform: platform.name,
-            format: format.name,
-            dimensions: format.dimensions,
-            fileSize: stats.size,
-            filePath: outputPath,
-            optimized: true
-          });
-
-          processedFormats++;
-          const progress = 30 + Math.round((processedFormats / totalFormats) * 60);
-          await storage.updateUploadJob(jobId, { progress });
-
-        } catch (error) {
-          console.error(`Error processing ${platformId} ${format.name}:`, error);
-        }
+        targets.push({
+          platformId,
+          platformName: platform.name,
+          format: format.name,
+          dimensions: format.dimensions
+        });
       }
     }
 
+    // Progress moves from 30 to 90 as the targets are produced
+    let lastProgress = 30;
+    const outputPaths = await processMedia(filePath, mimeType, targets, subjectAnalysis, (fraction) => {
+      const progress = 30 + Math.round(Math.min(1, fraction) * 60);
+      if (progress > lastProgress) {
+        lastProgress = progress;
+        storage.updateUploadJob(jobId, { progress }).catch((error) => {
+          console.error('Error updating job progress:', error);
+        });
+      }
+    });
+
+    targets.forEach((target, index) => {
+      const outputPath = outputPaths[index];
+      if (!outputPath) return;
+
+      try {
+        const stats = fs.statSync(outputPath);
+        results.push({
+          platform: target.platformName,
+          format: target.format,
+          dimensions: target.dimensions,
+          fileSize: stats.size,
+          filePath: outputPath,
+          optimized: true
+        });
+      } catch (error) {
+        console.error(`Error processing ${target.platformId} ${target.format}:`, error);
+      }
+    });
+
+    await storage.updateUploadJob(jobId, { progress: 90 });
+
     // Update job as completed
     await storage.updateUploadJob(jobId, {
       status: "completed",
@@ -330,15 +337,27 @@ async function processMediaAsync(jobId: string, filePath: string, mimeType: stri
   }
 }
 
-// Process media for specific dimensions using advanced Python tools
+type MediaTarget = {
+  platformId: string;
+  platformName: string;
+  format: string;
+  dimensions: { width: number; height: number };
+};
+
+// Process media for every target dimension in a single Python invocation
+// Returns one output path per target (null when a target could not be produced)
+// onProgress receives the finished share of the targets (0-1) as Python reports it
 async function processMedia(
   inputPath: string, 
   mimeType: string, 
-  dimensions: { width: number; height: number }, 
-  platform: string, 
-  format: string,
-  subjectAnalysis: any
-): Promise<string> {
+  targets: MediaTarget[],
+  subjectAnalysis: any,
+  onProgress?: (fraction: number) => void
+): Promise<(string | null)[]> {
+  if (targets.length === 0) {
+    return [];
+  }
+
   const outputDir = path.join(process.cwd(), "uploads", "processed");
   if (!fs.existsSync(outputDir)) {
     fs.mkdirSync(outputDir, { recursive: true });
@@ -363,7 +382,14 @@ async function processMedia(
     extension = 'mp4';
   }
 
-  const outputPath = path.join(outputDir, `${platform}-${format}-${timestamp}.${extension}`);
+  const pythonTargets = targets.map(target => ({
+    format: target.format,
+    width: target.dimensions.width,
+    height: target.dimensions.height,
+    output_path: path.join(outputDir, `${target.platformId}-${target.format}-${timestamp}.${extension}`)
+  }));
+
+  let targetResults: any[] = [];
 
   try {
     // Use Python script for advanced processing
@@ -372,10 +398,10 @@ async function processMedia(
     const args = [
       path.join(process.cwd(), 'server', 'media_processor.py'),
       inputPath,
-      outputPath,
-      dimensions.width.toString(),
-      dimensions.height.toString(),
-      mediaType
+      '--targets',
+      JSON.stringify(pythonTargets),
+      mediaType,
+      '--progress'
     ];
 
     // Add subject analysis if available
@@ -383,14 +409,30 @@ async function processMedia(
       args.push(JSON.stringify(subjectAnalysis));
     }
 
-    return new Promise((resolve, reject) => {
+    targetResults = await new Promise<any[]>((resolve, reject) => {
       const python = spawn('python3', args);
       
-      let stdout = '';
       let stderr = '';
-      
-      python.stdout.on('data', (data: Buffer) => {
-        stdout += data.toString();
+      let result: any = null;
+
+      // JSON-lines progress events come first, the result is the last line
+      const lines = readline.createInterface({ input: python.stdout });
+      lines.on('line', (line) => {
+        let message: any;
+        try {
+          message = JSON.parse(line);
+        } catch (e) {
+          return;
+        }
+
+        if (message.event === 'target') {
+          onProgress?.((message.index + 1) / message.total);
+        } else if (message.event === 'progress' && message.total && message.percent != null) {
+          // Video encode progress within one target
+          onProgress?.((message.target + message.percent / 100) / message.total);
+        } else if (message.results) {
+          result = message;
+        }
       });
       
       python.stderr.on('data', (data: Buffer) => {
@@ -399,17 +441,11 @@ async function processMedia(
       
       python.on('close', (code: number) => {
         if (code === 0) {
-          try {
-            const result = JSON.parse(stdout.trim());
-            if (result.success) {
-              console.log(`Successfully processed ${mediaType} with advanced tools`);
-              resolve(result.output_path);
-            } else {
-              console.error('Python processing failed:', result.error);
-              reject(new Error(result.error || 'Python processing failed'));
-            }
-          } catch (parseError) {
-            console.error('Failed to parse Python output:', stdout, stderr);
+          if (result) {
+            console.log(`Successfully processed ${mediaType} with advanced tools (${result.results.length} targets)`);
+            resolve(result.results);
+          } else {
+            console.error('Failed to parse Python output:', stderr);
             reject(new Error('Failed to parse processing result'));
           }
         } else {
@@ -426,40 +462,73 @@ async function processMedia(
 
   } catch (error) {
     console.error('Error in advanced media processing:', error);
+  }
+
+  const outputPaths: (string | null)[] = [];
+  for (let index = 0; index < targets.length; index++) {
+    const result = targetResults[index];
+    if (result && result.success) {
+      outputPaths.push(result.output_path);
+      continue;
+    }
+
+    if (result && result.error) {
+      console.error(`Python processing failed for ${targets[index].platformId} ${targets[index].format}:`, result.error);
+    }
+
+    try {
+      outputPaths.push(await processMediaFallback(inputPath, mimeType, targets[index], outputDir, timestamp));
+    } catch (error) {
+      console.error(`Error processing ${targets[index].platformId} ${targets[index].format}:`, error);
+      outputPaths.push(null);
+    }
+  }
+
+  return outputPaths;
+}
+
+// Fallback used when advanced processing could not produce a target
+async function processMediaFallback(
+  inputPath: string,
+  mimeType: string,
+  target: MediaTarget,
+  outputDir: string,
+  timestamp: number
+): Promise<string> {
+  const { platformId: platform, format, dimensions } = target;
+
+  // Fallback to Sharp for images if Python processing fails
+  if (mimeType.startsWith('image/')) {
+    console.log('Falling back to Sharp processing for image');
+    const fallbackPath = path.join(outputDir, `${platform}-${format}-fallback-${timestamp}.jpg`);
     
-    // Fallback to Sharp for images if Python processing fails
-    if (mimeType.startsWith('image/')) {
-      console.log('Falling back to Sharp processing for image');
-      const fallbackPath = path.join(outputDir, `${platform}-${format}-fallback-${timestamp}.jpg`);
-      
-      await sharp(inputPath)
-        .resize(dimensions.width, dimensions.height, {
-          fit: 'cover',
-          position: 'center'
-        })
-        .jpeg({ 
-          quality: 85,
-          progressive: true
-        })
-        .toFile(fallbackPath);
-      
-      return fallbackPath;
-    } else {
-      // For videos, create a placeholder if FFmpeg fails
-      const placeholderPath = path.join(outputDir, `${platform}-${format}-placeholder-${timestamp}.jpg`);
-      
-      await sharp({
-        create: {
-          width: dimensions.width,
-          height: dimensions.height,
-          channels: 3,
-          background: { r: 100, g: 100, b: 100 }
-        }
+    await sharp(inputPath)
+      .resize(dimensions.width, dimensions.height, {
+        fit: 'cover',
+        position: 'center'
       })
-      .jpeg({ quality: 85 })
-      .toFile(placeholderPath);
-      
-      return placeholderPath;
-    }
+      .jpeg({ 
+        quality: 85,
+        progressive: true
+      })
+      .toFile(fallbackPath);
+    
+    return fallbackPath;
+  } else {
+    // For videos, create a placeholder if FFmpeg fails
+    const placeholderPath = path.join(outputDir, `${platform}-${format}-placeholder-${timestamp}.jpg`);
+    
+    await sharp({
+      create: {
+        width: dimensions.width,
+        height: dimensions.height,
+        channels: 3,
+        background: { r: 100, g: 100, b: 100 }
+      }
+    })
+    .jpeg({ quality: 85 })
+    .toFile(placeholderPath);
+    
+    return placeholderPath;
   }
 }
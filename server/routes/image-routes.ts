@@ -5,7 +5,7 @@ import path from "path";
 import fs from "fs";
 import { nanoid } from "nanoid";
 import archiver from "archiver";
-import { spawn } from "child_process";
+import { getMediaWorker } from "../python-worker";
 
 // Configure multer for image uploads
 const imageStorage = multer.diskStorage({
@@ -87,45 +87,25 @@ export function registerImageRoutes(app: Express) {
       const outputPath = path.join(outputDir, outputFilename);
 
       // Use advanced AI-powered smart cropping
-      let pythonOutput = '';
+      let detectionResults: any = null;
       let aiProcessingUsed = false;
 
       try {
-        // Try to use advanced Python AI processing first
-        const pythonProcess = spawn('python3', [
-          path.join(process.cwd(), 'server', 'advanced_media_processor.py'),
-          req.file.path,
-          outputPath,
-          dimensions.width.toString(),
-          dimensions.height.toString()
-        ]);
-
-        pythonProcess.stdout.on('data', (data) => {
-          pythonOutput += data.toString();
+        // Try to use the persistent Python AI worker first
+        detectionResults = await getMediaWorker().run({
+          input_path: req.file.path,
+          output_path: outputPath,
+          width: dimensions.width,
+          height: dimensions.height
         });
-
-        await new Promise((resolve, reject) => {
-          pythonProcess.on('close', (code) => {
-            if (code === 0) {
-              aiProcessingUsed = true;
-              // Log AI detection results
-              try {
-                const detectionResults = JSON.parse(pythonOutput);
-                console.log('AI Detection Results:', {
-                  mainSubject: detectionResults.main_subject,
-                  confidence: detectionResults.confidence,
-                  facesDetected: detectionResults.faces?.length || 0,
-                  objectsDetected: detectionResults.objects?.length || 0
-                });
-              } catch (e) {
-                console.log('AI processing completed successfully');
-              }
-              resolve(code);
-            } else {
-              reject(new Error('AI processing failed'));
-            }
-          });
-          pythonProcess.on('error', reject);
+        aiProcessingUsed = true;
+
+        // Log AI detection results
+        console.log('AI Detection Results:', {
+          mainSubject: detectionResults?.main_subject,
+          confidence: detectionResults?.confidence,
+          facesDetected: detectionResults?.faces?.length || 0,
+          objectsDetected: detectionResults?.objects?.length || 0
         });
       } catch (error) {
         console.log('AI smart cropping failed, using Sharp fallback:', error.message);
@@ -150,20 +130,17 @@ export function registerImageRoutes(app: Express) {
       // Include AI processing results if available
       let aiProcessing = undefined;
       if (aiProcessingUsed) {
-        try {
-          if (pythonOutput) {
-            const detectionResults = JSON.parse(pythonOutput);
-            aiProcessing = {
-              method: detectionResults.main_subject || 'Smart cropping applied',
-              detectionsFound: (detectionResults.faces?.length || 0) +
-                             (detectionResults.objects?.length || 0) +
-                             (detectionResults.poses?.length || 0),
-              confidence: detectionResults.confidence || 0,
-              cropMethod: detectionResults.bounding_box ? 'ai_detected' : 'center_fallback'
-            };
-          }
-        } catch (e) {
-          // If parsing fails, still indicate AI processing was attempted
+        if (detectionResults) {
+          aiProcessing = {
+            method: detectionResults.main_subject || 'Smart cropping applied',
+            detectionsFound: (detectionResults.faces?.length || 0) +
+                           (detectionResults.objects?.length || 0) +
+                           (detectionResults.poses?.length || 0),
+            confidence: detectionResults.confidence || 0,
+            cropMethod: detectionResults.bounding_box ? 'ai_detected' : 'center_fallback'
+          };
+        } else {
+          // Still indicate AI processing was applied
           aiProcessing = {
             method: 'AI processing applied',
             detectionsFound: 0,
@@ -46,6 +46,131 @@ const VIDEO_PLATFORMS = {
   'linkedin-video': { width: 1280, height: 720, name: 'LinkedIn Video', bitrate: '3M' }
 };
 
+type VideoConfig = { width: number; height: number; name: string; bitrate: string };
+
+// Run a process to completion, collecting its output
+function runProcess(command: string, args: string[]): Promise<{ code: number | null; stdout: string; stderr: string }> {
+  return new Promise((resolve, reject) => {
+    const child = spawn(command, args);
+    let stdout = '';
+    let stderr = '';
+
+    child.stdout.on('data', (data) => {
+      stdout += data.toString();
+    });
+
+    child.stderr.on('data', (data) => {
+      stderr += data.toString();
+    });
+
+    child.on('close', (code) => resolve({ code, stdout, stderr }));
+    child.on('error', reject);
+  });
+}
+
+// Resize one upload for several platforms: the source is analyzed and
+// decoded once and every output is encoded by the same ffmpeg process
+async function resizeVideoForPlatforms(
+  inputPath: string,
+  platformKeys: string[],
+  quality: string | undefined,
+  compress: string | undefined
+) {
+  const outputDir = path.join(process.cwd(), "uploads", "processed", "videos");
+  if (!fs.existsSync(outputDir)) {
+    fs.mkdirSync(outputDir, { recursive: true });
+  }
+
+  const outputs = platformKeys.map((key) => {
+    const config: VideoConfig = VIDEO_PLATFORMS[key as keyof typeof VIDEO_PLATFORMS];
+    const filename = `processed-${key}-${nanoid()}.mp4`;
+    return { key, config, filename, outputPath: path.join(outputDir, filename) };
+  });
+
+  const targets = outputs.map(({ key, config, outputPath }) => ({
+    format: key,
+    width: config.width,
+    height: config.height,
+    output_path: outputPath
+  }));
+
+  let aiResult: any = null;
+  try {
+    const { code, stdout, stderr } = await runProcess('python3', [
+      path.join(process.cwd(), 'server', 'advanced_video_processor.py'),
+      inputPath,
+      '--targets',
+      JSON.stringify(targets),
+      quality || 'medium',
+      compress === 'true' ? 'true' : 'false'
+    ]);
+    if (code !== 0) {
+      throw new Error(stderr || 'AI video processing failed');
+    }
+    aiResult = JSON.parse(stdout);
+  } catch (error: any) {
+    console.log('AI video processing failed, falling back to basic FFmpeg:', error.message);
+
+    // Fallback: letterbox every output, still from a single decode
+    const graph = [
+      ...(outputs.length > 1
+        ? [`[0:v]split=${outputs.length}${outputs.map((_, i) => `[s${i}]`).join('')}`]
+        : []),
+      ...outputs.map(({ config }, i) =>
+        `${outputs.length > 1 ? `[s${i}]` : '[0:v]'}scale=${config.width}:${config.height}:force_original_aspect_ratio=decrease,pad=${config.width}:${config.height}:(ow-iw)/2:(oh-ih)/2[v${i}]`
+      )
+    ];
+    const ffmpegArgs = ['-y', '-i', inputPath, '-filter_complex', graph.join(';')];
+    outputs.forEach(({ config, outputPath }, i) => {
+      ffmpegArgs.push(
+        '-map', `[v${i}]`, '-map', '0:a:0?',
+        '-c:v', 'libx264',
+        '-preset', 'medium',
+        '-crf', compress === 'true' ? '28' : (quality || '23'),
+        '-b:v', config.bitrate,
+        '-c:a', 'aac',
+        '-b:a', '128k',
+        '-movflags', '+faststart',
+        outputPath
+      );
+    });
+
+    const { code, stderr } = await runProcess('ffmpeg', ffmpegArgs);
+    if (code !== 0) {
+      console.error('FFmpeg error:', stderr);
+      outputs.forEach(({ outputPath }) => {
+        if (fs.existsSync(outputPath)) fs.unlinkSync(outputPath);
+      });
+      throw new Error('Failed to process video');
+    }
+  }
+
+  const originalSize = fs.statSync(inputPath).size;
+  return {
+    success: true,
+    originalSize,
+    outputs: outputs.map(({ key, config, filename, outputPath }, i) => {
+      const processedSize = fs.statSync(outputPath).size;
+      const output: any = {
+        platform: config.name,
+        platformKey: key,
+        filename,
+        dimensions: { width: config.width, height: config.height },
+        processedSize,
+        compressionRatio: `${((originalSize - processedSize) / originalSize * 100).toFixed(1)}%`,
+        downloadUrl: `/api/download/videos/${filename}`
+      };
+      if (aiResult) {
+        output.aiProcessing = {
+          method: aiResult.results?.[i]?.crop_method || 'ai_detected',
+          detectionsFound: aiResult.detections_found || 0
+        };
+      }
+      return output;
+    })
+  };
+}
+
 export function registerVideoRoutes(app: Express) {
   // Video resize/compress endpoint
   app.post('/api/resize-compress-video', videoUpload.single('video'), async (req, res) => {
@@ -54,9 +179,32 @@ export function registerVideoRoutes(app: Express) {
         return res.status(400).json({ error: 'No video file uploaded' });
       }
 
-      const { platform, customWidth, customHeight, compress, quality } = req.body;
+      const { platform, platforms, customWidth, customHeight, compress, quality } = req.body;
       let config;
 
+      // Several platforms (array or comma separated) share one processing run
+      const platformKeys: string[] = (Array.isArray(platforms) ? platforms : String(platforms || '').split(','))
+        .map((key: string) => key.trim())
+        .filter(Boolean);
+
+      if (platformKeys.length > 0) {
+        const unknown = platformKeys.filter((key) => !(key in VIDEO_PLATFORMS));
+        if (unknown.length > 0) {
+          fs.unlinkSync(req.file.path);
+          return res.status(400).json({ error: `Unknown video platforms: ${unknown.join(', ')}` });
+        }
+
+        try {
+          const result = await resizeVideoForPlatforms(req.file.path, platformKeys, quality, compress);
+          fs.unlinkSync(req.file.path);
+          return res.json(result);
+        } catch (error) {
+          console.error('Video processing error:', error);
+          if (fs.existsSync(req.file.path)) fs.unlinkSync(req.file.path);
+          return res.status(500).json({ error: 'Failed to process video' });
+        }
+      }
+
       if (platform && VIDEO_PLATFORMS[platform as keyof typeof VIDEO_PLATFORMS]) {
         config = VIDEO_PLATFORMS[platform as keyof typeof VIDEO_PLATFORMS];
       } else if (customWidth && customHeight) {
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Spectral residual saliency (Hou & Zhang, 2007)
+Finds the visually distinctive part of an image from the FFT of a tiny
+grayscale proxy. Takes a few milliseconds regardless of the input size and
+is used as a cheap crop fallback when no face or object is found.
+"""
+
+import cv2
+import numpy as np
+
+# Width of the longest edge the spectrum is computed at
+SALIENCY_SIZE = 64
+
+# Pixels more salient than this multiple of the mean belong to a region
+SALIENCY_THRESHOLD = 3.0
+
+# Cap on that threshold (the map peaks at 1): on busy images the mean is
+# high and three times it would leave no pixel above it
+SALIENCY_MAX_THRESHOLD = 0.5
+
+
+def saliency_map(gray, size=SALIENCY_SIZE):
+    """
+    Dense importance map of a grayscale image, float32 in [0, 1]
+    The map is size pixels on its longest edge; all zeros for flat images
+    """
+    height, width = gray.shape[:2]
+    ratio = size / max(width, height)
+    small = cv2.resize(
+        gray, (max(1, round(width * ratio)), max(1, round(height * ratio))),
+        interpolation=cv2.INTER_AREA
+    ).astype(np.float32)
+
+    if small.std() < 1.0:
+        return np.zeros_like(small)
+
+    # The residual of the log amplitude spectrum after removing its local
+    # average marks the statistically unexpected parts of the image
+    spectrum = np.fft.fft2(small)
+    log_amplitude = np.log(np.abs(spectrum) + 1e-9)
+    residual = log_amplitude - cv2.blur(log_amplitude, (3, 3))
+    saliency = np.abs(np.fft.ifft2(np.exp(residual + 1j * np.angle(spectrum)))) ** 2
+    saliency = cv2.GaussianBlur(saliency.astype(np.float32), (0, 0), 2.5)
+
+    peak = saliency.max()
+    return saliency / peak if peak > 0 else saliency
+
+
+def salient_region(gray, size=SALIENCY_SIZE):
+    """
+    Most salient connected region of a grayscale image
+    Returns a dict with x, y, width, height, center_x, center_y (in gray's
+    pixel coordinates, centre weighted by saliency) and confidence (share of
+    the total saliency inside the region), or None for flat images
+    Evenly textured images give one broad region, up to the whole image
+    """
+    saliency = saliency_map(gray, size)
+    total = float(saliency.sum())
+    if total <= 0:
+        return None
+
+    threshold = min(saliency.mean() * SALIENCY_THRESHOLD, SALIENCY_MAX_THRESHOLD)
+    mask = (saliency > threshold).astype(np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count <= 1:
+        return None
+
+    # Pick the region holding the most saliency, not just the most pixels
+    mass = np.bincount(labels.ravel(), weights=saliency.ravel(), minlength=count)
+    mass[0] = 0
+    best = int(np.argmax(mass))
+
+    ys, xs = np.nonzero(labels == best)
+    weights = saliency[ys, xs]
+    center_x = float(np.dot(xs + 0.5, weights) / weights.sum())
+    center_y = float(np.dot(ys + 0.5, weights) / weights.sum())
+
+    scale_x = gray.shape[1] / saliency.shape[1]
+    scale_y = gray.shape[0] / saliency.shape[0]
+    x, y, region_width, region_height = (int(v) for v in stats[best, :4])
+
+    return {
+        'x': x * scale_x,
+        'y': y * scale_y,
+        'width': region_width * scale_x,
+        'height': region_height * scale_y,
+        'center_x': center_x * scale_x,
+        'center_y': center_y * scale_y,
+        'confidence': float(mass[best] / total)
+    }
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Lightweight subject tracking between detector runs
+Boxes found on an anchor frame are followed through later (downscaled,
+grayscale) frames with pyramidal Lucas-Kanade optical flow on corner
+features inside each box, reseeded every frame (median flow). A
+forward-backward check rejects bad points; the share of points that
+survive a step is that step's tracking confidence.
+"""
+
+import cv2
+import numpy as np
+
+# Longest edge of the frames tracking runs on
+TRACK_MAX_EDGE = 320
+
+# Corner features per box, and how many must survive to keep tracking it
+MAX_POINTS = 40
+MIN_POINTS = 4
+
+# Largest forward-backward flow error (pixels) of a usable point
+MAX_FB_ERROR = 1.0
+
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+)
+
+
+class SubjectTracker:
+    def __init__(self):
+        """Follows (x, y, width, height) boxes from frame to frame"""
+        self.gray = None
+        self.boxes = []
+        self.points = []
+        self.static = []
+
+    def reset(self, gray, boxes):
+        """Start tracking boxes (in gray's pixel coordinates) from a detected frame"""
+        self.gray = gray
+        self.boxes = [np.asarray(box, dtype=np.float64) for box in boxes]
+        self.points = [self._features(gray, box) for box in self.boxes]
+        # Boxes over flat regions cannot be tracked; they stay where detected
+        self.static = [len(points) < MIN_POINTS for points in self.points]
+
+    def _features(self, gray, box):
+        """Corner features inside a box as an (N, 1, 2) float32 array"""
+        height, width = gray.shape[:2]
+        x, y, w, h = box
+        x0, y0 = int(max(0, x)), int(max(0, y))
+        x1, y1 = int(min(width, x + w)), int(min(height, y + h))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return np.zeros((0, 1, 2), dtype=np.float32)
+
+        mask = np.zeros_like(gray)
+        mask[y0:y1, x0:x1] = 255
+        points = cv2.goodFeaturesToTrack(gray, MAX_POINTS, 0.01, 3, mask=mask, blockSize=3)
+        return points if points is not None else np.zeros((0, 1, 2), dtype=np.float32)
+
+    def update(self, gray):
+        """
+        Move every box onto the next frame
+        Returns (boxes, confidences); a box that lost too many points keeps
+        its last position with confidence 0, a static box has confidence 1
+        """
+        counts = [0 if static else len(points) for points, static in zip(self.points, self.static)]
+        if not sum(counts):
+            self.gray = gray
+            return [box.copy() for box in self.boxes], [1.0 if static else 0.0 for static in self.static]
+
+        # One flow computation for the points of every box, forward and back
+        old = np.concatenate([points for points, count in zip(self.points, counts) if count])
+        new, status, _ = cv2.calcOpticalFlowPyrLK(self.gray, gray, old, None, **LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.gray, new, None, **LK_PARAMS)
+        error = np.linalg.norm((old - back).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < MAX_FB_ERROR)
+
+        height, width = gray.shape[:2]
+        confidences = []
+        start = 0
+        for i, count in enumerate(counts):
+            if self.static[i]:
+                confidences.append(1.0)
+                continue
+            keep = good[start:start + count]
+            old_points = old[start:start + count][keep].reshape(-1, 2)
+            new_points = new[start:start + count][keep].reshape(-1, 2)
+            start += count
+
+            if len(new_points) < MIN_POINTS:
+                confidences.append(0.0)
+                self.points[i] = np.zeros((0, 1, 2), dtype=np.float32)
+                continue
+
+            # Translation and scale from the median motion of the points
+            shift = np.median(new_points - old_points, axis=0)
+            old_spread = np.linalg.norm(old_points - old_points.mean(axis=0), axis=1)
+            new_spread = np.linalg.norm(new_points - new_points.mean(axis=0), axis=1)
+            valid = old_spread > 1e-3
+            scale = float(np.median(new_spread[valid] / old_spread[valid])) if valid.any() else 1.0
+
+            x, y, w, h = self.boxes[i]
+            center_x, center_y = x + w / 2 + shift[0], y + h / 2 + shift[1]
+            w, h = w * scale, h * scale
+            x = min(max(0.0, center_x - w / 2), max(0.0, width - w))
+            y = min(max(0.0, center_y - h / 2), max(0.0, height - h))
+            self.boxes[i] = np.array([x, y, min(w, width), min(h, height)])
+
+            self.points[i] = self._features(gray, self.boxes[i])
+            confidences.append(len(new_points) / count)
+
+        self.gray = gray
+        return [box.copy() for box in self.boxes], confidences
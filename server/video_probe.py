@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Probe-once video metadata
+One ffprobe call per file (memoised by path, size and mtime) gives the
+stream layout every video code path needs; the packet scan behind GOP
+information is only run when a caller asks for it. Tool availability is
+checked once per process.
+"""
+
+import os
+import re
+import json
+import shutil
+import logging
+import threading
+import subprocess
+from functools import lru_cache
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Probed files kept in memory
+PROBE_CACHE_SIZE = 64
+
+_lock = threading.Lock()
+_metadata = OrderedDict()
+_packets = OrderedDict()
+
+
+@lru_cache(maxsize=None)
+def tool_available(name):
+    """Whether an executable (e.g. 'ffmpeg', 'ffprobe') is on PATH; checked once per process"""
+    return shutil.which(name) is not None
+
+
+@lru_cache(maxsize=None)
+def ffmpeg_version():
+    """
+    (major, minor) of the ffmpeg on PATH, checked once per process; None
+    when it is missing or reports no release number (git builds)
+    """
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-version'], capture_output=True, text=True)
+    except OSError:
+        return None
+    match = re.match(r'ffmpeg version n?(\d+)\.(\d+)', result.stdout)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _file_key(path):
+    """Memo key that changes when the file is replaced or rewritten"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _memo_get(memo, key):
+    with _lock:
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+    return None
+
+
+def _memo_put(memo, key, value):
+    with _lock:
+        memo[key] = value
+        memo.move_to_end(key)
+        while len(memo) > PROBE_CACHE_SIZE:
+            memo.popitem(last=False)
+
+
+def _rate(value):
+    """Frames per second from an ffprobe rate like '30000/1001' (0 if unknown)"""
+    try:
+        num, _, den = str(value).partition('/')
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _rotation(stream):
+    """Display rotation in degrees from the display matrix or the legacy rotate tag"""
+    for side_data in stream.get('side_data_list') or []:
+        if 'rotation' in side_data:
+            return int(float(side_data['rotation'])) % 360
+    try:
+        return int((stream.get('tags') or {}).get('rotate', 0)) % 360
+    except ValueError:
+        return 0
+
+
+def _ffprobe_metadata(path):
+    """Metadata from one ffprobe JSON call; None when ffprobe is missing or fails"""
+    cmd = ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.warning(f"ffprobe failed for {path}: {result.stderr.strip()}")
+        return None
+
+    info = json.loads(result.stdout)
+    streams = info.get('streams') or []
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if video is None:
+        return None
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    fps = _rate(video.get('avg_frame_rate')) or _rate(video.get('r_frame_rate'))
+    duration = float((info.get('format') or {}).get('duration') or video.get('duration') or 0)
+    try:
+        # Input seeks (-ss) are relative to this, packet timestamps are not
+        start_time = float((info.get('format') or {}).get('start_time') or 0)
+    except ValueError:
+        start_time = 0.0
+    try:
+        total_frames = int(video['nb_frames'])
+    except (KeyError, ValueError):
+        total_frames = int(round(duration * fps))
+
+    return {
+        'coded_width': int(video['width']),
+        'coded_height': int(video['height']),
+        'rotation': _rotation(video),
+        'fps': fps,
+        'duration': duration,
+        'start_time': start_time,
+        'total_frames': total_frames,
+        'video_codec': video.get('codec_name'),
+        'pix_fmt': video.get('pix_fmt'),
+        'video_bit_rate': int(video['bit_rate']) if str(video.get('bit_rate', '')).isdigit() else None,
+        'audio_codec': audio.get('codec_name') if audio else None,
+        'audio_channels': audio.get('channels') if audio else None,
+        'audio_sample_rate': int(audio['sample_rate']) if audio and audio.get('sample_rate') else None,
+        'container': (info.get('format') or {}).get('format_name'),
+        'source': 'ffprobe'
+    }
+
+
+def _opencv_metadata(path):
+    """Dimensions, fps and frame count from OpenCV when ffprobe is unavailable"""
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return {
+            'coded_width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'coded_height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'rotation': int(cap.get(cv2.CAP_PROP_ORIENTATION_META)) % 360,
+            'fps': fps,
+            'duration': total_frames / fps if fps > 0 else 0,
+            'start_time': 0.0,
+            'total_frames': total_frames,
+            'video_codec': None,
+            'pix_fmt': None,
+            'video_bit_rate': None,
+            'audio_codec': None,
+            'audio_channels': None,
+            'audio_sample_rate': None,
+            'container': None,
+            'source': 'opencv'
+        }
+    finally:
+        cap.release()
+
+
+def probe_video(path):
+    """
+    Compact metadata of a video, memoised per file version
+    width/height are the displayed size (after rotation), which is what
+    decoded frames and ffmpeg filters see; 'gop' is filled in by probe_gop
+    Raises ValueError when the file cannot be read as a video
+    """
+    key = _file_key(path)
+    metadata = _memo_get(_metadata, key)
+    if metadata is not None:
+        return metadata
+
+    metadata = _ffprobe_metadata(path) if tool_available('ffprobe') else None
+    if metadata is None:
+        metadata = _opencv_metadata(path)
+    if metadata is None:
+        raise ValueError(f"Could not open video: {path}")
+
+    if metadata['rotation'] in (90, 270):
+        metadata['width'], metadata['height'] = metadata['coded_height'], metadata['coded_width']
+    else:
+        metadata['width'], metadata['height'] = metadata['coded_width'], metadata['coded_height']
+    metadata['has_audio'] = metadata['audio_codec'] is not None
+    metadata['gop'] = None
+
+    _memo_put(_metadata, key, metadata)
+    return metadata
+
+
+def probe_packets(path):
+    """
+    (pts_time, flags) of every packet of the first video stream (demuxing
+    only, no decoding), memoised per file version; None without ffprobe
+    """
+    if not tool_available('ffprobe'):
+        return None
+
+    key = _file_key(path)
+    packets = _memo_get(_packets, key)
+    if packets is not None:
+        return packets
+
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+
+    packets = []
+    for line in result.stdout.split():
+        pts_time, _, flags = line.partition(',')
+        try:
+            packets.append((float(pts_time), flags))
+        except ValueError:
+            packets.append((None, flags))
+
+    _memo_put(_packets, key, packets)
+    return packets
+
+
+def probe_gop(path):
+    """
+    Packet and keyframe counts of the first video stream, stored in the
+    file's metadata record; None when there is no packet information
+    """
+    metadata = probe_video(path)
+    if metadata['gop'] is None:
+        packets = probe_packets(path)
+        keyframes = sum(1 for _, flags in packets or [] if flags.startswith('K'))
+        if not keyframes:
+            return None
+        metadata['gop'] = {
+            'packets': len(packets),
+            'keyframes': keyframes,
+            'mean_gop': round(len(packets) / keyframes, 1)
+        }
+    return metadata['gop']
+
+
+# Streams that can go into the MP4 outputs unchanged
+COPY_AUDIO_CODECS = ('aac',)
+COPY_VIDEO_CODECS = ('h264',)
+COPY_PIX_FMTS = ('yuv420p', 'yuvj420p')
+
+
+def audio_args(metadata, bitrate='128k'):
+    """
+    ffmpeg audio output options for a probed source: stream copy when the
+    audio already suits MP4, AAC otherwise, -an when there is no audio
+    """
+    if not metadata['has_audio']:
+        return ['-an']
+    if metadata['audio_codec'] in COPY_AUDIO_CODECS:
+        return ['-c:a', 'copy']
+    return ['-c:a', 'aac', '-b:a', bitrate]
+
+
+def video_passthrough(metadata, crop, width, height):
+    """
+    Whether a (crop_x, crop_y, crop_width, crop_height) crop scaled to
+    width x height leaves the video untouched, and the source stream is
+    H.264 4:2:0 without rotation, so it can be remuxed with -c:v copy
+    """
+    return (
+        tuple(crop) == (0, 0, metadata['width'], metadata['height'])
+        and (width, height) == (metadata['width'], metadata['height'])
+        and metadata['rotation'] == 0
+        and metadata['video_codec'] in COPY_VIDEO_CODECS
+        and metadata['pix_fmt'] in COPY_PIX_FMTS
+    )
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Interchangeable YOLOv8 detector backends
+'ultralytics' runs the PyTorch model; 'onnx' runs an exported (optionally
+int8-quantized) model with ONNX Runtime on the CPU, which imports in a
+fraction of the time and needs no torch. Both return the same boxes.
+"""
+
+import os
+import ast
+import logging
+import importlib.util
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ULTRALYTICS_AVAILABLE = importlib.util.find_spec('ultralytics') is not None
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec('onnxruntime') is not None
+
+YOLO_BACKENDS = ('ultralytics', 'onnx')
+DEFAULT_YOLO_BACKEND = os.environ.get('YOLO_BACKEND', 'ultralytics')
+DEFAULT_YOLO_WEIGHTS = 'yolov8n.pt'
+DEFAULT_ONNX_MODEL = os.environ.get('YOLO_ONNX_MODEL', 'yolov8n.onnx')
+
+# Ultralytics prediction defaults, so both backends keep the same boxes
+NMS_IOU = 0.7
+MAX_DETECTIONS = 300
+LETTERBOX_COLOR = (114, 114, 114)
+
+# Offset separating classes so one NMS pass is still per class
+CLASS_OFFSET = 7680
+
+# Most images sent through one forward pass
+DEFAULT_BATCH_SIZE = int(os.environ.get('YOLO_BATCH_SIZE', '8'))
+
+COCO_NAMES = (
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat',
+    'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat', 'dog',
+    'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack', 'umbrella',
+    'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard', 'sports ball', 'kite',
+    'baseball bat', 'baseball glove', 'skateboard', 'surfboard', 'tennis racket', 'bottle',
+    'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple', 'sandwich', 'orange',
+    'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair', 'couch', 'potted plant',
+    'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse', 'remote', 'keyboard', 'cell phone',
+    'microwave', 'oven', 'toaster', 'sink', 'refrigerator', 'book', 'clock', 'vase', 'scissors',
+    'teddy bear', 'hair drier', 'toothbrush'
+)
+
+
+class UltralyticsYolo:
+    name = 'ultralytics'
+
+    def __init__(self, weights=DEFAULT_YOLO_WEIGHTS, threads=None):
+        """PyTorch YOLOv8 through ultralytics; threads caps torch intra-op threads"""
+        from ultralytics import YOLO
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = YOLO(weights)
+        self.names = self.model.names
+
+    def detect(self, bgr, conf=0.25):
+        """Boxes as an (N, 6) array of x1, y1, x2, y2, confidence, class in image pixels"""
+        return self.detect_batch([bgr], conf)[0]
+
+    def detect_batch(self, images, conf=0.25, batch_size=DEFAULT_BATCH_SIZE):
+        """detect() for a list of BGR images, batch_size images per forward pass"""
+        detections = []
+        for start in range(0, len(images), batch_size):
+            for result in self.model(list(images[start:start + batch_size]), verbose=False, conf=conf):
+                if result.boxes is None:
+                    detections.append(np.zeros((0, 6), dtype=np.float32))
+                else:
+                    detections.append(result.boxes.data.cpu().numpy())
+        return detections
+
+
+class OnnxYolo:
+    name = 'onnx'
+
+    def __init__(self, model_path=DEFAULT_ONNX_MODEL, threads=None):
+        """
+        Exported YOLOv8 model on ONNX Runtime's CPU provider
+        threads caps ONNX Runtime intra-op threads
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # Models exported without a dynamic batch axis take one image per run
+        self.max_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+
+        # Dynamic axes are reported as strings; exports default to 640
+        size = model_input.shape[2:4]
+        self.input_size = tuple(s if isinstance(s, int) else 640 for s in size)
+        self.names = _model_names(self.session)
+
+    def _letterbox(self, bgr):
+        """Resize keeping the aspect ratio and pad to the model input, as ultralytics does"""
+        height, width = bgr.shape[:2]
+        input_height, input_width = self.input_size
+        ratio = min(input_height / height, input_width / width)
+        resized_width, resized_height = round(width * ratio), round(height * ratio)
+        pad_x = (input_width - resized_width) / 2
+        pad_y = (input_height - resized_height) / 2
+
+        if (resized_width, resized_height) != (width, height):
+            bgr = cv2.resize(bgr, (resized_width, resized_height), interpolation=cv2.INTER_LINEAR)
+        top, left = round(pad_y - 0.1), round(pad_x - 0.1)
+        bgr = cv2.copyMakeBorder(
+            bgr, top, round(pad_y + 0.1), left, round(pad_x + 0.1),
+            cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR
+        )
+
+        # HWC BGR uint8 -> NCHW RGB float
+        blob = np.ascontiguousarray(bgr[:, :, ::-1].transpose(2, 0, 1), dtype=np.float32)
+        blob /= 255.0
+        return blob[None], ratio, (left, top)
+
+    def detect(self, bgr, conf=0.25):
+        """Boxes as an (N, 6) array of x1, y1, x2, y2, confidence, class in image pixels"""
+        return self.detect_batch([bgr], conf)[0]
+
+    def detect_batch(self, images, conf=0.25, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        detect() for a list of BGR images of any sizes
+        Every image is letterboxed to the model input so up to batch_size of
+        them share one forward pass
+        """
+        if self.max_batch:
+            batch_size = min(batch_size, self.max_batch)
+
+        detections = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            letterboxed = [self._letterbox(image) for image in chunk]
+            blob = np.concatenate([blob for blob, _, _ in letterboxed])
+
+            # (batch, 4 + classes, anchors)
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+            for image, output, (_, ratio, pad) in zip(chunk, outputs, letterboxed):
+                detections.append(self._postprocess(output.T, image.shape, ratio, pad, conf))
+        return detections
+
+    def _postprocess(self, predictions, shape, ratio, pad, conf):
+        """Filter, map back and NMS one image's (anchors, 4 + classes) predictions"""
+        pad_x, pad_y = pad
+        scores = predictions[:, 4:]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), classes]
+
+        keep = confidences > conf
+        if not keep.any():
+            return np.zeros((0, 6), dtype=np.float32)
+        predictions, classes, confidences = predictions[keep], classes[keep], confidences[keep]
+
+        # Centre/size -> corners in source pixels
+        cx, cy, bw, bh = predictions[:, :4].T
+        height, width = shape[:2]
+        boxes = np.stack([
+            np.clip((cx - bw / 2 - pad_x) / ratio, 0, width),
+            np.clip((cy - bh / 2 - pad_y) / ratio, 0, height),
+            np.clip((cx + bw / 2 - pad_x) / ratio, 0, width),
+            np.clip((cy + bh / 2 - pad_y) / ratio, 0, height)
+        ], axis=1)
+
+        # Per-class NMS in one call by moving each class to its own region
+        shifted = boxes + classes[:, None] * CLASS_OFFSET
+        rects = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), confidences.tolist(), conf, NMS_IOU)
+        indices = np.asarray(indices, dtype=np.intp).reshape(-1)[:MAX_DETECTIONS]
+
+        return np.column_stack([boxes[indices], confidences[indices], classes[indices]]).astype(np.float32)
+
+
+def _model_names(session):
+    """Class names stored in the model metadata by the ultralytics exporter"""
+    try:
+        names = session.get_modelmeta().custom_metadata_map.get('names')
+        if names:
+            return {int(k): v for k, v in ast.literal_eval(names).items()}
+    except (ValueError, SyntaxError, AttributeError) as e:
+        logger.warning(f"Could not read class names from ONNX metadata: {e}")
+    return dict(enumerate(COCO_NAMES))
+
+
+def backend_available(backend):
+    """Whether the libraries a backend needs are installed"""
+    if backend == 'onnx':
+        return ONNXRUNTIME_AVAILABLE
+    return ULTRALYTICS_AVAILABLE
+
+
+def load_yolo(backend=None, model_path=None, threads=None):
+    """
+    Load a YOLO backend ('ultralytics' or 'onnx'); model_path overrides the
+    default weights (e.g. an int8 ONNX export)
+    """
+    backend = backend or DEFAULT_YOLO_BACKEND
+    if backend not in YOLO_BACKENDS:
+        raise ValueError(f"Unknown YOLO backend: {backend}")
+
+    if backend == 'onnx':
+        return OnnxYolo(model_path or DEFAULT_ONNX_MODEL, threads)
+    return UltralyticsYolo(model_path or DEFAULT_YOLO_WEIGHTS, threads)
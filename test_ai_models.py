@@ -131,7 +131,8 @@ def test_advanced_processor():
     print("\nTesting Advanced Media Processor...")
     
     try:
-        from server.advanced_media_processor import AdvancedMediaProcessor
+        sys.path.append('server')
+        from advanced_media_processor import AdvancedMediaProcessor
         
         processor = AdvancedMediaProcessor()
         print("✓ AdvancedMediaProcessor initialized successfully")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Unit tests for keyframe-aligned parallel encoding in advanced_video_processor.py
+(segment planning, seek offsets, concat lists and the frame-count check)
+"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import advanced_video_processor
+from advanced_video_processor import AdvancedVideoProcessor
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.delenv('DETECTION_CACHE_DIR', raising=False)
+
+
+@pytest.fixture
+def processor():
+    return AdvancedVideoProcessor()
+
+
+def packets(count=100, fps=25, gop=25, start=0.0):
+    """(pts_time, flags) of count frames with a keyframe every gop frames"""
+    return [(round(start + i / fps, 6), 'K__' if i % gop == 0 else '___') for i in range(count)]
+
+
+def test_boundaries_snap_to_keyframes(processor):
+    plan = processor._plan_chunks(packets(), 4)
+    assert plan == [(0.0, 25), (1.0, 25), (2.0, 25), (3.0, 25)]
+
+    # Targets between keyframes go to the nearest one
+    plan = processor._plan_chunks(packets(gop=40), 3)
+    assert [start for start, _ in plan] == [0.0, 1.6, 3.2]
+
+
+def test_duplicate_boundaries_are_merged(processor):
+    # Every interior target snaps to the keyframe at 2 s, or to the first frame
+    sparse = [(pts, 'K__' if pts in (0.0, 2.0) else '___') for pts, _ in packets()]
+    assert processor._plan_chunks(sparse, 4) == [(0.0, 50), (2.0, 50)]
+
+
+@pytest.mark.parametrize('chunks', [2, 3, 4, 7, 16])
+def test_frame_counts_sum_to_packets(processor, chunks):
+    source = packets(count=301, gop=12, start=1.4)
+    plan = processor._plan_chunks(source, chunks)
+    assert sum(count for _, count in plan) == len(source)
+    assert len(plan) <= chunks
+    assert all(count > 0 for _, count in plan)
+    assert plan[0][0] == 1.4
+
+
+def test_decode_order_counts_frames_in_presentation_order(processor):
+    # B-frames: packets arrive out of presentation order
+    source = packets(count=50, gop=10)
+    reordered = []
+    for i in range(0, 50, 3):
+        reordered.extend(reversed(source[i:i + 3]))
+    assert processor._plan_chunks(reordered, 5) == processor._plan_chunks(source, 5)
+
+
+def test_unsplittable_videos(processor):
+    assert processor._plan_chunks([(None, 'K__')] + packets()[1:], 4) is None
+    assert processor._plan_chunks(packets(gop=1000), 4) is None
+    assert processor._plan_chunks([(pts, '___') for pts, _ in packets()], 4) is None
+
+
+class FakeFfmpeg:
+    """Stands in for run_ffmpeg and probe_packets around _encode_chunked"""
+
+    def __init__(self, monkeypatch, source, encoded_frames=None):
+        self.source = source
+        self.encoded_frames = encoded_frames
+        self.commands = []
+        self.concat_lists = []
+        monkeypatch.setattr(advanced_video_processor, 'run_ffmpeg', self.run)
+        monkeypatch.setattr(advanced_video_processor, 'probe_packets', self.probe)
+
+    def run(self, cmd, on_update=None):
+        self.commands.append(cmd)
+        if 'concat' in cmd:
+            with open(cmd[cmd.index('-i') + 1]) as f:
+                self.concat_lists.append(f.read().splitlines())
+        return subprocess.CompletedProcess(cmd, 0, None, '')
+
+    def probe(self, path):
+        if path == 'in.mp4':
+            return self.source
+        return [(0.0, 'K__')] * (self.encoded_frames or len(self.source))
+
+    def segments(self):
+        return [cmd for cmd in self.commands if 'concat' not in cmd]
+
+
+def outputs():
+    crop = {'x': 100, 'y': 0, 'width': 608, 'height': 1080}
+    return [(crop, (1080, 1920), '/out/story.mp4'), (crop, (720, 1280), '/out/reel.mp4')]
+
+
+METADATA = {'start_time': 1.4, 'has_audio': True, 'audio_codec': 'aac'}
+
+
+def test_segments_seek_relative_to_start_time(processor, monkeypatch):
+    fake = FakeFfmpeg(monkeypatch, packets(start=1.4))
+    assert processor._encode_chunked('in.mp4', outputs(), 'medium', False, 4, metadata=METADATA) == 4
+
+    # Segments run in parallel, so their commands arrive in any order
+    segments = fake.segments()
+    assert sum('-ss' not in cmd for cmd in segments) == 1
+    seeks = sorted(float(cmd[cmd.index('-ss') + 1]) for cmd in segments if '-ss' in cmd)
+    # Keyframes at 2.4, 3.4 and 4.4 s are 1, 2 and 3 s after start_time
+    assert seeks == pytest.approx([0.9995, 1.9995, 2.9995])
+
+    for cmd in fake.segments():
+        assert cmd[cmd.index('-frames:v') + 1] == '25'
+        assert cmd.count('-an') == 2 and '-map' in cmd
+
+
+def test_concat_lists_and_audio(processor, monkeypatch):
+    fake = FakeFfmpeg(monkeypatch, packets(start=1.4))
+    processor._encode_chunked('in.mp4', outputs(), 'medium', False, 4, metadata=METADATA)
+
+    # One list per output, segments in order
+    assert len(fake.concat_lists) == 2
+    for i, lines in enumerate(fake.concat_lists):
+        names = [os.path.basename(line.split("'")[1]) for line in lines]
+        assert names == [f"segment-{chunk:04d}-{i}.mp4" for chunk in range(4)]
+
+    concat = [cmd for cmd in fake.commands if 'concat' in cmd]
+    assert [cmd[-1] for cmd in concat] == ['/out/story.mp4', '/out/reel.mp4']
+    for cmd in concat:
+        assert cmd[cmd.index('-map') + 1:cmd.index('-map') + 4] == ['0:v', '-c:v', 'copy']
+        assert ['-map', '1:a:0', '-c:a', 'copy'] == cmd[cmd.index('1:a:0') - 1:cmd.index('1:a:0') + 3]
+
+
+def test_frame_count_mismatch_raises(processor, monkeypatch):
+    FakeFfmpeg(monkeypatch, packets(start=1.4), encoded_frames=60)
+    with pytest.raises(RuntimeError, match='60 frames, expected 100'):
+        processor._encode_chunked('in.mp4', outputs(), 'medium', False, 4, metadata=METADATA)
+
+
+def test_unsplittable_video_writes_nothing(processor, monkeypatch):
+    fake = FakeFfmpeg(monkeypatch, packets(gop=1000))
+    assert processor._encode_chunked('in.mp4', outputs(), 'medium', False, 4, metadata=METADATA) == 1
+    assert fake.commands == []
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Unit tests for bulk contour measurements (server/contour_stats.py)
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from contour_stats import contour_stats
+
+
+def random_contours(seed):
+    """findContours result of random filled shapes, lines and single pixels"""
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((240, 320), dtype=np.uint8)
+    for _ in range(25):
+        x, y = int(rng.integers(0, 320)), int(rng.integers(0, 240))
+        shape = rng.integers(0, 4)
+        if shape == 0:
+            cv2.circle(mask, (x, y), int(rng.integers(1, 30)), 255, -1)
+        elif shape == 1:
+            points = rng.integers(0, [320, 240], size=(int(rng.integers(3, 8)), 2)).astype(np.int32)
+            cv2.fillPoly(mask, [points], 255)
+        elif shape == 2:
+            cv2.line(mask, (x, y), (int(rng.integers(0, 320)), int(rng.integers(0, 240))), 255, 1)
+        else:
+            mask[y, x] = 255
+    contours, _ = cv2.findContours(mask, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+
+def test_empty():
+    areas, rects = contour_stats([])
+    assert areas.shape == (0,) and rects.shape == (0, 4)
+
+
+def test_matches_opencv():
+    for seed in range(10):
+        contours = random_contours(seed)
+        areas, rects = contour_stats(contours)
+        assert len(areas) == len(contours)
+        for contour, area, rect in zip(contours, areas, rects):
+            assert area == cv2.contourArea(contour)
+            assert area == abs(cv2.moments(contour)['m00'])
+            assert tuple(rect) == cv2.boundingRect(contour)
+
+
+def test_single_point_and_line_contours():
+    point = np.array([[[5, 7]]], dtype=np.int32)
+    line = np.array([[[0, 0]], [[10, 0]]], dtype=np.int32)
+    areas, rects = contour_stats([point, line])
+    assert list(areas) == [0.0, 0.0]
+    assert [tuple(r) for r in rects] == [(5, 7, 1, 1), (0, 0, 11, 1)]
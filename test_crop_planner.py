@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the summed-area-table crop planner (server/crop_planner.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from crop_planner import crop_size, importance_map, plan_crops, analysis_regions, PLANNER_GRID
+
+
+def brute_force(weights, crop_width, crop_height):
+    """Window with the most importance, ties to the one centred nearest the centroid"""
+    height, width = weights.shape
+    total = weights.sum()
+    centroid_x = (weights.sum(axis=0) * (np.arange(width) + 0.5)).sum() / total
+    centroid_y = (weights.sum(axis=1) * (np.arange(height) + 0.5)).sum() / total
+
+    kept = {
+        (x, y): weights[y:y + crop_height, x:x + crop_width].sum()
+        for y in range(height - crop_height + 1)
+        for x in range(width - crop_width + 1)
+    }
+    best = max(kept.values())
+    ties = [position for position, value in kept.items() if value >= best - total * 1e-9]
+    return min(ties, key=lambda p: (
+        (p[0] + crop_width / 2 - centroid_x) ** 2 + (p[1] + crop_height / 2 - centroid_y) ** 2,
+        p[1], p[0]
+    ))
+
+
+def random_regions(rng, count):
+    regions = []
+    for _ in range(count):
+        x, y = rng.uniform(0, 0.9, size=2)
+        w, h = rng.uniform(0.02, 0.4, size=2)
+        regions.append((x, y, w, h, rng.uniform(0.1, 3.0)))
+    return regions
+
+
+def test_crop_size_keeps_target_ratio():
+    assert crop_size(1920, 1080, 1080, 1920) == (607, 1080)
+    assert crop_size(1080, 1920, 1920, 1080) == (1080, 607)
+    assert crop_size(1000, 1000, 500, 500) == (1000, 1000)
+
+
+def test_importance_map_keeps_each_region_weight():
+    regions = [(0.1, 0.2, 0.3, 0.3, 2.0), (0.5, 0.5, 0.2, 0.1, 1.5)]
+    weights = importance_map(regions, 16 / 9)
+    assert weights.shape == (72, PLANNER_GRID)
+    assert weights.sum() == pytest.approx(3.5)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_plan_crops_matches_brute_force(seed):
+    # One pixel per cell, so the planner's window maps straight to pixels
+    rng = np.random.default_rng(seed)
+    width, height = PLANNER_GRID, 72
+    regions = random_regions(rng, int(rng.integers(1, 6)))
+    weights = importance_map(regions, width / height)
+    targets = [(9, 16), (1, 1), (4, 5), (1080, 1350)]
+
+    for target, crop in zip(targets, plan_crops(width, height, targets, regions)):
+        crop_width, crop_height = crop_size(width, height, *target)
+        assert crop[2:] == (crop_width, crop_height)
+        assert crop[:2] == brute_force(weights, crop_width, crop_height)
+
+
+def test_ties_go_to_the_window_centred_on_the_subjects():
+    # A small subject fits in many square windows; the chosen one is centred on it
+    crop = plan_crops(1600, 900, [(1, 1)], [(0.3, 0.4, 0.05, 0.1, 1.0)])[0]
+    assert crop[2:] == (900, 900)
+    assert crop[0] + crop[2] / 2 == pytest.approx(0.325 * 1600, abs=1600 / PLANNER_GRID)
+
+
+def test_centred_without_regions():
+    assert plan_crops(1920, 1080, [(1, 1)], []) == [(420, 0, 1080, 1080)]
+    assert plan_crops(1920, 1080, [(1, 1)], [(0.1, 0.1, 0.1, 0.1, 0.0)]) == [(420, 0, 1080, 1080)]
+
+
+def test_analysis_regions_fall_back_to_bounding_box():
+    analysis = {'bounding_box': {'x': 10, 'y': 20, 'width': 30, 'height': 40}}
+    assert analysis_regions(analysis) == [(0.1, 0.2, 0.3, 0.4, 1.0)]
+    analysis['regions'] = [{'x': 50, 'y': 50, 'width': 10, 'height': 10, 'weight': 2.0}]
+    assert analysis_regions(analysis) == [(0.5, 0.5, 0.1, 0.1, 2.0)]
+    assert analysis_regions(None) == []
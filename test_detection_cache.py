@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the content-addressed detection cache (server/detection_cache.py)
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import detection_cache
+from detection_cache import DetectionCache
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / 'media.bin'
+    path.write_bytes(b'pixels')
+    return str(path)
+
+
+def entries(cache):
+    return sorted(
+        name for shard in os.scandir(cache.directory) if shard.is_dir()
+        for name in os.listdir(shard.path) if name.endswith('.json')
+    )
+
+
+def age(cache, key, seconds):
+    """Make an entry look seconds older for LRU ordering"""
+    path = cache._entry_path(key)
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_hit_and_miss(tmp_path, media):
+    cache = DetectionCache(str(tmp_path / 'cache'))
+    key = cache.key(media, {'detectors': ['face']})
+    assert cache.get(key) is None
+    cache.put(key, {'faces': [1, 2]})
+    assert cache.get(key) == {'faces': [1, 2]}
+
+
+def test_key_depends_on_content_config_and_version(tmp_path, media, monkeypatch):
+    cache = DetectionCache(str(tmp_path / 'cache'))
+    key = cache.key(media, {'detectors': ['face']})
+
+    assert cache.key(media, {'detectors': ['face', 'yolo']}) != key
+
+    monkeypatch.setattr(detection_cache, 'CACHE_VERSION', detection_cache.CACHE_VERSION + 1)
+    assert cache.key(media, {'detectors': ['face']}) != key
+    monkeypatch.undo()
+
+    with open(media, 'ab') as f:
+        f.write(b'!')
+    assert cache.key(media, {'detectors': ['face']}) != key
+
+
+def test_unreadable_entry_is_a_miss(tmp_path, media):
+    cache = DetectionCache(str(tmp_path / 'cache'))
+    key = cache.key(media, {})
+    cache.put(key, {'a': 1})
+    with open(cache._entry_path(key), 'w') as f:
+        f.write('{truncated')
+    assert cache.get(key) is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DetectionCache(str(tmp_path / 'cache'), max_bytes=10 ** 9)
+    payload = {'data': 'x' * 1000}
+    keys = [f'{i:02x}' * 32 for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.put(key, payload)
+        age(cache, key, 100 - i)
+
+    # Reading the oldest entry makes it the most recently used
+    cache.get(keys[0])
+
+    size = os.path.getsize(cache._entry_path(keys[0]))
+    cache.max_bytes = size * 3
+    cache.evict()
+
+    # Down to the low-water mark: the two least recently used are gone
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[3]) is not None
+    assert cache._estimated_bytes == 2 * size
+
+
+def test_puts_do_not_rescan_until_needed(tmp_path, monkeypatch):
+    cache = DetectionCache(str(tmp_path / 'cache'), max_bytes=10 ** 9)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda: (scans.append(1), evict()))
+
+    for i in range(10):
+        cache.put(f'{i:064x}', {'i': i})
+    # Only the first write scans (the estimate starts unknown)
+    assert len(scans) == 1
+    assert cache._estimated_bytes == sum(
+        os.path.getsize(cache._entry_path(f'{i:064x}')) for i in range(10)
+    )
+
+    # Exceeding max_bytes by estimate alone triggers a scan and eviction
+    cache.max_bytes = cache._estimated_bytes
+    cache.put('ff' * 32, {'i': 'last'})
+    assert len(scans) == 2
+    assert cache._estimated_bytes <= cache.max_bytes * detection_cache.EVICT_LOW_WATER
+
+
+def test_periodic_scan_picks_up_other_writers(tmp_path, monkeypatch):
+    monkeypatch.setattr(detection_cache, 'EVICT_SCAN_WRITES', 3)
+    directory = str(tmp_path / 'cache')
+    cache, other = DetectionCache(directory), DetectionCache(directory)
+    cache.put('aa' * 32, {'a': 1})  # first write scans
+    other.put('bb' * 32, {'b': 1})
+    cache.put('cc' * 32, {'c': 1})
+    cache.put('dd' * 32, {'d': 1})
+    assert cache._writes_since_scan == 2
+    cache.put('ee' * 32, {'e': 1})
+    assert cache._writes_since_scan == 0
+    assert cache._estimated_bytes == sum(
+        os.path.getsize(os.path.join(directory, name[:2], name)) for name in entries(cache)
+    )
+
+
+@pytest.mark.skipif(detection_cache.fcntl is None, reason='needs fcntl')
+def test_evict_skips_while_another_process_holds_the_lock(tmp_path):
+    cache = DetectionCache(str(tmp_path / 'cache'), max_bytes=10 ** 9)
+    cache.put('aa' * 32, {'data': 'x' * 100})
+    cache.max_bytes = 1
+
+    with open(os.path.join(cache.directory, '.evict.lock'), 'a') as lock:
+        detection_cache.fcntl.flock(lock, detection_cache.fcntl.LOCK_EX)
+        cache.evict()
+        assert entries(cache) == ['aa' * 32 + '.json']
+
+    cache.evict()
+    assert entries(cache) == []
+
+
+def test_image_key_loads_no_models(tmp_path, media, monkeypatch):
+    from advanced_media_processor import AdvancedMediaProcessor
+
+    cache = DetectionCache(str(tmp_path / 'cache'))
+    processor = AdvancedMediaProcessor(detectors='face,pose,yolo,saliency', cache=cache)
+    monkeypatch.setattr(processor, '_load_model', lambda name: pytest.fail(f'loaded {name}'))
+    assert processor.detection_cache_key(media)
+
+
+def test_image_key_depends_on_yolo_model(tmp_path, media):
+    from advanced_media_processor import AdvancedMediaProcessor
+
+    cache = DetectionCache(str(tmp_path / 'cache'))
+    model = tmp_path / 'yolov8n.onnx'
+
+    def key(model_path):
+        processor = AdvancedMediaProcessor(
+            detectors='yolo', cache=cache, yolo_backend='onnx', yolo_model_path=str(model_path)
+        )
+        return processor.detection_cache_key(media)
+
+    missing = key(model)
+    model.write_bytes(b'onnx')
+    assert key(model) != missing
+    assert key(tmp_path / 'yolov8n.int8.onnx') != key(model)
+
+
+def test_results_without_an_expected_model_are_not_cached(tmp_path, media):
+    from advanced_media_processor import AdvancedMediaProcessor
+    import cv2
+    import numpy as np
+
+    image = str(tmp_path / 'image.png')
+    cv2.imwrite(image, np.full((60, 80, 3), 128, dtype=np.uint8))
+    model = tmp_path / 'yolov8n.onnx'
+    model.write_bytes(b'onnx')
+
+    cache = DetectionCache(str(tmp_path / 'cache'))
+    processor = AdvancedMediaProcessor(
+        detectors='yolo,saliency', cache=cache, yolo_backend='onnx', yolo_model_path=str(model)
+    )
+
+    # The model file is there but fails to load: nothing is cached
+    processor._models['yolo'] = None
+    result = processor.detect_subjects(image)
+    assert result['stages']['unavailable'] == ['yolo'] and 'cache' not in result
+    assert entries(cache) == []
+
+    # Once it loads, the result is cached with the detectors that ran
+    processor._models['yolo'] = object()
+    processor._detect_objects = lambda analysis, w, h: []
+    result = processor.detect_subjects(image)
+    assert result['cache'] == 'miss'
+    cached = processor.detect_subjects(image)
+    assert cached['cache'] == 'hit' and cached['stages']['ran'] == ['yolo', 'saliency']
+
+
+def test_video_key_depends_on_model_path_and_tracking(tmp_path, media, monkeypatch):
+    import advanced_video_processor
+    from advanced_video_processor import AdvancedVideoProcessor
+
+    cache = DetectionCache(str(tmp_path / 'cache'))
+    configs = []
+    key = cache.key
+    monkeypatch.setattr(cache, 'key', lambda path, config: (configs.append(config), key(path, config))[1])
+
+    def analyse(model_path, sampling):
+        processor = AdvancedVideoProcessor(cache=cache, yolo_backend='onnx', yolo_model_path=model_path)
+        processor.yolo_model = object()
+        monkeypatch.setattr(processor, '_sample_detections', lambda *args: ({'width': 64, 'height': 64}, []))
+        processor.analyze_video_targets(media, [(32, 32)], sampling=sampling)
+        return configs[-1]
+
+    assert analyse('yolov8n.onnx', 'seek') != analyse('yolov8n.int8.onnx', 'seek')
+    assert 'track' not in analyse('yolov8n.onnx', 'seek')
+
+    tracked = analyse('yolov8n.onnx', 'track')
+    monkeypatch.setattr(advanced_video_processor, 'TRACK_FPS', advanced_video_processor.TRACK_FPS * 2)
+    assert analyse('yolov8n.onnx', 'track') != tracked
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Unit tests for detector scoring and the cascade in advanced_media_processor.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from advanced_media_processor import AdvancedMediaProcessor, DETECTOR_SCORE_CEILING, _clip_box
+from media_frame import MediaFrame
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.delenv('DETECTION_CACHE_DIR', raising=False)
+
+
+def frame(w=400, h=300):
+    return MediaFrame(bgr=np.full((h, w, 3), 128, dtype=np.uint8))
+
+
+def fake_models(processor, faces=(), poses=(), objects=()):
+    """Pretend face, pose and yolo are loaded and return the given detections"""
+    processor._models.update({'face': object(), 'pose': object(), 'yolo': object()})
+    processor._detect_faces = lambda analysis, w, h: list(faces)
+    processor._detect_poses = lambda analysis, w, h: list(poses)
+    processor._detect_objects_batch = lambda analyses: [list(objects) for _ in analyses]
+
+
+def test_clip_box():
+    assert _clip_box((-10, -10, 50, 50), 100, 100) == (0, 0, 40, 40)
+    assert _clip_box((80, 90, 50, 50), 100, 100) == (80, 90, 20, 10)
+    assert _clip_box((200, 0, 10, 10), 100, 100)[2] == 0
+
+
+def test_scores_never_exceed_ceilings():
+    processor = AdvancedMediaProcessor()
+    rng = np.random.default_rng(1)
+    w, h = 640, 360
+    for _ in range(200):
+        x, y = rng.uniform(-w, w), rng.uniform(-h, h)
+        size = rng.uniform(1, 3 * w)
+        shoulder = rng.uniform(0, 2 * w)
+        results = {
+            'faces': [{'x': x, 'y': y, 'width': size, 'height': size, 'confidence': 1.0,
+                       'center_x': x + size / 2, 'center_y': y + size / 2}],
+            'poses': [{'nose': {'x': x, 'y': y}, 'left_shoulder': {'x': x - shoulder / 2, 'y': y},
+                       'right_shoulder': {'x': x + shoulder / 2, 'y': y}, 'confidence': 1.0}],
+            'objects': [{'class': 'dog', 'x': x, 'y': y, 'width': size, 'height': size / 2, 'confidence': 1.0,
+                         'center_x': x, 'center_y': y}]
+        }
+        ceilings = {'face': DETECTOR_SCORE_CEILING['face'], 'pose': DETECTOR_SCORE_CEILING['pose']}
+        for subject in processor._collect_subjects(results, w, h):
+            ceiling = ceilings.get(subject['type'], DETECTOR_SCORE_CEILING['yolo'])
+            assert processor._subject_score(subject, w, h) <= ceiling + 1e-9
+
+
+def test_unavailable_detectors_are_not_reported_as_ran():
+    processor = AdvancedMediaProcessor(detectors='face,pose,yolo,saliency')
+    processor._models.update({'face': None, 'pose': None, 'yolo': None})
+    stages = processor.detect_subjects(frame())['stages']
+    assert stages['ran'] == ['saliency']
+    assert stages['unavailable'] == ['face', 'pose', 'yolo']
+
+
+def test_skipping_is_opt_in():
+    full_face = {'x': 0, 'y': 0, 'width': 400, 'height': 300, 'confidence': 1.0, 'center_x': 200, 'center_y': 150}
+    pose = {'nose': {'x': 200, 'y': 100}, 'left_shoulder': {'x': 150, 'y': 150},
+            'right_shoulder': {'x': 250, 'y': 150}, 'confidence': 0.9}
+
+    processor = AdvancedMediaProcessor()
+    fake_models(processor, faces=[full_face], poses=[pose])
+    stages = processor.detect_subjects(frame())['stages']
+    assert stages['ran'] == ['face', 'pose', 'yolo'] and stages['skipped'] == []
+
+    processor = AdvancedMediaProcessor(cascade=True)
+    fake_models(processor, faces=[full_face], poses=[pose])
+    stages = processor.detect_subjects(frame())['stages']
+    assert stages['ran'] == ['face'] and stages['skipped'] == ['pose', 'yolo']
+
+
+def test_early_exit_score_works_without_cascade():
+    face = {'x': 100, 'y': 50, 'width': 200, 'height': 200, 'confidence': 1.0, 'center_x': 200, 'center_y': 150}
+    processor = AdvancedMediaProcessor(early_exit_score=0.5)
+    fake_models(processor, faces=[face])
+    stages = processor.detect_subjects(frame())['stages']
+    assert stages['ran'] == ['face'] and stages['skipped'] == ['pose', 'yolo']
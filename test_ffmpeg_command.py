@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the single-decode multi-output ffmpeg command
+(AdvancedVideoProcessor._ffmpeg_command)
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from advanced_video_processor import AdvancedVideoProcessor
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.delenv('DETECTION_CACHE_DIR', raising=False)
+
+
+@pytest.fixture
+def processor():
+    return AdvancedVideoProcessor()
+
+
+OUTPUTS = [
+    ({'x': 656, 'y': 0, 'width': 608, 'height': 1080}, (1080, 1920), '/out/story.mp4'),
+    ({'x': 420, 'y': 0, 'width': 1080, 'height': 1080}, (1080, 1080), '/out/post.mp4'),
+    ({'x': 0, 'y': 0, 'width': 1920, 'height': 1080}, (1280, 720), '/out/thumb.mp4')
+]
+
+METADATA = {
+    'width': 1920, 'height': 1080, 'rotation': 0, 'video_codec': 'h264',
+    'pix_fmt': 'yuv420p', 'audio_codec': 'aac', 'has_audio': True
+}
+
+
+def per_output(cmd, outputs):
+    """The arguments after the filter graph, split at each output path"""
+    start = cmd.index('-filter_complex') + 2 if '-filter_complex' in cmd else cmd.index('-i') + 2
+    parts = []
+    for _, _, path in outputs:
+        end = cmd.index(path)
+        parts.append(cmd[start:end])
+        start = end + 1
+    assert start == len(cmd)
+    return parts
+
+
+def test_split_labels_one_per_output(processor):
+    cmd = processor._ffmpeg_command('in.mp4', OUTPUTS)
+    graph = cmd[cmd.index('-filter_complex') + 1].split(';')
+    assert graph[0] == '[0:v]split=3[s0][s1][s2]'
+    assert len(graph) == 4
+    for i, chain in enumerate(graph[1:]):
+        assert chain.startswith(f'[s{i}]') and chain.endswith(f'[v{i}]')
+
+    for i, args in enumerate(per_output(cmd, OUTPUTS)):
+        assert args[:2] == ['-map', f'[v{i}]']
+
+
+def test_single_output_needs_no_split(processor):
+    cmd = processor._ffmpeg_command('in.mp4', OUTPUTS[:1])
+    assert cmd[cmd.index('-filter_complex') + 1] == '[0:v]crop=608:1080:656:0,scale=1080:1920[v0]'
+
+
+def test_crop_and_scale_per_output(processor):
+    cmd = processor._ffmpeg_command('in.mp4', OUTPUTS)
+    graph = cmd[cmd.index('-filter_complex') + 1].split(';')[1:]
+    assert graph == [
+        '[s0]crop=608:1080:656:0,scale=1080:1920[v0]',
+        '[s1]crop=1080:1080:420:0,scale=1080:1080[v1]',
+        '[s2]crop=1920:1080:0:0,scale=1280:720[v2]'
+    ]
+
+
+def test_each_output_maps_audio_once(processor):
+    # Every output is a separate file, so each one carries the audio track
+    for args in per_output(processor._ffmpeg_command('in.mp4', OUTPUTS), OUTPUTS):
+        assert args.count('0:a:0?') == 1
+        assert args.index('0:a:0?') > args.index('-c:v')
+
+    for args in per_output(processor._ffmpeg_command('in.mp4', OUTPUTS, metadata=METADATA), OUTPUTS):
+        assert args[args.index('0:a:0') - 1:args.index('0:a:0') + 3] == ['-map', '0:a:0', '-c:a', 'copy']
+
+    silent = dict(METADATA, has_audio=False, audio_codec=None)
+    for cmd in (processor._ffmpeg_command('in.mp4', OUTPUTS, audio=False),
+                processor._ffmpeg_command('in.mp4', OUTPUTS, metadata=silent)):
+        for args in per_output(cmd, OUTPUTS):
+            assert args.count('-an') == 1 and not any(arg.startswith('0:a') for arg in args)
+
+
+def test_input_and_output_args_placement(processor):
+    cmd = processor._ffmpeg_command(
+        'in.mp4', OUTPUTS, input_args=['-ss', '2.0', '-t', '5'], output_args=['-frames:v', '125']
+    )
+    assert cmd[:7] == ['ffmpeg', '-y', '-ss', '2.0', '-t', '5', '-i']
+    assert cmd[7] == 'in.mp4'
+    for args in per_output(cmd, OUTPUTS):
+        codec = args.index('-c:v')
+        assert args[codec:codec + 8] == ['-c:v', 'libx264', '-crf', '23', '-preset', 'medium', '-frames:v', '125']
+
+
+def test_quality_preset_and_crf(processor):
+    def x264(**kwargs):
+        args = per_output(processor._ffmpeg_command('in.mp4', OUTPUTS[:1], **kwargs), OUTPUTS[:1])[0]
+        return args[args.index('-crf') + 1], args[args.index('-preset') + 1]
+
+    assert x264() == ('23', 'medium')
+    assert x264(quality='high') == ('18', 'medium')
+    assert x264(quality='high', compress=True) == ('28', 'medium')
+    assert x264(preset='ultrafast', crf='35') == ('35', 'ultrafast')
+
+
+def test_matching_output_copies_video(processor):
+    full = ({'x': 0, 'y': 0, 'width': 1920, 'height': 1080}, (1920, 1080), '/out/full.mp4')
+    outputs = [full, OUTPUTS[0]]
+    cmd = processor._ffmpeg_command('in.mp4', outputs, metadata=METADATA)
+    assert cmd[cmd.index('-filter_complex') + 1] == '[0:v]crop=608:1080:656:0,scale=1080:1920[v1]'
+    copy, encode = per_output(cmd, outputs)
+    assert copy[:4] == ['-map', '0:v:0', '-c:v', 'copy'] and 'libx264' not in copy
+    assert encode[:2] == ['-map', '[v1]']
+
+    # compress always re-encodes
+    cmd = processor._ffmpeg_command('in.mp4', [full], compress=True, metadata=METADATA)
+    assert '-filter_complex' in cmd and 'copy' not in per_output(cmd, [full])[0][:4]
+
+
+@pytest.mark.skipif(
+    shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None, reason='needs ffmpeg and ffprobe'
+)
+def test_command_runs(processor, tmp_path):
+    from video_probe import probe_video
+
+    source = str(tmp_path / 'in.mp4')
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=320x180:rate=10:duration=1',
+        '-f', 'lavfi', '-i', 'sine=duration=1', '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-shortest', source
+    ], check=True)
+
+    outputs = [
+        ({'x': 110, 'y': 0, 'width': 100, 'height': 180}, (90, 160), str(tmp_path / 'tall.mp4')),
+        ({'x': 70, 'y': 0, 'width': 180, 'height': 180}, (120, 120), str(tmp_path / 'square.mp4'))
+    ]
+    cmd = processor._ffmpeg_command(source, outputs, preset='ultrafast')
+    subprocess.run(['ffmpeg', '-v', 'error', *cmd[1:]], check=True)
+
+    for _, (width, height), path in outputs:
+        info = probe_video(path)
+        assert (info['width'], info['height']) == (width, height)
+        assert info['has_audio']
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the ffmpeg rawvideo frame reader (server/ffmpeg_frames.py)
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import ffmpeg_frames
+from ffmpeg_frames import FfmpegFrameReader, analysis_size
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+
+
+@pytest.fixture(scope='module')
+def video(tmp_path_factory):
+    """Two seconds of 10 fps 160x90 test pattern"""
+    path = str(tmp_path_factory.mktemp('video') / 'pattern.mp4')
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=160x90:rate=10:duration=2',
+        '-pix_fmt', 'yuv420p', path
+    ], check=True)
+    return path
+
+
+def test_analysis_size():
+    assert analysis_size(1920, 1080, 640) == (640, 360)
+    assert analysis_size(320, 240, 640) == (320, 240)
+
+
+def test_reads_every_frame(video):
+    frames = [frame.copy() for frame in FfmpegFrameReader(video, 80, 45)]
+    assert len(frames) == 20
+    assert frames[0].shape == (45, 80, 3)
+    assert (frames[0] != frames[-1]).any()
+
+
+def test_gray_resampled_and_capped(video):
+    frames = list(FfmpegFrameReader(video, 80, 45, fps=5, gray=True))
+    assert len(frames) == 10 and frames[0].shape == (45, 80)
+    assert len(list(FfmpegFrameReader(video, 80, 45, max_frames=3))) == 3
+
+
+def test_stopping_early_is_not_an_error(video):
+    reader = iter(FfmpegFrameReader(video, 80, 45))
+    next(reader)
+    reader.close()
+
+
+def test_failure_raises(tmp_path):
+    with pytest.raises(RuntimeError, match='ffmpeg'):
+        list(FfmpegFrameReader(str(tmp_path / 'missing.mp4'), 80, 45))
+
+    broken = tmp_path / 'broken.mp4'
+    broken.write_bytes(b'not a video' * 100)
+    with pytest.raises(RuntimeError):
+        list(FfmpegFrameReader(str(broken), 80, 45))
+
+
+def test_vsync_before_ffmpeg_5_1(monkeypatch):
+    monkeypatch.setattr(ffmpeg_frames, 'ffmpeg_version', lambda: (4, 4))
+    command = FfmpegFrameReader('in.mp4', 80, 45).command()
+    assert '-vsync' in command and '-fps_mode' not in command
+
+    for version in [(5, 1), (7, 0), None]:
+        monkeypatch.setattr(ffmpeg_frames, 'ffmpeg_version', lambda: version)
+        command = FfmpegFrameReader('in.mp4', 80, 45).command()
+        assert command[command.index('-fps_mode') + 1] == 'passthrough'
+
+
+def test_ffmpeg_version_parsing(monkeypatch):
+    import video_probe
+
+    outputs = {
+        'ffmpeg version 4.4.2-0ubuntu0.22.04.1 Copyright': (4, 4),
+        'ffmpeg version n6.1.1 Copyright': (6, 1),
+        'ffmpeg version N-113000-g1234abcd Copyright': None
+    }
+    for stdout, expected in outputs.items():
+        monkeypatch.setattr(
+            video_probe.subprocess, 'run',
+            lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, stdout, '')
+        )
+        video_probe.ffmpeg_version.cache_clear()
+        assert video_probe.ffmpeg_version() == expected
+    video_probe.ffmpeg_version.cache_clear()
+
+
+def test_pipe_failure_falls_back_to_opencv(video, monkeypatch):
+    monkeypatch.delenv('DETECTION_CACHE_DIR', raising=False)
+    from advanced_video_processor import AdvancedVideoProcessor
+
+    command = FfmpegFrameReader.command
+    monkeypatch.setattr(
+        FfmpegFrameReader, 'command',
+        lambda self: [arg if arg != self.path else self.path + '.missing' for arg in command(self)]
+    )
+    analysed = []
+    processor = AdvancedVideoProcessor()
+    analyze = processor._analyze_frames
+    monkeypatch.setattr(processor, '_analyze_frames', lambda frames: (analysed.extend(frames), analyze(frames))[1])
+
+    video_info, _ = processor._sample_detections(video, 5, 'pipe')
+    assert video_info['sampling'] == {'strategy': 'pipe', 'fallback': 'grab'}
+    assert len(analysed) == 5
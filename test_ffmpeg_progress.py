@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ffmpeg progress parsing and ETA (server/ffmpeg_progress.py)
+"""
+
+import os
+import sys
+import shutil
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import ffmpeg_progress
+from ffmpeg_progress import ProgressTracker, run_ffmpeg, _number
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the tracker"""
+    now = [100.0]
+    monkeypatch.setattr(ffmpeg_progress.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def block(out_time_s, frame=0, fps=None, speed=None, progress='continue'):
+    fields = {'out_time_us': str(int(out_time_s * 1e6)), 'frame': str(frame), 'progress': progress}
+    fields['fps'] = 'N/A' if fps is None else str(fps)
+    fields['speed'] = 'N/A' if speed is None else f'{speed}x'
+    return fields
+
+
+def test_number():
+    assert _number('1.5x') == 1.5
+    assert _number('42') == 42.0
+    assert _number('N/A') is None
+    assert _number(None) is None
+
+
+def test_percent_and_eta_from_speed(clock):
+    events = []
+    tracker = ProgressTracker(10, events.append)
+    clock[0] += 2
+    tracker.update(0, block(4, frame=100, fps=50, speed=2.0))
+    event = events[-1]
+    assert event['percent'] == 40.0
+    assert event['eta_s'] == 3.0
+    assert (event['frame'], event['fps'], event['speed'], event['elapsed_s']) == (100, 50.0, 2.0, 2.0)
+
+
+def test_eta_from_elapsed_without_speed(clock):
+    events = []
+    tracker = ProgressTracker(10, events.append)
+    clock[0] += 5
+    tracker.update(0, block(2.5))
+    assert events[-1]['percent'] == 25.0
+    assert events[-1]['eta_s'] == 15.0
+
+
+def test_parallel_runs_are_summed(clock):
+    events = []
+    tracker = ProgressTracker(20, events.append)
+    tracker.callback('a')(block(4, frame=100, fps=30, speed=1.0))
+    tracker.callback('b')(block(6, frame=150, fps=20, speed=1.5))
+    event = events[-1]
+    assert event['percent'] == 50.0
+    assert (event['frame'], event['fps'], event['speed']) == (250, 50.0, 2.5)
+    assert event['eta_s'] == 4.0
+
+    # A finished run no longer counts towards the combined speed
+    tracker.callback('a')(block(9.96, frame=300, fps=30, speed=1.0, progress='end'))
+    assert events[-1]['speed'] == 1.5
+    assert events[-1]['percent'] == pytest.approx((9.96 + 6) / 20 * 100, abs=0.05)
+
+    # Every run at its end is 100% even though the last block reports the
+    # start time of the last frame
+    tracker.callback('b')(block(9.96, frame=300, progress='end'))
+    assert events[-1]['percent'] == 100.0 and events[-1]['eta_s'] == 0.0
+
+
+def test_reset_forgets_failed_runs(clock):
+    events = []
+    tracker = ProgressTracker(10, events.append)
+    for segment in range(4):
+        tracker.callback(segment)(block(2))
+    assert events[-1]['percent'] == 80.0
+
+    # Redoing the encode in one process starts from zero again
+    tracker.reset()
+    clock[0] += 3
+    tracker.update(0, block(1))
+    assert events[-1]['percent'] == 10.0 and events[-1]['elapsed_s'] == 3.0
+
+
+def test_unknown_duration_and_bad_fields(clock):
+    events = []
+    tracker = ProgressTracker(None, events.append)
+    tracker.update(0, {'out_time_us': 'N/A', 'frame': 'N/A', 'progress': 'continue'})
+    assert events[-1]['percent'] is None and events[-1]['eta_s'] is None
+    assert events[-1]['out_time_s'] == 0.0 and events[-1]['frame'] == 0
+
+
+def test_callback_errors_do_not_stop_the_run(clock):
+    def fail(event):
+        raise ValueError('client went away')
+
+    ProgressTracker(10, fail).update(0, block(1))
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='needs a shell script')
+def test_run_ffmpeg_parses_progress_blocks(tmp_path):
+    # Stand-in for ffmpeg printing two -progress blocks, then failing
+    fake = tmp_path / 'fake-ffmpeg'
+    fake.write_text(
+        '#!/bin/sh\n'
+        'printf "frame=10\\nout_time_us=1000000\\nspeed=2x\\nprogress=continue\\n"\n'
+        'printf "\\nframe=20\\nout_time_us=2000000\\nspeed=N/A\\nprogress=end\\n"\n'
+        'for i in $(seq 1 300); do echo "stderr line $i" >&2; done\n'
+        'exit 3\n'
+    )
+    fake.chmod(0o755)
+
+    blocks = []
+    result = run_ffmpeg([str(fake), '-i', 'in.mp4', 'out.mp4'], lambda fields: blocks.append(dict(fields)),
+                        stderr_lines=5)
+    assert result.args[1:4] == ['-progress', 'pipe:1', '-nostats']
+    assert result.returncode == 3
+    assert blocks == [
+        {'frame': '10', 'out_time_us': '1000000', 'speed': '2x', 'progress': 'continue'},
+        {'frame': '20', 'out_time_us': '2000000', 'speed': 'N/A', 'progress': 'end'}
+    ]
+    assert result.stderr.splitlines() == [f'stderr line {i}' for i in range(296, 301)]
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_run_ffmpeg_reports_to_the_end():
+    events = []
+    tracker = ProgressTracker(2, events.append)
+    result = run_ffmpeg([
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=64x64:rate=10:duration=2',
+        '-f', 'null', '-'
+    ], tracker.callback())
+    assert result.returncode == 0
+    assert events[-1]['percent'] == 100.0 and events[-1]['frame'] == 20
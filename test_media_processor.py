@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Unit tests for image decoding in the basic smart crop path (server/media_processor.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import media_processor
+from media_frame import MediaFrame
+
+ANALYSIS = {'bounding_box': {'x': 60, 'y': 20, 'width': 20, 'height': 40}}
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = str(tmp_path / 'source.jpg')
+    Image.fromarray(np.random.default_rng(1).integers(0, 256, (1200, 1600, 3), dtype=np.uint8)).save(path)
+    return path
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """analysis argument of every MediaFrame.open call"""
+    calls = []
+    open_frame = MediaFrame.open
+
+    def spy(path, targets=None, analysis_max_edge=None, analysis=True):
+        calls.append(analysis)
+        return open_frame(path, targets, analysis_max_edge, analysis)
+
+    monkeypatch.setattr(media_processor.MediaFrame, 'open', spy)
+    return calls
+
+
+def test_smart_crop_image_decodes_no_analysis_proxy(tmp_path, image, opened):
+    output = str(tmp_path / 'out.jpg')
+    assert media_processor.smart_crop_image(image, output, 200, 200, ANALYSIS)
+    assert opened == [False]
+    with Image.open(output) as result:
+        assert result.size == (200, 200)
+
+
+def test_targets_decode_an_analysis_proxy_only_without_analysis(tmp_path, image, opened):
+    targets = [{'width': 200, 'height': 100, 'output_path': str(tmp_path / 'wide.jpg')}]
+
+    _, results = media_processor.smart_crop_image_targets(image, targets, ANALYSIS)
+    assert results[0]['success'] and opened == [False]
+
+    analysis, results = media_processor.smart_crop_image_targets(image, targets)
+    assert results[0]['success'] and opened == [False, True]
+    assert analysis['bounding_box']
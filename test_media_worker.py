@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the JSON-lines worker protocol of advanced_media_processor.py --serve
+"""
+
+import io
+import os
+import sys
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from advanced_media_processor import AdvancedMediaProcessor
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    img = np.full((240, 320, 3), 40, dtype=np.uint8)
+    cv2.rectangle(img, (200, 60), (280, 180), (220, 220, 220), -1)
+    path = tmp_path / 'input.jpg'
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+def serve(lines, monkeypatch):
+    """Run the worker loop over lines and return the parsed responses"""
+    monkeypatch.delenv('DETECTION_CACHE_DIR', raising=False)
+    # serve() points sys.stdout at stderr; monkeypatch restores it afterwards
+    monkeypatch.setattr(sys, 'stdout', sys.stdout)
+    output = io.StringIO()
+    processor = AdvancedMediaProcessor(detectors='fast')
+    processor.serve(io.StringIO(''.join(line + '\n' for line in lines)), output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_single_job_echoes_id(image_path, tmp_path, monkeypatch):
+    output_path = str(tmp_path / 'out.jpg')
+    job = {'id': 'a1', 'input_path': image_path, 'output_path': output_path, 'width': 100, 'height': 100}
+    responses = serve([json.dumps(job)], monkeypatch)
+
+    assert responses[0] == {'event': 'ready'}
+    assert responses[1]['id'] == 'a1'
+    assert responses[1]['success'] is True
+    assert 'main_subject' in responses[1]['result']
+    assert cv2.imread(output_path).shape == (100, 100, 3)
+
+
+def test_batch_reports_each_job(image_path, tmp_path, monkeypatch):
+    jobs = [
+        {'input_path': image_path, 'output_path': str(tmp_path / 'ok.jpg'), 'width': 60, 'height': 120},
+        {'input_path': str(tmp_path / 'missing.jpg'), 'output_path': str(tmp_path / 'no.jpg'), 'width': 60, 'height': 120}
+    ]
+    responses = serve([json.dumps({'id': 7, 'jobs': jobs})], monkeypatch)
+
+    batch = responses[1]
+    assert batch['id'] == 7 and batch['success'] is True
+    assert [result['success'] for result in batch['results']] == [True, False]
+    assert 'error' in batch['results'][1]
+
+
+def test_bad_lines_do_not_stop_the_worker(image_path, tmp_path, monkeypatch):
+    job = {'id': 2, 'input_path': image_path, 'output_path': str(tmp_path / 'out.jpg'), 'width': 50, 'height': 50}
+    responses = serve(['not json', '', json.dumps({'id': 1}), json.dumps(job)], monkeypatch)
+
+    assert [r.get('id') for r in responses[1:]] == [None, 1, 2]
+    assert [r['success'] for r in responses[1:]] == [False, False, True]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Unit tests for spectral residual saliency (server/saliency.py) and the
+saliency crop fallback
+"""
+
+import os
+import sys
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'server'))
+
+from saliency import salient_region, saliency_map
+
+
+def with_square(background, x=380, y=90, size=60, value=230):
+    image = background.copy()
+    image[y:y + size, x:x + size] = value
+    return image
+
+
+def contains(region, x, y):
+    return (region['x'] <= x <= region['x'] + region['width']
+            and region['y'] <= y <= region['y'] + region['height'])
+
+
+@pytest.mark.parametrize('background', [
+    np.full((300, 600), 60, dtype=np.uint8),
+    np.clip(np.random.default_rng(1).normal(60, 12, (300, 600)), 0, 255).astype(np.uint8)
+], ids=['flat', 'noisy'])
+def test_single_object_is_localised(background):
+    region = salient_region(with_square(background))
+    assert region is not None
+    assert contains(region, region['center_x'], region['center_y'])
+    assert (region['center_x'], region['center_y']) == pytest.approx((410, 120), abs=30)
+    assert region['width'] < 300 and region['height'] < 200
+
+
+def test_flat_image_has_no_region():
+    flat = np.full((200, 300), 128, dtype=np.uint8)
+    assert not saliency_map(flat).any()
+    assert salient_region(flat) is None
+
+
+def test_textured_image_yields_a_broad_region():
+    # Fine noise everywhere: the mean saliency is high, which used to leave
+    # nothing above three times the mean
+    texture = np.random.default_rng(2).integers(0, 256, (400, 600)).astype(np.uint8)
+    assert saliency_map(texture).mean() > 1 / 3
+    region = salient_region(texture)
+    assert region is not None
+    assert region['width'] * region['height'] > 0.25 * 600 * 400
+
+
+@pytest.mark.parametrize('name', ['test_photo_detailed.jpg', 'test_squoosh_large.jpg', 'test_aspect_pattern.jpg'])
+def test_busy_sample_images_have_a_region(name):
+    gray = cv2.imread(os.path.join(ROOT, name), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        pytest.skip(f'{name} not found')
+    assert salient_region(gray) is not None
+
+
+def test_invalid_fallback_detector_fails_at_import():
+    env = dict(os.environ, FALLBACK_DETECTOR='edges')
+    result = subprocess.run(
+        [sys.executable, '-c', 'import media_processor'],
+        cwd=os.path.join(ROOT, 'server'), env=env, capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert 'Unknown FALLBACK_DETECTOR: edges' in result.stderr
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Unit tests for shot-aware frame sampling (server/scene_sampler.py)
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from scene_sampler import allocate_samples, plan_samples, scan_shots, MIN_SAMPLE_SPACING
+
+
+def shot(start, end, activity=10.0):
+    return {'start': start, 'end': end, 'activity': activity}
+
+
+def test_every_shot_gets_a_sample_first():
+    shots = [shot(0, 30), shot(30, 31), shot(31, 33)]
+    counts = allocate_samples(shots, 3)
+    assert counts == [1, 1, 1]
+
+
+def test_budget_smaller_than_shots_goes_to_longest():
+    shots = [shot(0, 2), shot(2, 12), shot(12, 13), shot(13, 18)]
+    assert allocate_samples(shots, 2) == [0, 1, 0, 1]
+
+
+def test_remaining_budget_is_proportional():
+    # D'Hondt over 30s and 10s shots: quotients 30, 15, 10, 10, 7.5 ...
+    shots = [shot(0, 30), shot(30, 40)]
+    counts = allocate_samples(shots, 8)
+    assert sum(counts) == 8
+    assert counts == [6, 2]
+
+
+def test_caps_limit_the_total():
+    # Static shots get one sample, others one per MIN_SAMPLE_SPACING seconds
+    shots = [shot(0, 10, activity=0.5), shot(10, 10 + 3 * MIN_SAMPLE_SPACING), shot(16, 17, activity=None)]
+    counts = allocate_samples(shots, 50)
+    assert counts == [1, 3, 1]
+
+
+@pytest.mark.parametrize('budget', [1, 5, 12, 40])
+def test_totals(budget):
+    shots = [shot(0, 4.5), shot(4.5, 20, activity=1.0), shot(20, 61), shot(61, 62), shot(62, 80)]
+    counts = allocate_samples(shots, budget)
+    caps = [2, 1, 20, 1, 9]
+    assert sum(counts) == min(budget, sum(caps))
+    assert all(0 <= count <= cap for count, cap in zip(counts, caps))
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_plan_samples_follows_cuts(tmp_path):
+    # Four seconds of a moving pattern, cut to two seconds of flat colour
+    path = str(tmp_path / 'cut.mp4')
+    subprocess.run([
+        'ffmpeg', '-v', 'error',
+        '-f', 'lavfi', '-i', 'testsrc=size=160x90:rate=10:duration=4',
+        '-f', 'lavfi', '-i', 'color=c=red:size=160x90:rate=10:duration=2',
+        '-filter_complex', '[0:v][1:v]concat=n=2:v=1', '-pix_fmt', 'yuv420p', path
+    ], check=True)
+
+    shots = scan_shots(path, 160, 90, 6.0)
+    assert len(shots) == 2
+    assert shots[0]['end'] == pytest.approx(4.0, abs=0.3)
+    assert shots[1]['activity'] == 0.0
+
+    timestamps, shots = plan_samples(path, 160, 90, 6.0, 10)
+    assert [s['samples'] for s in shots] == [2, 1]
+    assert len(timestamps) == 3 and timestamps == sorted(timestamps)
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_unreadable_video_is_one_shot(tmp_path):
+    shots = scan_shots(str(tmp_path / 'missing.mp4'), 160, 90, 5.0)
+    assert shots == [{'start': 0.0, 'end': 5.0, 'activity': None}]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Unit tests for optical-flow subject tracking (server/subject_tracker.py) and
+how tracks feed video analysis
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from subject_tracker import SubjectTracker
+
+
+def texture(seed, width=320, height=180):
+    """Smoothed noise with plenty of corners for Lucas-Kanade"""
+    noise = np.random.default_rng(seed).integers(0, 256, size=(height, width)).astype(np.uint8)
+    return cv2.GaussianBlur(noise, (5, 5), 1.5)
+
+
+def shifted(image, dx, dy):
+    return cv2.warpAffine(image, np.float32([[1, 0, dx], [0, 1, dy]]), image.shape[::-1],
+                          borderMode=cv2.BORDER_REFLECT)
+
+
+def test_follows_a_moving_texture():
+    background = texture(1)
+    tracker = SubjectTracker()
+    tracker.reset(background, [(100, 60, 60, 50)])
+
+    for step in range(1, 6):
+        boxes, confidences = tracker.update(shifted(background, 3 * step, 2 * step))
+        x, y, w, h = boxes[0]
+        assert (x, y) == pytest.approx((100 + 3 * step, 60 + 2 * step), abs=0.5)
+        assert (w, h) == pytest.approx((60, 50), rel=0.05)
+        assert confidences[0] > 0.5
+
+
+def test_cut_drops_confidence():
+    from advanced_video_processor import TRACK_MIN_CONFIDENCE
+
+    tracker = SubjectTracker()
+    tracker.reset(texture(1), [(100, 60, 60, 50)])
+    _, confidences = tracker.update(texture(2))
+    assert confidences[0] < TRACK_MIN_CONFIDENCE
+
+
+def test_lost_box_keeps_its_position():
+    tracker = SubjectTracker()
+    tracker.reset(texture(1), [(100, 60, 60, 50)])
+    boxes, confidences = tracker.update(np.full((180, 320), 128, dtype=np.uint8))
+    assert confidences == [0.0] and tuple(boxes[0]) == (100, 60, 60, 50)
+
+    # It stays lost until the next reset
+    assert tracker.update(texture(1))[1] == [0.0]
+
+
+def test_flat_box_is_static():
+    gray = texture(1)
+    gray[20:80, 20:100] = 128
+    tracker = SubjectTracker()
+    tracker.reset(gray, [(30, 30, 40, 30), (150, 60, 60, 50)])
+    assert tracker.static == [True, False]
+
+    boxes, confidences = tracker.update(shifted(gray, 2, 0))
+    assert tuple(boxes[0]) == (30, 30, 40, 30) and confidences[0] == 1.0
+    assert boxes[1][0] == pytest.approx(152, abs=0.5) and confidences[1] > 0.5
+
+
+def test_boxes_outside_the_frame():
+    tracker = SubjectTracker()
+    tracker.reset(texture(1), [(400, 300, 20, 20)])
+    boxes, confidences = tracker.update(texture(1))
+    assert confidences == [1.0] and tuple(boxes[0]) == (400, 300, 20, 20)
+
+
+def test_thin_track_keeps_anchors_and_spaces_the_rest():
+    from advanced_video_processor import thin_track
+
+    positions = [{'time': i / 10, 'anchor': i % 20 == 0, 'detections': []} for i in range(100)]
+    kept = thin_track(positions, 10)
+    assert [p['time'] for p in kept] == sorted(p['time'] for p in kept)
+    assert sum(p['anchor'] for p in kept) == 5
+    tracked = [p for p in kept if not p['anchor']]
+    assert len(tracked) == 10
+    assert tracked[0]['time'] == 0.1 and tracked[-1]['time'] == 9.9
+
+    assert thin_track(positions[:5], 10) == positions[:5]
+    assert thin_track(positions, 0) == [p for p in positions if p['anchor']]
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+def test_tracked_detections_do_not_grow_with_duration(tmp_path, monkeypatch):
+    monkeypatch.delenv('DETECTION_CACHE_DIR', raising=False)
+    from advanced_video_processor import AdvancedVideoProcessor
+
+    path = str(tmp_path / 'pattern.mp4')
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=320x180:rate=25:duration=12',
+        '-pix_fmt', 'yuv420p', path
+    ], check=True)
+
+    processor = AdvancedVideoProcessor()
+    subject = {'type': 'object_person', 'confidence': 0.9, 'x': 100.0, 'y': 50.0,
+               'width': 60.0, 'height': 80.0, 'center_x': 130.0, 'center_y': 90.0}
+    monkeypatch.setattr(processor, '_analyze_frames', lambda frames: [dict(subject) for _ in frames])
+
+    video_info, detections = processor._sample_detections(path, 4, 'track')
+    sampling = video_info['sampling']
+    assert sampling['tracked_frames'] > 100
+    assert sampling['kept_tracked_frames'] <= 4
+    assert len(detections) <= sampling['detector_runs'] + 4
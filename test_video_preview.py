@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Unit tests for fast video previews (preview_size and
+AdvancedVideoProcessor.preview_video_targets)
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import advanced_video_processor
+from advanced_video_processor import (
+    AdvancedVideoProcessor, preview_size, PREVIEW_SHORT_EDGE, PREVIEW_PRESET, PREVIEW_CRF
+)
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.delenv('DETECTION_CACHE_DIR', raising=False)
+
+
+SIZES = [(1080, 1920), (1920, 1080), (1080, 1080), (1280, 720), (1080, 1350), (1001, 1777), (333, 201)]
+
+
+@pytest.mark.parametrize('width,height', SIZES)
+def test_preview_size(width, height):
+    preview_width, preview_height = preview_size(width, height)
+    assert preview_width % 2 == 0 and preview_height % 2 == 0
+
+    # The short edge is capped, and small targets are never upscaled
+    assert min(preview_width, preview_height) <= PREVIEW_SHORT_EDGE
+    assert preview_width <= width + 1 and preview_height <= height + 1
+    if min(width, height) <= PREVIEW_SHORT_EDGE:
+        assert abs(preview_width - width) <= 1 and abs(preview_height - height) <= 1
+
+    # Aspect ratio within the rounding to even pixels
+    assert preview_width / preview_height == pytest.approx(width / height, rel=2 / min(preview_width, preview_height))
+
+
+def test_preview_size_examples():
+    assert preview_size(1080, 1920) == (360, 640)
+    assert preview_size(1920, 1080) == (640, 360)
+    assert preview_size(1280, 720, short_edge=180) == (320, 180)
+    assert preview_size(200, 100) == (200, 100)
+    assert preview_size(1, 1) == (2, 2)
+
+
+class FakeAnalysis:
+    """Stands in for video analysis and ffmpeg around preview_video_targets"""
+
+    def __init__(self, monkeypatch, processor):
+        self.commands = []
+        monkeypatch.setattr(processor, 'check_ffmpeg', lambda: True)
+        monkeypatch.setattr(processor, 'analyze_video_targets', self.analyze)
+        monkeypatch.setattr(advanced_video_processor, 'run_ffmpeg', self.run)
+        monkeypatch.setattr(advanced_video_processor, 'probe_video', self.refuse)
+        monkeypatch.setattr(advanced_video_processor, 'probe_packets', self.refuse)
+        monkeypatch.setattr(processor, '_encode_chunked', self.refuse)
+
+    def analyze(self, path, sizes):
+        crops = [{'x': 0, 'y': 0, 'width': 1920, 'height': 1080, 'method': 'center'} for _ in sizes]
+        return {'optimal_crops': crops, 'video_info': {'duration': 4.0}}
+
+    def run(self, cmd, on_update=None):
+        self.commands.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, None, '')
+
+    def refuse(self, *args, **kwargs):
+        pytest.fail('previews neither probe, copy streams nor encode in chunks')
+
+
+def test_preview_skips_chunking_and_passthrough(monkeypatch):
+    processor = AdvancedVideoProcessor()
+    fake = FakeAnalysis(monkeypatch, processor)
+    targets = [
+        {'width': 1920, 'height': 1080, 'format': 'youtube', 'output_path': '/out/youtube-preview.mp4'},
+        {'width': 1080, 'height': 1920, 'format': 'story', 'output_path': '/out/story-preview.mp4'}
+    ]
+    monkeypatch.setattr(advanced_video_processor, 'DEFAULT_ENCODE_CHUNKS', 8)
+    result = processor.preview_video_targets('in.mp4', targets, 6)
+
+    # One ffmpeg run re-encodes every output, even one the source matches
+    assert len(fake.commands) == 1
+    cmd = fake.commands[0]
+    assert 'copy' not in cmd and cmd.count('-an') == 2
+    assert cmd.count('libx264') == 2 and cmd.count(PREVIEW_PRESET) == 2 and cmd.count(PREVIEW_CRF) == 2
+    assert cmd.count('-t') == 2 and cmd[cmd.index('-t') + 1] == '6'
+    graph = cmd[cmd.index('-filter_complex') + 1]
+    assert 'scale=640:360[v0]' in graph and 'scale=360:640[v1]' in graph
+
+    assert [r['preview_path'] for r in result['results']] == [t['output_path'] for t in targets]
+    assert [cmd.index(t['output_path']) for t in targets] == sorted(cmd.index(t['output_path']) for t in targets)
+    assert all('output_path' not in r for r in result['results'])
+    assert [(r['width'], r['height']) for r in result['results']] == [(1920, 1080), (1080, 1920)]
+    assert [(r['preview']['width'], r['preview']['height']) for r in result['results']] == [(640, 360), (360, 640)]
+    assert result['results'][0]['preview']['seconds'] == 4.0
+
+
+@pytest.mark.skipif(
+    shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None, reason='needs ffmpeg and ffprobe'
+)
+def test_preview_writes_small_short_files(tmp_path):
+    from video_probe import probe_video
+
+    source = str(tmp_path / 'in.mp4')
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=1280x720:rate=10:duration=3',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', source
+    ], check=True)
+
+    processor = AdvancedVideoProcessor()
+    output = str(tmp_path / 'story-preview.mp4')
+    result = processor.preview_video(source, output, 1080, 1920, 1)
+    assert result['preview_path'] == output
+
+    info = probe_video(output)
+    assert (info['width'], info['height']) == (360, 640)
+    assert info['duration'] == pytest.approx(1.0, abs=0.2)
+    assert not info['has_audio']
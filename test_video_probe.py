@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for probe-once video metadata and stream copy decisions (server/video_probe.py)
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import video_probe
+from video_probe import audio_args, video_passthrough, probe_video, _rate, _rotation
+
+
+def metadata(**overrides):
+    """Probed metadata of a 1920x1080 H.264 4:2:0 video with AAC audio"""
+    info = {
+        'width': 1920, 'height': 1080, 'rotation': 0, 'video_codec': 'h264',
+        'pix_fmt': 'yuv420p', 'audio_codec': 'aac', 'has_audio': True
+    }
+    info.update(overrides)
+    return info
+
+
+def test_audio_args():
+    assert audio_args(metadata()) == ['-c:a', 'copy']
+    assert audio_args(metadata(audio_codec='opus')) == ['-c:a', 'aac', '-b:a', '128k']
+    assert audio_args(metadata(audio_codec='mp3'), bitrate='96k') == ['-c:a', 'aac', '-b:a', '96k']
+    assert audio_args(metadata(audio_codec=None, has_audio=False)) == ['-an']
+
+
+def test_video_passthrough_only_for_untouched_h264():
+    full = (0, 0, 1920, 1080)
+    assert video_passthrough(metadata(), full, 1920, 1080)
+    assert video_passthrough(metadata(pix_fmt='yuvj420p'), list(full), 1920, 1080)
+
+    # Any crop, scale, rotation or other codec needs a re-encode
+    assert not video_passthrough(metadata(), (0, 0, 1080, 1080), 1080, 1080)
+    assert not video_passthrough(metadata(), (10, 0, 1920, 1080), 1920, 1080)
+    assert not video_passthrough(metadata(), full, 1280, 720)
+    assert not video_passthrough(metadata(rotation=90), full, 1920, 1080)
+    assert not video_passthrough(metadata(video_codec='hevc'), full, 1920, 1080)
+    assert not video_passthrough(metadata(pix_fmt='yuv444p'), full, 1920, 1080)
+
+
+def test_rate_and_rotation():
+    assert _rate('30000/1001') == pytest.approx(29.97, abs=0.01)
+    assert _rate('25') == 25.0
+    assert _rate('0/0') == 0.0 and _rate(None) == 0.0
+
+    assert _rotation({'side_data_list': [{'rotation': -90}]}) == 270
+    assert _rotation({'tags': {'rotate': '90'}}) == 90
+    assert _rotation({'tags': {'rotate': 'x'}}) == 0
+    assert _rotation({}) == 0
+
+
+def test_probe_is_memoised_and_rotation_swaps_size(tmp_path, monkeypatch):
+    path = tmp_path / 'clip.mp4'
+    path.write_bytes(b'video')
+    calls = []
+
+    def fake_ffprobe(probed):
+        calls.append(probed)
+        return {
+            'coded_width': 1920, 'coded_height': 1080, 'rotation': 90, 'fps': 30.0,
+            'duration': 2.0, 'total_frames': 60, 'video_codec': 'h264', 'pix_fmt': 'yuv420p',
+            'video_bit_rate': None, 'audio_codec': None, 'audio_channels': None,
+            'audio_sample_rate': None, 'container': 'mp4', 'source': 'ffprobe'
+        }
+
+    monkeypatch.setattr(video_probe, 'tool_available', lambda name: True)
+    monkeypatch.setattr(video_probe, '_ffprobe_metadata', fake_ffprobe)
+
+    info = probe_video(str(path))
+    assert (info['width'], info['height']) == (1080, 1920)
+    assert info['has_audio'] is False and info['gop'] is None
+    assert probe_video(str(path)) is info
+    assert len(calls) == 1
+
+    # Rewriting the file invalidates the memo
+    path.write_bytes(b'longer video')
+    probe_video(str(path))
+    assert len(calls) == 2
+
+
+def test_unreadable_video_raises(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_text('not a video')
+    with pytest.raises(ValueError):
+        probe_video(str(path))
+
+
+@pytest.mark.skipif(
+    shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None, reason='needs ffmpeg and ffprobe'
+)
+def test_probe_real_file(tmp_path):
+    path = str(tmp_path / 'clip.mp4')
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=25:duration=1',
+        '-f', 'lavfi', '-i', 'sine=duration=1', '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-shortest', path
+    ], check=True)
+
+    info = probe_video(path)
+    assert (info['width'], info['height'], info['rotation']) == (320, 240, 0)
+    assert info['fps'] == 25.0 and info['video_codec'] == 'h264' and info['audio_codec'] == 'aac'
+    assert video_passthrough(info, (0, 0, 320, 240), 320, 240)
+    assert audio_args(info) == ['-c:a', 'copy']